@@ -0,0 +1,263 @@
+"""
+Batch audit of the sub shot sets of many parent shot scenes.
+
+Each scene is opened by its own standalone Maya worker, which runs the sanity check of the mglSubShotSet tool
+and writes a json report. The workers run in parallel, each one with a timeout, and an aggregated summary is
+written at the end.
+
+Usage:
+    mayapy subshotAudit.py --sequence sq0010 --scene-root /prod/shots/sq0010 --output-dir /tmp/audit_sq0010
+    mayapy subshotAudit.py /path/sq0010_sh0010_lay_v012.ma /path/sq0010_sh0020_lay_v004.ma --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+
+SCENE_EXTENSIONS = (".ma", ".mb")
+
+
+def get_shot_code_from_path(scene_path):
+    """
+    Get the shot name from the file name of a scene.
+    :param scene_path: path of the scene
+    :type scene_path: str
+    :returns: shot name (ie: 'sq0010_sh0010'), None if the name does not follow the convention
+    :rtype: str
+    """
+    shot_codes = re.findall(r"(sq\d{4}_sh\d{4}[A-Z]?)(?:_|\.|$)", os.path.basename(scene_path))
+    if not shot_codes:
+        return
+    return shot_codes[0]
+
+
+def find_sequence_scenes(sequence, scene_root):
+    """
+    Find the latest scene version of each shot of a sequence under a root directory.
+    Sub shot scenes are ignored, only the parent shots can have sub shot sets.
+    :param sequence: name of the sequence (ie: 'sq0010')
+    :type sequence: str
+    :param scene_root: directory to search the scenes in
+    :type scene_root: str
+    :returns: scene paths sorted by shot name
+    :rtype: list[str]
+    """
+    latest_scenes = dict()
+    for root, _, file_names in os.walk(scene_root):
+        for file_name in file_names:
+            if not file_name.endswith(SCENE_EXTENSIONS) or not file_name.startswith(sequence):
+                continue
+            shot_code = get_shot_code_from_path(file_name)
+            if not shot_code or not re.match(r"^sq\d{4}_sh\d{4}$", shot_code):
+                continue
+            # Keep the highest version of each shot.
+            versions = re.findall(r"_v(\d+)\.", file_name)
+            version = int(versions[0]) if versions else 0
+            if shot_code not in latest_scenes or version > latest_scenes[shot_code][0]:
+                latest_scenes[shot_code] = (version, os.path.join(root, file_name))
+    return [latest_scenes[x][1] for x in sorted(latest_scenes)]
+
+
+def run_worker(scene_path, report_path):
+    """
+    Open a scene in standalone Maya, check its sub shot sets and write the json report.
+    Runs inside the worker process.
+    :param scene_path: path of the scene to check
+    :type scene_path: str
+    :param report_path: path of the json report to write
+    :type report_path: str
+    """
+    start = time.time()
+    report = {"scene": scene_path, "shot_code": get_shot_code_from_path(scene_path), "status": "ok"}
+    standalone = None
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+        standalone = maya.standalone
+        from maya import cmds
+        cmds.file(scene_path, open=True, force=True, prompt=False)
+        import subshotCore
+        core = subshotCore.MglSubShotSet()
+        shot_code = report["shot_code"]
+        # Use Shotgrid to know the sub shots when there is an engine, else trust the sets of the scene.
+        slave_shots = core.get_sub_shots(shot_code) if core.engine else None
+        if slave_shots:
+            subshot_sets = core.get_subshot_sets_with_slave_shots(slave_shots, shot_code)
+        else:
+            subshot_sets = core.get_subshot_set_variants(core.get_subshot_sets(shot_code), shot_code)
+        if not subshot_sets:
+            report["status"] = "skipped"
+            report["message"] = "No sub shot found for '{}'.".format(shot_code)
+        else:
+            # The audit is not interactive, it can afford to plan the renames of every variant.
+            check_report = core.check_subshot_content(subshot_sets, shot_code=shot_code, check_renames=True)
+            report.update({"state": check_report["state"], "data": check_report["data"],
+                           "message": check_report["message"], "subshot_sets": subshot_sets})
+    except Exception as error:
+        report["status"] = "failed"
+        report["error"] = "{}: {}".format(type(error).__name__, error)
+    report["duration"] = time.time() - start
+    try:
+        with open(report_path, "w") as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True)
+    finally:
+        # Shut Maya down cleanly, a worker left initialized can hang or crash on exit.
+        if standalone is not None:
+            standalone.uninitialize()
+
+
+def get_report_names(scene_paths):
+    """
+    Get a unique report name for each scene from its file name. Repeated names are numbered.
+    :param scene_paths: paths of the scenes
+    :type scene_paths: list[str]
+    :returns: report names, in the same order as the scenes
+    :rtype: list[str]
+    """
+    names = list()
+    used_names = set()
+    for scene_path in scene_paths:
+        base_name = os.path.splitext(os.path.basename(scene_path))[0]
+        name = base_name
+        index = 1
+        while name in used_names:
+            index += 1
+            name = "{}_{}".format(base_name, index)
+        used_names.add(name)
+        names.append(name)
+    return names
+
+
+def audit_scene(job):
+    """
+    Run a worker process on one scene and kill it when it runs over the timeout.
+    :param job: scene path, report path, mayapy executable and timeout in seconds
+    :type job: tuple
+    :returns: report of the scene
+    :rtype: dict
+    """
+    scene_path, report_path, mayapy, timeout = job
+    if os.path.exists(report_path):
+        os.remove(report_path)
+    command = [mayapy, os.path.abspath(__file__), "--worker", scene_path, "--report", report_path]
+    start = time.time()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        output = process.communicate()[0]
+    finally:
+        timer.cancel()
+    duration = time.time() - start
+    if os.path.exists(report_path):
+        with open(report_path) as report_file:
+            return json.load(report_file)
+    # No report: the worker crashed or has been killed.
+    status = "timeout" if duration >= timeout else "failed"
+    report = {"scene": scene_path, "shot_code": get_shot_code_from_path(scene_path), "status": status,
+              "duration": duration, "error": output.decode("utf-8", "replace")[-2000:] if output else None}
+    with open(report_path, "w") as report_file:
+        json.dump(report, report_file, indent=2, sort_keys=True)
+    return report
+
+
+def audit_scenes(scene_paths, output_dir, workers=None, timeout=900, mayapy=None):
+    """
+    Check the given scenes in parallel and write one report per scene plus a summary.
+    :param scene_paths: paths of the scenes to check
+    :type scene_paths: list[str]
+    :param output_dir: directory of the reports
+    :type output_dir: str
+    :param workers: number of Maya workers running at the same time
+    :type workers: int
+    :param timeout: time in seconds before killing a worker
+    :type timeout: float
+    :param mayapy: Maya python executable of the workers, the current one if not given
+    :type mayapy: str
+    :returns: the summary
+    :rtype: dict
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    workers = workers or max(1, multiprocessing.cpu_count() // 2)
+    mayapy = mayapy or sys.executable
+    # Several scenes of one shot can be checked together, the reports are named after the scene files.
+    names = get_report_names(scene_paths)
+    jobs = [(scene_path, os.path.join(output_dir, "{}.json".format(name)), mayapy, timeout)
+            for scene_path, name in zip(scene_paths, names)]
+    start = time.time()
+    pool = ThreadPool(min(workers, len(jobs)) or 1)
+    try:
+        reports = pool.map(audit_scene, jobs)
+    finally:
+        pool.close()
+        pool.join()
+    # Aggregate the reports.
+    summary = {"duration": time.time() - start, "scene_count": len(reports), "passed": list(), "failed": list(),
+               "errors": list(), "skipped": list(), "shots": dict()}
+    for name, report in zip(names, reports):
+        summary["shots"][name] = {"scene": report["scene"], "shot_code": report.get("shot_code"),
+                                  "status": report["status"],
+                                  "state": report.get("state"), "duration": report.get("duration")}
+        if report["status"] == "skipped":
+            summary["skipped"].append(name)
+        elif report["status"] != "ok":
+            summary["errors"].append(name)
+        elif report.get("state"):
+            summary["passed"].append(name)
+        else:
+            summary["failed"].append(name)
+    with open(os.path.join(output_dir, "summary.json"), "w") as summary_file:
+        json.dump(summary, summary_file, indent=2, sort_keys=True)
+    return summary
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+    :param argv: command line arguments
+    :type argv: list[str]
+    :returns: exit code, 1 if a scene failed its check or could not be checked
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Sanity check the sub shot sets of many parent shot scenes.")
+    parser.add_argument("scenes", nargs="*", help="Paths of the scenes to check.")
+    parser.add_argument("--sequence", help="Check the latest scene of each shot of this sequence.")
+    parser.add_argument("--scene-root", help="Directory to search the scenes of the sequence in.")
+    parser.add_argument("--output-dir", default="subshot_audit", help="Directory of the json reports.")
+    parser.add_argument("--workers", type=int, help="Number of Maya workers running at the same time.")
+    parser.add_argument("--timeout", type=float, default=900, help="Time in seconds before killing a worker.")
+    parser.add_argument("--mayapy", help="Maya python executable of the workers.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--report", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        run_worker(args.worker, args.report)
+        return 0
+    scene_paths = list(args.scenes)
+    if args.sequence:
+        if not args.scene_root:
+            parser.error("--scene-root is needed with --sequence.")
+        scene_paths.extend(find_sequence_scenes(args.sequence, args.scene_root))
+    if not scene_paths:
+        parser.error("No scene to check.")
+    summary = audit_scenes(scene_paths, args.output_dir, workers=args.workers, timeout=args.timeout,
+                           mayapy=args.mayapy)
+    print("Checked {scene_count} scenes in {duration:.1f}s: {passed_count} passed, {failed_count} failed, "
+          "{error_count} errors, {skipped_count} skipped.".format(
+              passed_count=len(summary["passed"]), failed_count=len(summary["failed"]),
+              error_count=len(summary["errors"]), skipped_count=len(summary["skipped"]), **summary))
+    for name in summary["failed"] + summary["errors"]:
+        print("  {}: {}".format(name, summary["shots"][name]["status"] if name in summary["errors"] else "failed"))
+    return 1 if summary["failed"] or summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,935 @@
+"""
+Headless benchmarks for the mglSubShotSet tool.
+
+The benchmarks run without Maya and without Shotgrid: maya.cmds is replaced by an in memory dag with sets,
+references, namespaces and cameras, and engine.shotgun by a fake with a configurable latency.
+Each benchmark reports its wall time, the number of maya.cmds calls and the number of Shotgrid calls.
+Run it with the interpreter of the tool (mayapy or python 2.7).
+The startup benchmark imports subshotCore in fresh interpreters and reports the import time and the heavy modules
+loaded by the import. With mayapy the real modules are imported, else the fakes are served on import.
+
+Usage:
+    mayapy subshotBenchmark.py --sizes 1000 10000 --latency 0.3 --output bench.json
+    mayapy subshotBenchmark.py --startup --runs 10
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import types
+
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SHOT_CODE = "sq0010_sh0010"
+VARIANTS = ("B", "C", "D")
+HEAVY_MODULES = ("sgtk", "mglImport", "mglPymel", "pymel.core", "PySide2",
+                 "pipeline.mglMayaScene.tdTools.general.assembly_tools")
+
+
+class FakeNode(object):
+    """
+    Node of the in memory scene.
+    """
+    __slots__ = ("name", "type", "parent", "children", "reference", "locked", "attrs", "members", "member_set")
+
+    def __init__(self, name, node_type, parent=None):
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.children = list()
+        self.reference = None
+        self.locked = False
+        self.attrs = dict()
+        self.members = list()
+        self.member_set = set()
+
+
+class FakeCmds(object):
+    """
+    In memory stand-in for maya.cmds. Node names are unique, so the short name of a node is its name.
+    Only the flags used by the tool are supported.
+    """
+    non_dag_types = ("objectSet", "audio", "reference", "animCurveTL")
+
+    def __init__(self):
+        self.nodes = dict()
+        self.order = list()
+        self.selection = list()
+        self.namespaces = set()
+        self.references = dict()
+        self.set_names = set()
+        self.reference_by_file = dict()
+        self.undo_chunks = 0
+        self.evaluation_mode = "parallel"
+        self.ui_controls = set()
+
+    # Scene building helpers, not part of maya.cmds.
+    def add_node(self, name, node_type="transform", parent=None, reference=None):
+        node = FakeNode(name, node_type, parent)
+        node.reference = reference
+        self.nodes[name] = node
+        self.order.append(name)
+        if parent:
+            self.nodes[parent].children.append(name)
+        if node_type == "objectSet":
+            self.set_names.add(name)
+        return name
+
+    def add_reference(self, ref_node, file_path, namespace):
+        self.add_node(ref_node, "reference")
+        self.references[ref_node] = {"file": file_path, "namespace": namespace, "nodes": list(), "loaded": True}
+        self.reference_by_file[file_path] = ref_node
+        self.namespaces.add(namespace)
+
+    def _is_dag(self, name):
+        return self.nodes[name].type not in self.non_dag_types
+
+    def _resolve(self, name):
+        if name in self.nodes:
+            return name
+        if "|" in name and name.rsplit("|", 1)[-1] in self.nodes:
+            return name.rsplit("|", 1)[-1]
+        return None
+
+    def _long(self, name):
+        if not self._is_dag(name):
+            return name
+        parts = list()
+        while name:
+            parts.append(name)
+            name = self.nodes[name].parent
+        return "|" + "|".join(reversed(parts))
+
+    def _descendants(self, name):
+        result = list()
+        stack = list(reversed(self.nodes[name].children))
+        while stack:
+            child = stack.pop()
+            result.append(child)
+            stack.extend(reversed(self.nodes[child].children))
+        return result
+
+    def _flatten(self, args):
+        names = list()
+        for arg in args:
+            if arg is None:
+                continue
+            if isinstance(arg, (list, tuple, set)):
+                names.extend(arg)
+            else:
+                names.append(arg)
+        return names
+
+    # maya.cmds
+    def ls(self, *args, **kwargs):
+        if kwargs.get("sl") or kwargs.get("selection"):
+            names = list(self.selection)
+        elif args:
+            names = self._flatten(args)
+        else:
+            names = [x for x in self.order if x in self.nodes]
+        resolved = list()
+        seen = set()
+        for name in names:
+            if "*" in name:
+                prefix = name.split("*")[0]
+                matches = sorted(x for x in self.nodes if x.startswith(prefix))
+            else:
+                match = self._resolve(name)
+                matches = [match] if match else list()
+            if kwargs.get("dag") and args:
+                matches = [y for x in matches for y in [x] + (self._descendants(x) if self._is_dag(x) else list())]
+            for match in matches:
+                if match not in seen:
+                    seen.add(match)
+                    resolved.append(match)
+        if kwargs.get("assemblies"):
+            resolved = [x for x in resolved if self._is_dag(x) and not self.nodes[x].parent]
+        if kwargs.get("dag"):
+            resolved = [x for x in resolved if self._is_dag(x)]
+        node_type = kwargs.get("type")
+        if node_type:
+            node_types = [node_type] if not isinstance(node_type, (list, tuple)) else node_type
+            resolved = [x for x in resolved if self.nodes[x].type in node_types]
+        if kwargs.get("referencedNodes"):
+            resolved = [x for x in resolved if self.nodes[x].reference]
+        if kwargs.get("showType"):
+            return [y for x in resolved for y in (x, self.nodes[x].type)]
+        if kwargs.get("long"):
+            return [self._long(x) for x in resolved]
+        return resolved
+
+    def listRelatives(self, node, parent=False, ad=False, ni=False, type=None, fullPath=False, children=False,
+                      **kwargs):
+        node = self._resolve(node)
+        if node is None:
+            return None
+        if parent:
+            return [self.nodes[node].parent] if self.nodes[node].parent else None
+        result = self._descendants(node) if ad else list(self.nodes[node].children)
+        if type:
+            result = [x for x in result if self.nodes[x].type == type]
+        return result or None
+
+    def listCameras(self, **kwargs):
+        return [node.parent for node in self.nodes.values() if node.type == "camera"]
+
+    def objExists(self, name):
+        return self._resolve(name) is not None
+
+    def objectType(self, name, isType=None, **kwargs):
+        node_type = self.nodes[self._resolve(name)].type
+        if isType:
+            return node_type == isType
+        return node_type
+
+    def namespace(self, exists=None, **kwargs):
+        return exists in self.namespaces
+
+    def namespaceInfo(self, *args, **kwargs):
+        return sorted(self.namespaces)
+
+    def sets(self, *args, **kwargs):
+        if kwargs.get("q") or kwargs.get("query"):
+            return list(self.nodes[self._resolve(args[0])].members) or None
+        members = self._flatten(args) or (list() if kwargs.get("empty") else list(self.selection))
+        include = kwargs.get("include") or kwargs.get("addElement")
+        remove = kwargs.get("rm") or kwargs.get("remove")
+        if include:
+            node = self.nodes[self._resolve(include)]
+            for member in members:
+                if member not in node.member_set:
+                    node.members.append(member)
+                    node.member_set.add(member)
+            return None
+        if remove:
+            node = self.nodes[self._resolve(remove)]
+            removed = set(members)
+            node.members = [x for x in node.members if x not in removed]
+            node.member_set.difference_update(removed)
+            return None
+        name = kwargs.get("name") or "set{}".format(len(self.nodes))
+        self.add_node(name, "objectSet")
+        self.nodes[name].members = list(members)
+        self.nodes[name].member_set = set(members)
+        return name
+
+    def referenceQuery(self, node, **kwargs):
+        if kwargs.get("nodes"):
+            return list(self.references[node]["nodes"])
+        if node in self.references:
+            ref_node = node
+        else:
+            ref_node = self.nodes[self._resolve(node)].reference
+        if kwargs.get("isNodeReferenced"):
+            return bool(ref_node) and node not in self.references
+        if kwargs.get("f") or kwargs.get("filename"):
+            return self.references[ref_node]["file"]
+        if kwargs.get("referenceNode"):
+            if not ref_node:
+                raise RuntimeError("'{}' is not from a referenced file.".format(node))
+            return ref_node
+        if kwargs.get("isLoaded"):
+            return self.references[ref_node]["loaded"]
+        if kwargs.get("namespace"):
+            return ":" + self.references[ref_node]["namespace"]
+        raise RuntimeError("Unsupported referenceQuery flags: {}".format(sorted(kwargs)))
+
+    def select(self, *args, **kwargs):
+        if kwargs.get("clear") or not args:
+            self.selection = list()
+            return
+        self.selection = self._flatten(args)
+
+    def delete(self, *args, **kwargs):
+        for name in self._flatten(args):
+            name = self._resolve(name)
+            if not name:
+                continue
+            for child in [name] + (self._descendants(name) if self._is_dag(name) else list()):
+                node = self.nodes.pop(child, None)
+                if node and node.parent in self.nodes:
+                    self.nodes[node.parent].children.remove(child)
+            self.set_names.discard(name)
+            for set_node in [self.nodes[x] for x in self.set_names]:
+                if name in set_node.member_set:
+                    set_node.members.remove(name)
+                    set_node.member_set.discard(name)
+
+    def rename(self, old_name, new_name, **kwargs):
+        old_name = self._resolve(old_name)
+        node = self.nodes.pop(old_name)
+        node.name = new_name
+        self.nodes[new_name] = node
+        self.order.append(new_name)
+        if node.parent:
+            siblings = self.nodes[node.parent].children
+            siblings[siblings.index(old_name)] = new_name
+        for child in node.children:
+            self.nodes[child].parent = new_name
+        if old_name in self.set_names:
+            self.set_names.discard(old_name)
+            self.set_names.add(new_name)
+        for set_node in [self.nodes[x] for x in self.set_names]:
+            if old_name in set_node.member_set:
+                set_node.members[set_node.members.index(old_name)] = new_name
+                set_node.member_set.discard(old_name)
+                set_node.member_set.add(new_name)
+        if old_name in self.references:
+            self.references[new_name] = self.references.pop(old_name)
+            self.reference_by_file[self.references[new_name]["file"]] = new_name
+            for child in self.references[new_name]["nodes"]:
+                if child in self.nodes:
+                    self.nodes[child].reference = new_name
+        return new_name
+
+    def lockNode(self, *args, **kwargs):
+        for name in self._flatten(args):
+            self.nodes[self._resolve(name)].locked = kwargs.get("lock", True)
+
+    def file(self, *args, **kwargs):
+        if kwargs.get("edit") and "namespace" in kwargs:
+            data = self.references[self.reference_by_file[args[0]]]
+            self.namespaces.discard(data["namespace"])
+            data["namespace"] = kwargs["namespace"]
+            self.namespaces.add(kwargs["namespace"])
+        return None
+
+    def attributeQuery(self, attr, node=None, exists=False, **kwargs):
+        return attr in self.nodes[self._resolve(node)].attrs
+
+    def getAttr(self, plug, **kwargs):
+        node, attr = plug.split(".", 1)
+        return self.nodes[self._resolve(node)].attrs.get(attr, 1.0)
+
+    def setAttr(self, plug, *values, **kwargs):
+        node, attr = plug.split(".", 1)
+        self.nodes[self._resolve(node)].attrs[attr] = values[0] if len(values) == 1 else values
+
+    def findKeyframe(self, *args, **kwargs):
+        return None
+
+    def copyKey(self, *args, **kwargs):
+        return 0
+
+    def pasteKey(self, *args, **kwargs):
+        return 0
+
+    def parentConstraint(self, *args, **kwargs):
+        return [self.add_node("parentConstraint{}".format(len(self.order)), "parentConstraint")]
+
+    def undoInfo(self, *args, **kwargs):
+        if kwargs.get("openChunk"):
+            self.undo_chunks += 1
+        return None
+
+    def refresh(self, *args, **kwargs):
+        return None
+
+    def evaluationManager(self, *args, **kwargs):
+        if kwargs.get("query"):
+            return [self.evaluation_mode]
+        self.evaluation_mode = kwargs.get("mode", self.evaluation_mode)
+        return None
+
+    def progressWindow(self, *args, **kwargs):
+        if kwargs.get("query"):
+            return False
+        return None
+
+    def confirmDialog(self, **kwargs):
+        return kwargs.get("cancelButton")
+
+    def window(self, *args, **kwargs):
+        if kwargs.get("query"):
+            return bool(args) and args[0] in self.ui_controls
+        return self._add_control("window", args)
+
+    def optionMenu(self, *args, **kwargs):
+        if kwargs.get("query"):
+            return None
+        return self._add_control("optionMenu", args)
+
+    def button(self, *args, **kwargs):
+        return self._add_control("button", args)
+
+    def textField(self, *args, **kwargs):
+        return self._add_control("textField", args)
+
+    def menuItem(self, *args, **kwargs):
+        return self._add_control("menuItem", args)
+
+    def columnLayout(self, *args, **kwargs):
+        return self._add_control("columnLayout", args)
+
+    def rowLayout(self, *args, **kwargs):
+        return self._add_control("rowLayout", args)
+
+    def text(self, *args, **kwargs):
+        return self._add_control("text", args)
+
+    def showWindow(self, *args, **kwargs):
+        return None
+
+    def deleteUI(self, *args, **kwargs):
+        self.ui_controls.difference_update(self._flatten(args))
+
+    def windowPref(self, *args, **kwargs):
+        return None
+
+    def scriptJob(self, *args, **kwargs):
+        return 1
+
+    def _add_control(self, kind, args):
+        name = args[0] if args else "{}{}".format(kind, len(self.ui_controls) + 1)
+        self.ui_controls.add(name)
+        return name
+
+    def error(self, message, **kwargs):
+        raise RuntimeError(message)
+
+    def warning(self, message, **kwargs):
+        logging.warning(message)
+
+
+class CallCounter(object):
+    """
+    Wrap a fake module and count the calls of each of its functions.
+    """
+
+    def __init__(self, implementation):
+        self._implementation = implementation
+        self.calls = collections.Counter()
+
+    def __getattr__(self, name):
+        function = getattr(self._implementation, name)
+        if name.startswith("_") or not callable(function):
+            return function
+        calls = self.calls
+
+        def counted(*args, **kwargs):
+            calls[name] += 1
+            return function(*args, **kwargs)
+        return counted
+
+    def reset(self):
+        self.calls.clear()
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+class FakeShotgun(object):
+    """
+    Stand-in for engine.shotgun answering Shot and PublishedFile finds after a fixed latency.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.entities = {"Shot": list(), "PublishedFile": list()}
+
+    def find(self, entity_type, filters=None, fields=None, order=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        records = [x for x in self.entities.get(entity_type, list()) if self._match(x, filters or list())]
+        if order:
+            for sort in reversed(order):
+                records.sort(key=lambda x: x.get(sort["field_name"]), reverse=sort.get("direction") == "desc")
+        return [dict(x) for x in records]
+
+    def _match(self, record, filters):
+        for field, operator, value in filters:
+            if field == "project":
+                continue
+            if operator == "is" and record.get(field) != value:
+                return False
+            if operator == "is_not" and record.get(field) == value:
+                return False
+            if operator == "in" and record.get(field) not in value:
+                return False
+        return True
+
+
+class FakeTemplate(object):
+    """
+    Stand-in for the sgtk templates used to build proxy namespaces.
+    """
+
+    def get_fields(self, path):
+        return {"short_asset_type": "ch", "Task": "rig"}
+
+    def apply_fields(self, fields):
+        return "{}_{}_{}_{:03d}".format(fields["short_asset_type"], fields.get("Asset", "asset"),
+                                        fields["extra_info"], fields["iteration_number"])
+
+
+class FakeEngine(object):
+    """
+    Stand-in for the sgtk engine: a shot context, a fake Shotgrid and the templates.
+    """
+
+    def __init__(self, shotgun, shot_code=SHOT_CODE, task="lay"):
+        self.shotgun = shotgun
+        self.context = FakeContext(shot_code, task)
+        template = FakeTemplate()
+        self.sgtk = types.ModuleType("sgtk_instance")
+        self.sgtk.templates = {"shot_namespace": template}
+        self.sgtk.template_from_path = lambda path: template
+
+
+class FakeContext(object):
+    """
+    Stand-in for the sgtk context of a shot task.
+    """
+
+    def __init__(self, shot_code, task):
+        self.entity = {"type": "Shot", "name": shot_code}
+        self.task = {"name": task}
+        self.project = {"type": "Project", "id": 1}
+
+
+class FakeAssembly(object):
+    """
+    Stand-in for the assembly objects of assembly_tools.
+    """
+
+    def __init__(self, ref_node):
+        self.refNode = ref_node
+
+
+class FakeMessage(object):
+    """
+    Stand-in for the OpenMaya message classes: callbacks are registered but never called.
+    """
+    callback_count = [0]
+
+    def __getattr__(self, name):
+        if name.startswith("k"):
+            return name
+
+        def add_callback(*args, **kwargs):
+            self.callback_count[0] += 1
+            return self.callback_count[0]
+        return add_callback
+
+
+class FakeSelectionList(object):
+    """
+    Stand-in for OpenMaya.MSelectionList: the node names are used as MObjects.
+    """
+
+    def __init__(self):
+        self.names = list()
+
+    def add(self, name):
+        self.names.append(name)
+
+    def getDependNode(self, index):
+        return self.names[index]
+
+
+def install_fake_modules(latency=0.0):
+    """
+    Register the fake maya, Shotgrid and pipeline modules before importing the tool.
+    :param latency: Shotgrid latency in seconds
+    :type latency: float
+    :returns: counted fake cmds, fake shotgun and fake assembly_tools
+    :rtype: tuple
+    """
+    # The fake scene only answers the commands, not the API function sets.
+    os.environ["MGL_SUBSHOT_SCENE_BACKEND"] = "cmds"
+    fake_cmds = FakeCmds()
+    cmds = CallCounter(fake_cmds)
+    shotgun = FakeShotgun(latency)
+    engine = FakeEngine(shotgun)
+    open_maya = types.ModuleType("maya.api.OpenMaya")
+    for name in ("MDGMessage", "MDagMessage", "MNodeMessage", "MSceneMessage", "MMessage", "MEventMessage",
+                 "MObjectSetMessage"):
+        setattr(open_maya, name, FakeMessage())
+    open_maya.MObject = object
+    open_maya.MSelectionList = FakeSelectionList
+    open_maya.MFn = types.ModuleType("MFn")
+    open_maya.MFn.kDagNode = "kDagNode"
+    maya = types.ModuleType("maya")
+    maya.cmds = cmds
+    # Deferred calls are queued and run by the benchmark, like the Maya idle queue of the main thread.
+    maya.utils = types.ModuleType("maya.utils")
+    maya.utils.deferred = list()
+    maya.utils.executeDeferred = lambda function, *args: maya.utils.deferred.append((function, args))
+    maya.api = types.ModuleType("maya.api")
+    maya.api.OpenMaya = open_maya
+    sgtk = types.ModuleType("sgtk")
+    sgtk.platform = types.ModuleType("sgtk.platform")
+    sgtk.platform.current_engine = lambda: engine
+    assembly_tools = types.ModuleType("assembly_tools")
+    assembly_tools.references = list()
+    assembly_tools.get_scene_assemblies = lambda: [FakeAssembly(x) for x in assembly_tools.references]
+    modules = {
+        "maya": maya, "maya.cmds": cmds, "maya.utils": maya.utils, "maya.api": maya.api, "maya.api.OpenMaya": open_maya,
+        "sgtk": sgtk, "sgtk.platform": sgtk.platform, "mglImport": types.ModuleType("mglImport"),
+        "mglPymel": types.ModuleType("mglPymel"), "pipeline": types.ModuleType("pipeline"),
+        "pipeline.mglMayaScene": types.ModuleType("pipeline.mglMayaScene"),
+        "pipeline.mglMayaScene.tdTools": types.ModuleType("pipeline.mglMayaScene.tdTools"),
+        "pipeline.mglMayaScene.tdTools.general": types.ModuleType("pipeline.mglMayaScene.tdTools.general"),
+        "pipeline.mglMayaScene.tdTools.general.assembly_tools": assembly_tools}
+    modules["pipeline.mglMayaScene.tdTools.general"].assembly_tools = assembly_tools
+    sys.modules.update(modules)
+    return cmds, shotgun, assembly_tools
+
+
+def build_parent_shot_scene(cmds, shotgun, assembly_tools, top_count, depth=3, assembly_count=20,
+                            variants=VARIANTS, error_ratio=0.01):
+    """
+    Fill the fake scene with a parent shot: cameras, common elements, referenced rigs, assemblies and one
+    sub shot set per variant. A small part of the members are wrong (non top, duplicated or missing).
+    :param cmds: counted fake cmds
+    :type cmds: CallCounter
+    :param shotgun: fake Shotgrid
+    :type shotgun: FakeShotgun
+    :param assembly_tools: fake assembly_tools module
+    :type assembly_tools: module
+    :param top_count: number of top nodes to create
+    :type top_count: int
+    :param depth: hierarchy depth under each top node
+    :type depth: int
+    :param assembly_count: number of assembly references
+    :type assembly_count: int
+    :param variants: sub shot variants
+    :type variants: tuple
+    :param error_ratio: ratio of wrong members
+    :type error_ratio: float
+    :returns: sub shot set name by variant
+    :rtype: dict
+    """
+    scene = cmds._implementation
+    for cam in ("persp", "top", "front", "side"):
+        scene.add_node(cam)
+        scene.add_node(cam + "Shape", "camera", cam)
+    scene.add_node("shotCam_grp")
+    scene.add_node("shotCam", parent="shotCam_grp")
+    scene.add_node("shotCamShape", "camera", "shotCam")
+    scene.add_node("trash_grp")
+    scene.add_node("layLights_all_grp")
+    for index in range(assembly_count):
+        namespace = "set_Env{}_lay_001".format(index)
+        ref_node = namespace + "RN"
+        scene.add_reference(ref_node, "/assets/set/Env{}/lay.ma".format(index), namespace)
+        top_node = scene.add_node(namespace + ":all_grp", reference=ref_node)
+        scene.references[ref_node]["nodes"].append(top_node)
+        assembly_tools.references.append(ref_node)
+    top_nodes = list()
+    for index in range(top_count):
+        namespace = "ch_Cat{}_rig_001".format(index)
+        ref_node = namespace + "RN"
+        scene.add_reference(ref_node, "/assets/ch/Cat{}/rig.ma".format(index), namespace)
+        parent = scene.add_node(namespace + ":all_grp", reference=ref_node)
+        top_nodes.append(parent)
+        nodes = [parent]
+        for level in range(depth):
+            parent = scene.add_node("{}:ctl_{}".format(namespace, level), parent=parent, reference=ref_node)
+            nodes.append(parent)
+        nodes.append(scene.add_node("{}:ctlShape".format(namespace), "nurbsCurve", parent, reference=ref_node))
+        scene.references[ref_node]["nodes"] = nodes
+    # Spread the top nodes on the sub shot sets, then break a few members.
+    subshot_sets = dict()
+    for index, variant in enumerate(variants):
+        members = top_nodes[index::len(variants)]
+        subshot_sets[variant] = cmds.sets(members, name="{}_{}".format(SHOT_CODE, variant))
+    error_count = max(1, int(top_count * error_ratio))
+    first_set = scene.nodes[subshot_sets[variants[0]]]
+    last_set = scene.nodes[subshot_sets[variants[-1]]]
+    for index in range(error_count):
+        wrong_top = top_nodes[(index * 7) % top_count]
+        # A non top node, a duplicated member and a missing member.
+        first_set.members.append(scene.nodes[wrong_top].children[0])
+        last_set.members.append(top_nodes[(index * 11 + 1) % top_count])
+        missing = top_nodes[(index * 13 + 2) % top_count]
+        for set_node in (first_set, last_set):
+            if missing in set_node.member_set:
+                set_node.members.remove(missing)
+        for set_node in (first_set, last_set):
+            set_node.member_set = set(set_node.members)
+    # Register the shots on the fake Shotgrid.
+    slave_shots = [{"type": "Shot", "name": SHOT_CODE + x} for x in variants]
+    shotgun.entities["Shot"] = [{"code": SHOT_CODE, "shots": slave_shots, "parent_shots": list(),
+                                 "sg_status_list": "ip"}]
+    for slave_shot in slave_shots:
+        shotgun.entities["Shot"].append({"code": slave_shot["name"], "shots": list(), "sg_status_list": "ip",
+                                         "parent_shots": [{"type": "Shot", "name": SHOT_CODE}]})
+    return subshot_sets
+
+
+class LazyModuleFinder(object):
+    """
+    Import hook serving fake modules only when they are imported, to know which ones a code path loads.
+    """
+
+    def __init__(self, modules):
+        self.modules = modules
+        self.imported = list()
+
+    def find_module(self, name, path=None):
+        return self if name in self.modules else None
+
+    def load_module(self, name):
+        if name in sys.modules:
+            return sys.modules[name]
+        module = self.modules[name]
+        # The parents of other fake modules are packages.
+        if not hasattr(module, "__path__") and any(x.startswith(name + ".") for x in self.modules):
+            module.__path__ = list()
+        self.imported.append(name)
+        sys.modules[name] = module
+        return module
+
+    def find_spec(self, name, path=None, target=None):
+        if name not in self.modules:
+            return None
+        import importlib.util
+        return importlib.util.spec_from_loader(name, self)
+
+    def create_module(self, spec):
+        return self.load_module(spec.name)
+
+    def exec_module(self, module):
+        pass
+
+
+def install_lazy_fake_modules():
+    """
+    Install the fake modules, the Maya ones right away and the pipeline ones only when they are imported.
+    :returns: the import hook of the pipeline modules
+    :rtype: LazyModuleFinder
+    """
+    install_fake_modules()
+    lazy_names = [x for x in sys.modules if x.split(".")[0] in ("sgtk", "mglImport", "mglPymel", "pipeline")]
+    finder = LazyModuleFinder(dict((x, sys.modules.pop(x)) for x in lazy_names))
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def run_import_worker():
+    """
+    Import subshotCore, then build the core, and print the durations and the heavy modules loaded as json.
+    Runs inside a fresh worker process.
+    """
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+    except ImportError:
+        install_lazy_fake_modules()
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    start = time.time()
+    import subshotCore
+    import_time = time.time() - start
+    import_modules = [x for x in HEAVY_MODULES if x in sys.modules]
+    start = time.time()
+    subshotCore.MglSubShotSet()
+    construction_time = time.time() - start
+    print(json.dumps({"import_time": import_time, "import_modules": import_modules,
+                      "construction_time": construction_time,
+                      "construction_modules": [x for x in HEAVY_MODULES if x in sys.modules]}))
+
+
+def run_startup_benchmark(runs=5, python=None):
+    """
+    Import subshotCore in fresh interpreters.
+    :param runs: number of interpreters to start
+    :type runs: int
+    :param python: interpreter of the workers, the current one if not given
+    :type python: str
+    :returns: result of each run
+    :rtype: list[dict]
+    """
+    command = [python or sys.executable, os.path.abspath(__file__), "--import-worker"]
+    results = list()
+    for _ in range(runs):
+        output = subprocess.check_output(command).decode("utf-8")
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def load_widget_module(core_module):
+    """
+    Load subshotWidget inside a package built on the fly, like the deployed layout ('from .. import subshotCore').
+    :param core_module: imported subshotCore module
+    :type core_module: module
+    :returns: subshotWidget module
+    :rtype: module
+    """
+    package = types.ModuleType("mglSubShotSet")
+    package.__path__ = [ROOT_DIR]
+    package.subshotCore = core_module
+    ui_package = types.ModuleType("mglSubShotSet.ui")
+    ui_package.__path__ = [ROOT_DIR]
+    # The members panel is a Qt view, which the benchmarks never show: an empty module stands for it.
+    package.subshotMembershipPanel = types.ModuleType("mglSubShotSet.subshotMembershipPanel")
+    sys.modules.update({"mglSubShotSet": package, "mglSubShotSet.subshotCore": core_module,
+                        "mglSubShotSet.subshotMembershipPanel": package.subshotMembershipPanel,
+                        "mglSubShotSet.ui": ui_package})
+    module_name = "mglSubShotSet.ui.subshotWidget"
+    module_path = os.path.join(ROOT_DIR, "subshotWidget.py")
+    try:
+        import importlib.util
+    except ImportError:
+        import imp
+        return imp.load_source(module_name, module_path)
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(name, function, cmds, shotgun):
+    """
+    Run a function and report its wall time, maya.cmds calls and Shotgrid calls.
+    :param name: benchmark name
+    :type name: str
+    :param function: function to run
+    :type function: callable
+    :param cmds: counted fake cmds
+    :type cmds: CallCounter
+    :param shotgun: fake Shotgrid
+    :type shotgun: FakeShotgun
+    :returns: result of the benchmark
+    :rtype: dict
+    """
+    cmds.reset()
+    shotgun.calls = 0
+    start = time.time()
+    function()
+    wall_time = time.time() - start
+    return {"name": name, "wall_time": wall_time, "cmds_calls": cmds.total(), "sg_calls": shotgun.calls,
+            "cmds_detail": dict(cmds.calls)}
+
+
+def run_benchmarks(top_count, latency=0.0, depth=3):
+    """
+    Build a parent shot scene and run every benchmark on it.
+    :param top_count: number of top nodes of the scene
+    :type top_count: int
+    :param latency: Shotgrid latency in seconds
+    :type latency: float
+    :param depth: hierarchy depth under each top node
+    :type depth: int
+    :returns: results of each benchmark
+    :rtype: list[dict]
+    """
+    cmds, shotgun, assembly_tools = install_fake_modules(latency)
+    for module_name in ("subshotCore", "mglSubShotSet.ui.subshotWidget"):
+        sys.modules.pop(module_name, None)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    import subshotCore
+    widget = load_widget_module(subshotCore)
+    subshot_sets = build_parent_shot_scene(cmds, shotgun, assembly_tools, top_count, depth=depth)
+    scene = cmds._implementation
+    results = list()
+    deferred = sys.modules["maya.utils"].deferred
+    core = subshotCore.MglSubShotSet()
+    ui = widget.MglSubShotSetUI(core)
+    # The window opens before Shotgrid answers, then the sub shots arrive from the loader thread.
+    results.append(measure("MglSubShotSetUI show (window)", ui.show, cmds, shotgun))
+    ui.loader.join()
+    del deferred[:]
+    core.remove_callbacks()
+    core = subshotCore.MglSubShotSet()
+
+    def show_and_load():
+        loaded_ui = widget.MglSubShotSetUI(core)
+        loaded_ui.show()
+        loaded_ui.loader.join()
+        while deferred:
+            function, args = deferred.pop(0)
+            function(*args)
+    results.append(measure("MglSubShotSetUI show (loaded)", show_and_load, cmds, shotgun))
+    core.remove_callbacks()
+    core = subshotCore.MglSubShotSet()
+    reports = dict()
+
+    def check():
+        reports["check"] = core.check_subshot_content(subshot_sets)
+    results.append(measure("check_subshot_content (cold)", check, cmds, shotgun))
+    results.append(measure("check_subshot_content (warm)", check, cmds, shotgun))
+    results.append(measure("check_subshot_content (fail fast)",
+                           lambda: core.check_subshot_content(subshot_sets, fail_fast=True), cmds, shotgun))
+    # Select a few children of each variant to simulate an artist selection.
+    selection = [scene.nodes[x].children[0] for x in list(scene.nodes[subshot_sets[VARIANTS[0]]].members)[:50]
+                 if scene.nodes[x].children]
+    scene.selection = selection
+    # Validate all the sets once, then only the set changed by an artist edit.
+    core.validator.watch(subshot_sets, SHOT_CODE)
+    results.append(measure("validator (all sets)", core.validator.validate, cmds, shotgun))
+    edited_set = subshot_sets[VARIANTS[0]]
+    core.validator._on_set_members_modified(edited_set, edited_set)
+    results.append(measure("validator (one dirty set)", core.validator.validate, cmds, shotgun))
+    results.append(measure("check_and_fix_selection", core.check_and_fix_selection, cmds, shotgun))
+    results.append(measure("fix_subshot_content", lambda: core.fix_subshot_content(reports["check"]), cmds,
+                           shotgun))
+    # Build the first sub shot: the context of the engine switches on it.
+    core.engine.context.entity["name"] = SHOT_CODE + VARIANTS[0]
+    results.append(measure("manage_set_content", core.manage_set_content, cmds, shotgun))
+    core.remove_callbacks()
+    for result in results:
+        result["top_count"] = top_count
+    return results
+
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line and print a summary.
+    :param argv: command line arguments
+    :type argv: list[str]
+    :returns: exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the mglSubShotSet tool.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Number of top nodes of each generated parent shot scene.")
+    parser.add_argument("--depth", type=int, default=3, help="Hierarchy depth under each top node.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake Shotgrid latency in seconds.")
+    parser.add_argument("--output", help="Write the results as json in this file.")
+    parser.add_argument("--startup", action="store_true", help="Only measure the import of subshotCore.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh imports of the startup benchmark.")
+    parser.add_argument("--import-worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.ERROR)
+    if args.import_worker:
+        run_import_worker()
+        return 0
+    if args.startup:
+        results = run_startup_benchmark(args.runs)
+        import_times = sorted(x["import_time"] for x in results)
+        construction_times = sorted(x["construction_time"] for x in results)
+        print("import subshotCore: best {:.3f}s, median {:.3f}s over {} runs".format(
+            import_times[0], import_times[len(import_times) // 2], len(results)))
+        print("  heavy modules loaded: {}".format(", ".join(results[0]["import_modules"]) or "none"))
+        print("MglSubShotSet(): best {:.3f}s, median {:.3f}s".format(
+            construction_times[0], construction_times[len(construction_times) // 2]))
+        print("  heavy modules loaded: {}".format(", ".join(results[0]["construction_modules"]) or "none"))
+        if args.output:
+            with open(args.output, "w") as output_file:
+                json.dump(results, output_file, indent=2, sort_keys=True)
+        return 0
+    results = list()
+    for top_count in args.sizes:
+        results.extend(run_benchmarks(top_count, latency=args.latency, depth=args.depth))
+    print("{:<34} {:>9} {:>10} {:>10} {:>8}".format("benchmark", "top nodes", "wall (s)", "cmds calls", "sg calls"))
+    for result in results:
+        print("{name:<34} {top_count:>9} {wall_time:>10.3f} {cmds_calls:>10} {sg_calls:>8}".format(**result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,2357 @@
+import collections
 import logging
+import math
+from multiprocessing.pool import ThreadPool
+import os
+import threading
+import time
 
 import maya.cmds as cmds
+from maya.api import OpenMaya
 import re
-import sgtk
 
-import mglImport
-import mglPymel as pymel
-from pipeline.mglMayaScene.tdTools.general import assembly_tools
+try:
+    STRING_TYPES = (str, unicode)
+except NameError:
+    # Python 3 strings are unicode.
+    STRING_TYPES = (str,)
+
+
+class SceneQuery(object):
+    """
+    Batched scene queries: each one takes a list of nodes and costs a constant number of maya calls.
+    """
+
+    def get_top_nodes(self, components):
+        """
+        Get the top node of each component of a list. A non dag node is its own top node.
+        :param components: elements in the scene
+        :type components: list or tuple or set
+        :returns: top node names, in the same order as the components
+        :rtype: list[str]
+        """
+        components = list(components)
+        if not components:
+            return list()
+        # The long names are listed once per node found, not once per component: match them by node name.
+        long_names_by_leaf = dict()
+        for long_name in cmds.ls(components, long=True) or list():
+            long_names_by_leaf.setdefault(long_name.rsplit("|", 1)[-1], list()).append(long_name)
+        top_paths = list()
+        for component in components:
+            long_name = next((x for x in long_names_by_leaf.get(component.rsplit("|", 1)[-1], tuple())
+                              if x == component or x.endswith("|" + component)), component)
+            top_paths.append("|" + long_name.split("|")[1] if long_name.startswith("|") else None)
+        # The name of a top node is its short name, unless any other node in the scene has the same name.
+        top_names = sorted(set(x[1:] for x in top_paths if x))
+        name_counts = collections.Counter()
+        if top_names:
+            name_counts.update(x.rsplit("|", 1)[-1] for x in cmds.ls(top_names, long=True) or list())
+        return [component if top_path is None else top_path if name_counts[top_path[1:]] > 1 else top_path[1:]
+                for component, top_path in zip(components, top_paths)]
+
+    def get_long_name(self, node):
+        """
+        Get the full dag path of a node.
+        :param node: element in the scene
+        :type node: str
+        :returns: full dag path, the name itself for a non dag node, None if the name matches no node or several ones
+        :rtype: str
+        """
+        long_names = cmds.ls(node, long=True) or list()
+        if len(long_names) != 1:
+            return
+        return long_names[0]
+
+    def get_node_types(self, nodes):
+        """
+        Get the type of each node of a list.
+        :param nodes: elements in the scene
+        :type nodes: list or tuple or set
+        :returns: node types by node name, missing nodes are not in the dict
+        :rtype: dict
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return dict()
+        names_and_types = cmds.ls(nodes, showType=True) or list()
+        return dict(zip(names_and_types[::2], names_and_types[1::2]))
+
+    def get_node_names(self):
+        """
+        Get the name of every node of the scene.
+        :returns: node names, without their dag path
+        :rtype: list[str]
+        """
+        return [x.rsplit("|", 1)[-1] for x in cmds.ls() or list()]
+
+    def get_namespaces(self):
+        """
+        Get every namespace of the scene.
+        :returns: namespace names, without the root namespace
+        :rtype: list[str]
+        """
+        namespaces = cmds.namespaceInfo(":", listOnlyNamespaces=True, recurse=True) or list()
+        return [x.lstrip(":") for x in namespaces]
+
+    def get_top_level_nodes(self):
+        """
+        Get the nodes directly under the world.
+        :returns: long names and shortest unique names, in the same order
+        :rtype: tuple[list[str], list[str]]
+        """
+        return cmds.ls(assemblies=True, long=True) or list(), cmds.ls(assemblies=True) or list()
+
+    def get_dag_nodes(self, roots=None):
+        """
+        Get the dag nodes of the scene, or the given hierarchies.
+        :param roots: long names of the hierarchies to list, the whole scene if not given
+        :type roots: list[str]
+        :returns: long names and shortest unique names, in the same order
+        :rtype: tuple[list[str], list[str]]
+        """
+        if roots is None:
+            return cmds.ls(dag=True, long=True) or list(), cmds.ls(dag=True) or list()
+        if not roots:
+            return list(), list()
+        return cmds.ls(roots, dag=True, long=True) or list(), cmds.ls(roots, dag=True) or list()
+
+    def get_cameras(self):
+        """
+        Get the transforms of the cameras of the scene.
+        :returns: camera names
+        :rtype: list[str]
+        """
+        return cmds.listCameras() or list()
+
+    def get_referenced_nodes(self, nodes):
+        """
+        Get the nodes of a list which come from a referenced file.
+        :param nodes: elements in the scene
+        :type nodes: list or tuple or set
+        :returns: referenced node names
+        :rtype: list[str]
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return list()
+        return cmds.ls(nodes, referencedNodes=True) or list()
+
+    def get_reference_node(self, node):
+        """
+        Get the top reference node of a node.
+        :param node: element in the scene
+        :type node: str
+        :returns: reference node name, None if the node is not referenced
+        :rtype: str
+        """
+        try:
+            return cmds.referenceQuery(node, topReference=True, referenceNode=True)
+        except RuntimeError:
+            # The node is not referenced.
+            return
+
+    def get_set_members(self, object_set):
+        """
+        Get the members of a set.
+        :param object_set: set name
+        :type object_set: str
+        :returns: member names, empty if the set is empty
+        :rtype: list[str]
+        """
+        return cmds.sets(object_set, query=True) or list()
+
+    def get_selection(self):
+        """
+        Get the active selection.
+        :returns: selected node names
+        :rtype: list[str]
+        """
+        return cmds.ls(selection=True) or list()
+
+    def get_world_matrices(self, nodes):
+        """
+        Get the world matrix of each transform of a list. The command backend costs one call per node.
+        :param nodes: transform names
+        :type nodes: list or tuple or set
+        :returns: the 16 values of the world matrix by node name, missing nodes are not in the dict
+        :rtype: dict
+        """
+        matrices = dict()
+        for node in nodes:
+            try:
+                matrices[node] = cmds.xform(node, query=True, worldSpace=True, matrix=True)
+            except (RuntimeError, ValueError):
+                continue
+        return matrices
+
+    def get_anim_curves(self, nodes):
+        """
+        Get the animation curves directly connected to the attributes of each node of a list.
+        :param nodes: elements in the scene
+        :type nodes: list or tuple or set
+        :returns: curve name by attribute name by node name, nodes without curve are not in the dict
+        :rtype: dict
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return dict()
+        plugs = cmds.listConnections(nodes, type="animCurve", source=True, destination=False, connections=True,
+                                     plugs=True) or list()
+        curves = dict()
+        # The plugs come in pairs: the animated attribute then the output of its curve.
+        for destination, source in zip(plugs[::2], plugs[1::2]):
+            node, attribute = destination.split(".", 1)
+            curves.setdefault(node, dict())[attribute] = source.split(".", 1)[0]
+        return curves
+
+    def select(self, nodes):
+        """
+        Replace the active selection, as an undoable command with both backends.
+        :param nodes: nodes to select
+        :type nodes: list or tuple or set
+        """
+        cmds.select(list(nodes))
+
+
+class ApiSceneQuery(SceneQuery):
+    """
+    Scene queries through the OpenMaya API 2.0: nodes are resolved once to object handles, and the hierarchy and
+    set members are read from the function sets without converting every result through a command.
+    """
+
+    def __init__(self):
+        self._handles = dict()
+
+    def get_object(self, name):
+        """
+        Get the node of a name, from the handle found by a previous query when it is still valid.
+        :param name: node name or dag path
+        :type name: str
+        :returns: the node, None if there is no node with this name
+        :rtype: OpenMaya.MObject
+        """
+        handle = self._handles.get(name)
+        if handle is not None and handle.isAlive() and handle.isValid():
+            node = handle.object()
+            # The node can have been renamed since it was resolved.
+            if OpenMaya.MFnDependencyNode(node).name() == name.rsplit("|", 1)[-1].rsplit(".", 1)[0]:
+                return node
+        selection = OpenMaya.MSelectionList()
+        try:
+            selection.add(name)
+        except RuntimeError:
+            self._handles.pop(name, None)
+            return
+        if selection.length() != 1:
+            return
+        node = selection.getDependNode(0)
+        self._handles[name] = OpenMaya.MObjectHandle(node)
+        return node
+
+    def get_dag_path(self, name):
+        """
+        Get the dag path of a name.
+        :param name: node name or dag path
+        :type name: str
+        :returns: the dag path, None if there is no dag node with this name
+        :rtype: OpenMaya.MDagPath
+        """
+        node = self.get_object(name)
+        if node is None or not node.hasFn(OpenMaya.MFn.kDagNode):
+            return
+        if "|" in name:
+            selection = OpenMaya.MSelectionList()
+            selection.add(name)
+            return selection.getDagPath(0)
+        return OpenMaya.MDagPath.getAPathTo(node)
+
+    def get_top_nodes(self, components):
+        top_nodes = list()
+        for component in components:
+            dag_path = self.get_dag_path(component)
+            if dag_path is None or dag_path.length() == 0:
+                top_nodes.append(component)
+                continue
+            dag_path.pop(dag_path.length() - 1)
+            top_nodes.append(dag_path.partialPathName())
+        return top_nodes
+
+    def get_long_name(self, node):
+        node_object = self.get_object(node)
+        if node_object is None:
+            return
+        if not node_object.hasFn(OpenMaya.MFn.kDagNode):
+            return OpenMaya.MFnDependencyNode(node_object).name()
+        return self.get_dag_path(node).fullPathName()
+
+    def get_node_types(self, nodes):
+        node_types = dict()
+        for node_name in nodes:
+            node = self.get_object(node_name)
+            if node is not None:
+                node_types[node_name] = OpenMaya.MFnDependencyNode(node).typeName
+        return node_types
+
+    def get_node_names(self):
+        names = list()
+        iterator = OpenMaya.MItDependencyNodes()
+        while not iterator.isDone():
+            names.append(OpenMaya.MFnDependencyNode(iterator.thisNode()).name())
+            iterator.next()
+        return names
+
+    def get_namespaces(self):
+        return [x.lstrip(":") for x in OpenMaya.MNamespace.getNamespaces(":", True)]
+
+    def get_top_level_nodes(self):
+        world = OpenMaya.MItDag().root()
+        world_fn = OpenMaya.MFnDagNode(world)
+        long_names, short_names = list(), list()
+        for index in range(world_fn.childCount()):
+            dag_path = OpenMaya.MDagPath.getAPathTo(world_fn.child(index))
+            long_names.append(dag_path.fullPathName())
+            short_names.append(dag_path.partialPathName())
+        return long_names, short_names
+
+    def get_dag_nodes(self, roots=None):
+        long_names, short_names = list(), list()
+        if roots is None:
+            roots = [None]
+        iterator = OpenMaya.MItDag(OpenMaya.MItDag.kDepthFirst)
+        for root in roots:
+            if root is not None:
+                root_path = self.get_dag_path(root)
+                if root_path is None:
+                    continue
+                iterator.reset(root_path, OpenMaya.MItDag.kDepthFirst)
+            while not iterator.isDone():
+                dag_path = iterator.getPath()
+                # Skip the world itself.
+                if dag_path.length():
+                    long_names.append(dag_path.fullPathName())
+                    short_names.append(dag_path.partialPathName())
+                iterator.next()
+        return long_names, short_names
+
+    def get_cameras(self):
+        cameras = list()
+        iterator = OpenMaya.MItDag(OpenMaya.MItDag.kDepthFirst, OpenMaya.MFn.kCamera)
+        while not iterator.isDone():
+            dag_path = iterator.getPath()
+            dag_path.pop()
+            cameras.append(dag_path.partialPathName())
+            iterator.next()
+        return cameras
+
+    def get_referenced_nodes(self, nodes):
+        referenced_nodes = list()
+        for node_name in nodes:
+            node = self.get_object(node_name)
+            if node is not None and OpenMaya.MFnDependencyNode(node).isFromReferencedFile:
+                referenced_nodes.append(node_name)
+        return referenced_nodes
+
+    def get_reference_node(self, node):
+        node_object = self.get_object(node)
+        if node_object is None or not OpenMaya.MFnDependencyNode(node_object).isFromReferencedFile:
+            return
+        # Maya knows the reference of each node, searching it through every reference node would be quadratic.
+        return super(ApiSceneQuery, self).get_reference_node(node)
+
+    def get_set_members(self, object_set):
+        node = self.get_object(object_set)
+        if node is None or not node.hasFn(OpenMaya.MFn.kSet):
+            return list()
+        return list(OpenMaya.MFnSet(node).getMembers(False).getSelectionStrings())
+
+    def get_selection(self):
+        return list(OpenMaya.MGlobal.getActiveSelectionList().getSelectionStrings())
+
+    def get_world_matrices(self, nodes):
+        matrices = dict()
+        for node in nodes:
+            dag_path = self.get_dag_path(node)
+            if dag_path is None:
+                continue
+            matrix = dag_path.inclusiveMatrix()
+            matrices[node] = [matrix.getElement(row, column) for row in range(4) for column in range(4)]
+        return matrices
+
+
+SCENE_QUERY_BACKENDS = {"cmds": SceneQuery, "api": ApiSceneQuery}
+
+
+def get_scene_query(backend=None):
+    """
+    Get the scene queries of a backend.
+    :param backend: 'api' or 'cmds', given by the MGL_SUBSHOT_SCENE_BACKEND environment variable if not given
+    :type backend: str
+    :returns: scene queries, with the cmds backend when the given one is unknown
+    :rtype: SceneQuery
+    """
+    backend = backend or os.environ.get("MGL_SUBSHOT_SCENE_BACKEND", "api")
+    if backend not in SCENE_QUERY_BACKENDS:
+        logging.warning("Unknown scene backend '{}', the cmds one is used.".format(backend))
+        backend = "cmds"
+    return SCENE_QUERY_BACKENDS[backend]()
+
+
+def get_short_names(long_names):
+    """
+    Get the shortest unique name of dag nodes with the same name, like maya does: the fewest last parts of the dag
+    path which no other of the nodes ends with, the full dag path if there are none.
+    :param long_names: full dag paths of every dag node with this name
+    :type long_names: list or tuple or set
+    :returns: shortest unique name by full dag path
+    :rtype: dict
+    """
+    parts_by_path = dict((x, x.split("|")[1:]) for x in long_names)
+    short_names = dict()
+    depth = 1
+    while len(short_names) < len(parts_by_path):
+        suffixes = dict((x, "|".join(y[-depth:])) for x, y in parts_by_path.items() if len(y) >= depth)
+        if not suffixes:
+            break
+        counts = collections.Counter(suffixes.values())
+        for path, suffix in suffixes.items():
+            if path not in short_names and counts[suffix] == 1:
+                short_names[path] = suffix
+        depth += 1
+    for path in parts_by_path:
+        short_names.setdefault(path, path)
+    return short_names
+
+
+class ShotCode(collections.namedtuple("ShotCode", ["name", "sequence", "shot", "variant"])):
+    """
+    Shot name parsed once (ie: 'sq0010_sh0010B' is the sub shot 'B' of the shot 'sh0010' of the sequence 'sq0010',
+    'sq0010_sh0010' is its parent shot and 'sq0010_sh0010_B' its sub shot set).
+    Valid names are interned: parsing a name again returns the same object. Names outside the convention are not
+    kept, so parsing any node name does not grow the caches.
+    """
+    __slots__ = ()
+
+    _parsed = dict()
+    _parsed_sets = dict()
+
+    @classmethod
+    def parse(cls, name):
+        """
+        Parse a shot name.
+        :param name: shot name (ie: 'sq0010_sh0010' or 'sq0010_sh0010B')
+        :type name: str
+        :returns: the shot code, None if the name does not follow the convention
+        :rtype: ShotCode
+        """
+        try:
+            return cls._parsed[name]
+        except KeyError:
+            pass
+        shot_code = None
+        text = str(name) if name is not None else ""
+        if len(text) in (13, 14) and text.startswith("sq") and text[6:9] == "_sh" and text[2:6].isdigit() \
+                and text[9:13].isdigit() and (len(text) == 13 or cls.is_variant(text[13])):
+            shot_code = cls(text, text[:6], text[7:13], text[13:] or None)
+            cls._parsed[name] = shot_code
+        return shot_code
+
+    @classmethod
+    def parse_set_name(cls, set_name):
+        """
+        Parse the name of a sub shot set.
+        :param set_name: sub shot set name (ie: 'sq0010_sh0010_B')
+        :type set_name: str
+        :returns: shot code of the sub shot of the set (ie: 'sq0010_sh0010B'), None if the name does not follow
+                  the convention
+        :rtype: ShotCode
+        """
+        try:
+            return cls._parsed_sets[set_name]
+        except KeyError:
+            pass
+        shot_code = None
+        text = str(set_name) if set_name is not None else ""
+        if len(text) == 15 and text[13] == "_" and cls.is_variant(text[14]):
+            parent = cls.parse(text[:13])
+            if parent is not None:
+                shot_code = parent.get_subshot(text[14])
+                cls._parsed_sets[set_name] = shot_code
+        return shot_code
+
+    @staticmethod
+    def is_variant(letter):
+        """
+        Check if a character can be the variant of a sub shot, a word character.
+        :param letter: one character
+        :type letter: str
+        :rtype: bool
+        """
+        return len(letter) == 1 and (letter.isalnum() or letter == "_")
+
+    @property
+    def is_subshot(self):
+        return self.variant is not None
+
+    @property
+    def parent_name(self):
+        return self.name[:13]
+
+    def get_parent(self):
+        """
+        Get the parent shot of a sub shot, the shot itself for a parent shot.
+        :rtype: ShotCode
+        """
+        return self.parse(self.parent_name) if self.is_subshot else self
+
+    def get_subshot(self, variant):
+        """
+        Get a sub shot of the parent shot.
+        :param variant: variant letter of the sub shot
+        :type variant: str
+        :rtype: ShotCode
+        """
+        return self.parse(self.parent_name + variant)
+
+    def get_set_name(self, variant=None):
+        """
+        Get the name of the set of a sub shot.
+        :param variant: variant letter of the sub shot, the one of this sub shot if not given
+        :type variant: str
+        :returns: sub shot set name (ie: 'sq0010_sh0010_B')
+        :rtype: str
+        """
+        return "{}_{}".format(self.parent_name, variant or self.variant)
+
+
+class SceneIndex(object):
+    """
+    In memory index of the scene hierarchy used by the sub shot checks.
+    Built once from the scene, then kept current with node added/removed, renamed and parent changed callbacks.
+    The callbacks only store what changed, the index is synced on the next query.
+    """
+
+    def __init__(self, scene_query=None):
+        self.scene_query = scene_query or SceneQuery()
+        self.top_nodes = set()
+        self.top_node_by_child = dict()
+        self.camera_top_nodes = set()
+        self.reference_by_top_node = dict()
+        self.is_built = False
+        self.callback_ids = list()
+        self._top_name_by_path = dict()
+        self._keys_by_path = dict()
+        self._children_by_path = dict()
+        self._paths_by_leaf = dict()
+        self._dirty_paths = set()
+        self._dirty_handles = list()
+        self._removed_paths = set()
+
+    def build(self):
+        """
+        Index the whole scene hierarchy and start to listen to the scene changes.
+        """
+        self.clear()
+        # Store the top nodes by their long names to resolve the top node of any dag path.
+        top_paths, top_names = self.scene_query.get_top_level_nodes()
+        self._top_name_by_path = dict(zip(top_paths, top_names))
+        self.top_nodes = set(top_names)
+        # Short and long names are listed in the same order, in one pass for the whole scene.
+        self._index_paths(*self.scene_query.get_dag_nodes())
+        self._index_references(top_names)
+        self._index_cameras()
+        self.is_built = True
+        if not self.callback_ids:
+            self.add_callbacks()
+
+    def clear(self):
+        """
+        Empty the index without removing the callbacks.
+        """
+        self.top_nodes = set()
+        self.top_node_by_child = dict()
+        self.camera_top_nodes = set()
+        self.reference_by_top_node = dict()
+        self.is_built = False
+        self._top_name_by_path = dict()
+        self._keys_by_path = dict()
+        self._children_by_path = dict()
+        self._paths_by_leaf = dict()
+        self._dirty_paths = set()
+        self._dirty_handles = list()
+        self._removed_paths = set()
+
+    def invalidate(self, *args):
+        """
+        Force a full rebuild of the index on the next query.
+        """
+        self.is_built = False
+
+    def sync(self):
+        """
+        Build the index if needed or apply the scene changes stored by the callbacks.
+        """
+        if not self.is_built:
+            self.build()
+            return
+        if not any((self._dirty_paths, self._dirty_handles, self._removed_paths)):
+            return
+        # Resolve the paths of the nodes created since the last sync.
+        for handle in self._dirty_handles:
+            if not handle.isValid():
+                continue
+            try:
+                self._dirty_paths.add(OpenMaya.MDagPath.getAPathTo(handle.object()).fullPathName())
+            except RuntimeError:
+                continue
+        # Drop the removed hierarchies first, their paths can be reused by the dirty ones.
+        changed_leaves = set()
+        for removed_path in self._removed_paths:
+            # Walk down the removed hierarchy from the children of each path.
+            paths = [removed_path]
+            while paths:
+                path = paths.pop()
+                paths.extend(self._children_by_path.get(path, tuple()))
+                if path in self._keys_by_path:
+                    changed_leaves.add(self._remove_path(path))
+        # Refresh the top nodes, then re-index each dirty hierarchy.
+        previous_top_nodes = self.top_nodes
+        top_paths, top_names = self.scene_query.get_top_level_nodes()
+        self._top_name_by_path = dict(zip(top_paths, top_names))
+        self.top_nodes = set(top_names)
+        dirty_paths = [path for path in self._dirty_paths if path]
+        if dirty_paths:
+            changed_leaves.update(self._index_paths(*self.scene_query.get_dag_nodes(dirty_paths)))
+        # A node added or removed can change the shortest unique name of the other nodes with the same name.
+        self._index_short_names(changed_leaves)
+        for top_node in previous_top_nodes - self.top_nodes:
+            self.reference_by_top_node.pop(top_node, None)
+        self._index_references(self.top_nodes - previous_top_nodes)
+        self._index_cameras()
+        self._dirty_paths = set()
+        self._dirty_handles = list()
+        self._removed_paths = set()
+
+    def get_top_node(self, node):
+        """
+        Get the top node of the given node. A non dag node is its own top node.
+        :param node: element in the scene
+        :type node: str or unicode
+        :returns: top node name
+        :rtype: str
+        """
+        top_node = self.top_node_by_child.get(node)
+        if top_node is not None:
+            return top_node
+        # Unknown name, it can be a partial path: resolve it once and keep it.
+        long_name = self.scene_query.get_long_name(node)
+        if not long_name or not long_name.startswith("|"):
+            return node
+        top_node = self._get_top_name(long_name)
+        self.top_node_by_child[node] = top_node
+        self._keys_by_path.setdefault(long_name, [long_name]).append(node)
+        return top_node
+
+    def get_top_nodes(self, nodes):
+        """
+        Get the top node of each node of a list. Unknown names are resolved together in one batch.
+        :param nodes: elements in the scene
+        :type nodes: list or tuple or set
+        :returns: top node names, in the same order as the nodes
+        :rtype: list[str]
+        """
+        nodes = list(nodes)
+        unknown_nodes = [node for node in nodes if node not in self.top_node_by_child]
+        resolved = dict(zip(unknown_nodes, self.scene_query.get_top_nodes(unknown_nodes)))
+        return [self.top_node_by_child.get(node) or resolved.get(node, node) for node in nodes]
+
+    def get_reference_node(self, top_node):
+        """
+        Get the top reference node of the given top node if there is.
+        :param top_node: top node name
+        :type top_node: str
+        :returns: reference node name
+        :rtype: str
+        """
+        if top_node not in self.reference_by_top_node:
+            return
+        reference_node = self.reference_by_top_node[top_node]
+        if reference_node is None:
+            reference_node = self.scene_query.get_reference_node(top_node)
+            self.reference_by_top_node[top_node] = reference_node
+        return reference_node
+
+    def _get_top_name(self, long_name):
+        """
+        Get the top node name from the long name of a dag node.
+        :param long_name: full dag path of the node
+        :type long_name: str
+        :returns: top node name
+        :rtype: str
+        """
+        top_path = "|{}".format(long_name.split("|")[1])
+        return self._top_name_by_path.get(top_path, top_path[1:])
+
+    def _index_paths(self, long_names, short_names):
+        """
+        Store the top node of each given dag node by its short and long names.
+        :param long_names: full dag paths
+        :type long_names: list[str]
+        :param short_names: shortest unique names, in the same order
+        :type short_names: list[str]
+        :returns: names of the indexed nodes, without their dag path
+        :rtype: set
+        """
+        leaves = set()
+        for long_name, short_name in zip(long_names, short_names):
+            if long_name in self._keys_by_path:
+                self._remove_path(long_name)
+            top_node = self._get_top_name(long_name)
+            self.top_node_by_child[long_name] = top_node
+            self.top_node_by_child[short_name] = top_node
+            self._keys_by_path[long_name] = [long_name, short_name]
+            parent, _, leaf = long_name.rpartition("|")
+            self._children_by_path.setdefault(parent, set()).add(long_name)
+            self._paths_by_leaf.setdefault(leaf, set()).add(long_name)
+            leaves.add(leaf)
+        return leaves
+
+    def _remove_path(self, long_name):
+        """
+        Forget a dag node and every name it was indexed by.
+        :param long_name: full dag path of the node
+        :type long_name: str
+        :returns: name of the node, without its dag path
+        :rtype: str
+        """
+        for key in self._keys_by_path.pop(long_name):
+            self.top_node_by_child.pop(key, None)
+        parent, _, leaf = long_name.rpartition("|")
+        for paths_by_key, key in ((self._children_by_path, parent), (self._paths_by_leaf, leaf)):
+            paths = paths_by_key.get(key)
+            if paths is None:
+                continue
+            paths.discard(long_name)
+            if not paths:
+                del paths_by_key[key]
+        return leaf
+
+    def _index_short_names(self, leaves):
+        """
+        Index again the shortest unique names of the dag nodes with the given names.
+        :param leaves: names of the nodes, without their dag path
+        :type leaves: set
+        """
+        for leaf in leaves:
+            paths = self._paths_by_leaf.get(leaf)
+            if not paths:
+                continue
+            # Every partial name of these nodes ends with the leaf: drop them all before indexing the new ones.
+            for path in paths:
+                for key in self._keys_by_path[path][1:]:
+                    self.top_node_by_child.pop(key, None)
+            for path, short_name in get_short_names(paths).items():
+                self._keys_by_path[path] = [path, short_name]
+                self.top_node_by_child[path] = self.top_node_by_child[short_name] = self._get_top_name(path)
+
+    def _index_references(self, top_nodes):
+        """
+        Store the top reference node of the given referenced top nodes.
+        :param top_nodes: top node names
+        :type top_nodes: list or set
+        """
+        if not top_nodes:
+            return
+        # The reference node itself is queried on demand, most checks only need to know if it is referenced.
+        for top_node in self.scene_query.get_referenced_nodes(top_nodes):
+            self.reference_by_top_node[top_node] = None
+
+    def _index_cameras(self):
+        """
+        Store the top nodes which contain cameras.
+        """
+        self.camera_top_nodes = set(self.get_top_nodes(self.scene_query.get_cameras()))
+
+    def add_callbacks(self):
+        """
+        Listen to the scene changes to keep the index current.
+        """
+        self.callback_ids = [
+            OpenMaya.MDGMessage.addNodeAddedCallback(self._on_node_added, "dagNode"),
+            OpenMaya.MDGMessage.addNodeRemovedCallback(self._on_node_removed, "dagNode"),
+            OpenMaya.MDagMessage.addParentAddedCallback(self._on_parent_added),
+            OpenMaya.MDagMessage.addParentRemovedCallback(self._on_parent_removed),
+            OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject(), self._on_name_changed)]
+        # Reference edits and new scenes replace whole hierarchies, rebuild the index.
+        for message in (OpenMaya.MSceneMessage.kAfterOpen, OpenMaya.MSceneMessage.kAfterNew,
+                        OpenMaya.MSceneMessage.kAfterLoadReference, OpenMaya.MSceneMessage.kAfterUnloadReference,
+                        OpenMaya.MSceneMessage.kAfterCreateReference, OpenMaya.MSceneMessage.kAfterRemoveReference):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addCallback(message, self.invalidate))
+
+    def remove_callbacks(self):
+        """
+        Stop listening to the scene changes.
+        """
+        if self.callback_ids:
+            OpenMaya.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = list()
+        self.is_built = False
+
+    def _on_node_added(self, node, *args):
+        self._dirty_handles.append(OpenMaya.MObjectHandle(node))
+
+    def _on_node_removed(self, node, *args):
+        try:
+            self._removed_paths.add(OpenMaya.MDagPath.getAPathTo(node).fullPathName())
+        except RuntimeError:
+            self.invalidate()
+
+    def _on_parent_added(self, child, parent, *args):
+        self._dirty_paths.add(child.fullPathName())
+
+    def _on_parent_removed(self, child, parent, *args):
+        self._removed_paths.add(child.fullPathName())
+
+    def _on_name_changed(self, node, previous_name, *args):
+        if not node.hasFn(OpenMaya.MFn.kDagNode):
+            return
+        try:
+            path = OpenMaya.MDagPath.getAPathTo(node).fullPathName()
+        except RuntimeError:
+            return
+        # The old path only differs from the new one by its last name.
+        if previous_name:
+            self._removed_paths.add("{}|{}".format(path.rsplit("|", 1)[0], previous_name))
+        self._dirty_paths.add(path)
+
+
+class AssemblyRegistry(object):
+    """
+    Cache of the assembly top nodes of the scene.
+    Top nodes are resolved once per assembly reference, keyed by reference node and file path, and dropped when
+    the reference is loaded, unloaded or removed, or when a referenced node is reparented or renamed.
+    """
+
+    def __init__(self):
+        self.top_nodes_by_reference = dict()
+        self.assembly_references = None
+        self.callback_ids = list()
+
+    def get_top_nodes(self):
+        """
+        Get the top nodes of every assembly of the scene.
+        :returns: assembly top nodes
+        :rtype: set
+        """
+        if not self.callback_ids:
+            self.add_callbacks()
+        if self.assembly_references is None:
+            # Imported on first use, it is not needed to load the module.
+            from pipeline.mglMayaScene.tdTools.general import assembly_tools
+            # Get the reference node and file of each assembly in the scene.
+            assemblies = assembly_tools.get_scene_assemblies() or list()
+            ref_nodes = [str(assembly.refNode) for assembly in assemblies]
+            self.assembly_references = [(ref_node, cmds.referenceQuery(ref_node, filename=True))
+                                        for ref_node in ref_nodes]
+        top_nodes = set()
+        for key in self.assembly_references:
+            if key not in self.top_nodes_by_reference:
+                # For each reference node, get their children top nodes.
+                nodes = cmds.referenceQuery(key[0], nodes=True, dagPath=True) or list()
+                self.top_nodes_by_reference[key] = set(cmds.ls(nodes, assemblies=True) or list())
+            top_nodes.update(self.top_nodes_by_reference[key])
+        return top_nodes
+
+    def invalidate(self, *args):
+        """
+        Forget every assembly and their top nodes.
+        """
+        self.top_nodes_by_reference = dict()
+        self.assembly_references = None
+
+    def invalidate_reference(self, reference_node, *args):
+        """
+        Forget the given reference and the list of assemblies.
+        :param reference_node: reference node
+        :type reference_node: OpenMaya.MObject
+        """
+        self.assembly_references = None
+        try:
+            ref_name = OpenMaya.MFnDependencyNode(reference_node).name()
+        except RuntimeError:
+            self.invalidate()
+            return
+        for key in [x for x in self.top_nodes_by_reference if x[0] == ref_name]:
+            del self.top_nodes_by_reference[key]
+
+    def add_callbacks(self):
+        """
+        Listen to the reference changes to invalidate the cache.
+        """
+        for message in (OpenMaya.MSceneMessage.kAfterLoadReference, OpenMaya.MSceneMessage.kAfterUnloadReference,
+                        OpenMaya.MSceneMessage.kAfterRemoveReference, OpenMaya.MSceneMessage.kAfterCreateReference):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addReferenceCallback(message, self.invalidate_reference))
+        for message in (OpenMaya.MSceneMessage.kAfterOpen, OpenMaya.MSceneMessage.kAfterNew):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addCallback(message, self.invalidate))
+        # Reparenting or renaming a referenced node changes the top nodes without a reference event.
+        self.callback_ids.extend([
+            OpenMaya.MDagMessage.addParentAddedCallback(self._on_parent_changed),
+            OpenMaya.MDagMessage.addParentRemovedCallback(self._on_parent_changed),
+            OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject(), self._on_name_changed)])
+
+    def invalidate_top_nodes(self):
+        """
+        Forget the top nodes of every assembly, keeping the list of assemblies.
+        """
+        self.top_nodes_by_reference = dict()
+
+    def _on_parent_changed(self, child, parent, *args):
+        if self.top_nodes_by_reference and OpenMaya.MFnDependencyNode(child.node()).isFromReferencedFile:
+            self.invalidate_top_nodes()
+
+    def _on_name_changed(self, node, previous_name, *args):
+        if (self.top_nodes_by_reference and node.hasFn(OpenMaya.MFn.kDagNode) and
+                OpenMaya.MFnDependencyNode(node).isFromReferencedFile):
+            self.invalidate_top_nodes()
+
+    def remove_callbacks(self):
+        """
+        Stop listening to the reference changes.
+        """
+        if self.callback_ids:
+            OpenMaya.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = list()
+        self.invalidate()
+
+
+class MembershipIndex(object):
+    """
+    Inverted index of the sub shot sets: the members of each set and the sets of each member.
+    The members found more than once are kept up to date with each change.
+    """
+
+    def __init__(self):
+        self.members_by_set = dict()
+        self.sets_by_member = dict()
+        self.duplicated = set()
+
+    def build(self, subshot_sets):
+        """
+        Index the members of the given sets with one query per set.
+        :param subshot_sets: sub shot set names
+        :type subshot_sets: list or tuple or set
+        """
+        self.clear()
+        for subshot_set in subshot_sets:
+            if subshot_set and cmds.objExists(subshot_set):
+                self.add_set(subshot_set, cmds.sets(subshot_set, q=True) or list())
+
+    def clear(self):
+        """
+        Empty the index.
+        """
+        self.members_by_set = dict()
+        self.sets_by_member = dict()
+        self.duplicated = set()
+
+    def add_set(self, subshot_set, members):
+        """
+        Index the members of a set, replacing the previous ones if the set was already indexed.
+        :param subshot_set: sub shot set name
+        :type subshot_set: str
+        :param members: members of the set
+        :type members: list or tuple
+        """
+        self.remove_set(subshot_set)
+        self.members_by_set[subshot_set] = list(members)
+        for member in members:
+            sets = self.sets_by_member.setdefault(member, list())
+            sets.append(subshot_set)
+            if len(sets) > 1:
+                self.duplicated.add(member)
+
+    def add_member(self, subshot_set, member):
+        """
+        Count one more occurrence of a member on a set. Used for the top node of a non top member.
+        :param subshot_set: sub shot set name
+        :type subshot_set: str
+        :param member: member name
+        :type member: str
+        """
+        self.members_by_set.setdefault(subshot_set, list()).append(member)
+        sets = self.sets_by_member.setdefault(member, list())
+        sets.append(subshot_set)
+        if len(sets) > 1:
+            self.duplicated.add(member)
+
+    def remove_set(self, subshot_set):
+        """
+        Forget a set and its members.
+        :param subshot_set: sub shot set name
+        :type subshot_set: str
+        """
+        for member in self.members_by_set.pop(subshot_set, list()):
+            sets = self.sets_by_member.get(member)
+            if not sets:
+                continue
+            sets.remove(subshot_set)
+            if len(sets) < 2:
+                self.duplicated.discard(member)
+            if not sets:
+                del self.sets_by_member[member]
+
+    def get_sets(self, member):
+        """
+        Get the sets containing the given member.
+        :param member: member name
+        :type member: str
+        :returns: set names, one entry per occurrence
+        :rtype: list
+        """
+        return list(self.sets_by_member.get(member, list()))
+
+    def get_duplicated(self):
+        """
+        Get the members found more than once on the sets.
+        :returns: duplicated members
+        :rtype: list
+        """
+        return sorted(self.duplicated)
+
+    def get_missing(self, nodes):
+        """
+        Get the given nodes which are on no set.
+        :param nodes: node names
+        :type nodes: list or tuple or set
+        :returns: missing nodes
+        :rtype: list
+        """
+        return [node for node in nodes if node not in self.sets_by_member]
+
+    def get_assigned(self, components, exclude_set=None):
+        """
+        Get the given components which are already on a set.
+        :param components: elements in the scene
+        :type components: list or tuple or set
+        :param exclude_set: set to ignore, the one being edited
+        :type exclude_set: str
+        :returns: assigned components
+        :rtype: list
+        """
+        return [component for component in components
+                if any(x != exclude_set for x in self.sets_by_member.get(component, list()))]
+
+
+class SetMembershipEditor(object):
+    """
+    Collect member additions and removals on sets, then apply all of them at once as one undo step.
+    The members are given to the set commands directly, the active selection is never used.
+    """
+
+    def __init__(self):
+        self.edits = collections.OrderedDict()
+
+    def add(self, subshot_set, members):
+        """
+        Plan to add members to a set.
+        :param subshot_set: set name
+        :type subshot_set: str
+        :param members: members to add
+        :type members: list or tuple or set
+        """
+        self._plan(subshot_set, members, True)
+
+    def remove(self, subshot_set, members):
+        """
+        Plan to remove members from a set.
+        :param subshot_set: set name
+        :type subshot_set: str
+        :param members: members to remove
+        :type members: list or tuple or set
+        """
+        self._plan(subshot_set, members, False)
+
+    def _plan(self, subshot_set, members, is_added):
+        # Only the last planned edit of a member counts, like running the set commands one after the other.
+        planned = self.edits.setdefault(subshot_set, collections.OrderedDict())
+        for member in members:
+            planned.pop(member, None)
+            planned[member] = is_added
+
+    def apply(self):
+        """
+        Apply the planned edits with one set command per set and per kind of edit, in a single undo chunk.
+        Members already in their state are skipped, a member both added and removed ends in the last planned state.
+        :returns: added and removed members of each changed set
+        :rtype: dict
+        """
+        diff = dict()
+        cmds.undoInfo(openChunk=True, chunkName="subshotSetMembership")
+        try:
+            for subshot_set, planned in self.edits.items():
+                current = set(cmds.sets(subshot_set, query=True) or list())
+                removed = [x for x, is_added in planned.items() if not is_added and x in current]
+                added = [x for x, is_added in planned.items() if is_added and x not in current]
+                if removed:
+                    cmds.sets(removed, remove=subshot_set)
+                if added:
+                    cmds.sets(added, include=subshot_set, noWarnings=True)
+                if removed or added:
+                    diff[subshot_set] = {"added": added, "removed": removed}
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        self.edits.clear()
+        return diff
+
+
+class BulkEditSession(object):
+    """
+    Context of a mass scene edit: the viewport refresh is suspended, the evaluation manager is switched off to
+    avoid a graph rebuild per edit, every edit goes to one undo chunk and the unlocked nodes are locked back at
+    once. Every setting is restored on exit, errors included.
+    A session entered inside another one uses the outer session.
+    """
+    active = None
+
+    def __init__(self, name="subshotBulkEdit"):
+        self.name = name
+        self.unlocked_nodes = list()
+        self.is_nested = False
+        self._suspended_refresh = False
+        self._evaluation_mode = None
+
+    def __enter__(self):
+        if BulkEditSession.active is not None:
+            self.is_nested = True
+            return BulkEditSession.active
+        try:
+            try:
+                is_suspended = cmds.refresh(query=True, suspend=True)
+            except (RuntimeError, TypeError):
+                is_suspended = False
+            if not is_suspended:
+                cmds.refresh(suspend=True)
+                self._suspended_refresh = True
+            try:
+                evaluation_mode = cmds.evaluationManager(query=True, mode=True)
+            except (AttributeError, RuntimeError):
+                # No evaluation manager before Maya 2016.
+                evaluation_mode = None
+            if evaluation_mode and evaluation_mode[0] != "off":
+                self._evaluation_mode = evaluation_mode[0]
+                cmds.evaluationManager(mode="off")
+        except Exception:
+            self._restore_settings()
+            raise
+        # Open the undo chunk last, a failure above must not leave it open.
+        cmds.undoInfo(openChunk=True, chunkName=self.name)
+        BulkEditSession.active = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.is_nested:
+            return False
+        try:
+            if self.unlocked_nodes:
+                cmds.lockNode(self.unlocked_nodes, lock=True)
+        finally:
+            self.unlocked_nodes = list()
+            try:
+                BulkEditSession.active = None
+                cmds.undoInfo(closeChunk=True)
+            finally:
+                self._restore_settings()
+        return False
+
+    def _restore_settings(self):
+        try:
+            if self._evaluation_mode:
+                cmds.evaluationManager(mode=self._evaluation_mode)
+        finally:
+            self._evaluation_mode = None
+            try:
+                if self._suspended_refresh:
+                    cmds.refresh(suspend=False)
+            finally:
+                self._suspended_refresh = False
+
+    def unlock(self, nodes):
+        """
+        Unlock nodes with one call, they are locked back at the end of the session.
+        :param nodes: node names
+        :type nodes: list or tuple or set
+        """
+        nodes = [x for x in nodes if x not in self.unlocked_nodes]
+        if not nodes:
+            return
+        cmds.lockNode(nodes, lock=False)
+        self.unlocked_nodes.extend(nodes)
+
+    def rename(self, node, new_name):
+        """
+        Rename a node, following it if it has been unlocked by the session.
+        :param node: node name
+        :type node: str
+        :param new_name: new name of the node
+        :type new_name: str
+        :returns: the new name given by maya
+        :rtype: str
+        """
+        new_name = cmds.rename(node, new_name)
+        if node in self.unlocked_nodes:
+            self.unlocked_nodes[self.unlocked_nodes.index(node)] = new_name
+        return new_name
+
+
+class AssetMemberName(collections.namedtuple("AssetMemberName", ["member", "asset_type", "asset_name", "task",
+                                                                 "instance_number", "namespace", "suffix"])):
+    """
+    Tokens of a sub shot set member name (ie: 'ch_ChickA_rig_001:all_grp' is a 'ch' asset 'ChickA' of the 'rig'
+    task, instance 1 of the namespace 'ch_ChickA_rig_001', 'RN' is the suffix of 'ch_ChickA_rig_001RN').
+    """
+    __slots__ = ()
+
+    PATTERN = re.compile(r"^(?P<asset_type>[^_:|]+)_(?P<asset_name>[^_:|]+)(?:_(?P<task>[^:|]+?))?_(?P<instance>\d{3,})"
+                         r"(?P<suffix>[^:|]*)$")
+
+    @classmethod
+    def parse(cls, member):
+        """
+        Split a member name into its tokens. Names outside the naming convention only get an asset name.
+        :param member: name of the component
+        :type member: str
+        :returns: tokens of the name
+        :rtype: AssetMemberName
+        """
+        namespace = member.rsplit(":", 1)[0] if ":" in member else ""
+        # The first namespace of a referenced node carries the asset name.
+        match = cls.PATTERN.match(member.split(":", 1)[0].rsplit("|", 1)[-1])
+        if match:
+            return cls(member, match.group("asset_type"), match.group("asset_name"), match.group("task"),
+                       int(match.group("instance")), namespace, match.group("suffix"))
+        split_name = member.split("_")
+        # Add a flexibility to avoid index error by splitting the name.
+        asset_name = split_name[1] if len(split_name) > 1 else split_name[0]
+        return cls(member, None, asset_name, None, None, namespace, None)
+
+
+class AssetMemberIndex(object):
+    """
+    Members of a sub shot set grouped by asset name in one pass, the asset names being compared as whole tokens.
+    """
+
+    def __init__(self, members=None):
+        self.names = dict()
+        self.members_by_asset = collections.OrderedDict()
+        if members:
+            self.add(members)
+
+    def add(self, members):
+        """
+        Parse and group members.
+        :param members: names of the components
+        :type members: list or tuple or set
+        """
+        for member in members:
+            if member in self.names:
+                continue
+            name = AssetMemberName.parse(member)
+            self.names[member] = name
+            self.members_by_asset.setdefault(name.asset_name, list()).append(member)
+
+    def get_groups(self):
+        """
+        Get the members by asset name.
+        :returns: members by asset name (ie: {"ChickA": ["ch_ChickA_rig_001RN", "ch_ChickA_rig_001:all_grp"]})
+        :rtype: dict
+        """
+        return collections.OrderedDict((x, list(y)) for x, y in self.members_by_asset.items())
+
+
+class InstanceNumberAllocator(object):
+    """
+    Hand out free instance numbers from a snapshot of the names and namespaces of the scene, taken once.
+    Each variant owns blocks of 99 numbers: the block of the variant (B: 101-199, C: 201-299, ..., Z: 2501-2599),
+    then every 26 blocks after it (B: 2701-2799, 5301-5399, ...), so no variant can reach the numbers of another.
+    """
+    BLOCK_SIZE = 100
+    BLOCK_STRIDE = 26
+
+    def __init__(self, instance_update, scene_query=None, used_numbers=None):
+        self.block = instance_update // self.BLOCK_SIZE
+        self.scene_query = scene_query or SceneQuery()
+        self.used_numbers = used_numbers
+        self.allocated_numbers = dict()
+        self.next_indexes = dict()
+
+    def snapshot(self):
+        """
+        Index the instance number used by each name prefix of the scene nodes and namespaces.
+        The index is only read afterwards, so allocators of other variants can share it.
+        """
+        self.used_numbers = dict()
+        self.allocated_numbers = dict()
+        self.next_indexes = dict()
+        for name in self.scene_query.get_node_names() + self.scene_query.get_namespaces():
+            # Only the last part of a nested namespace can be renamed.
+            match = re.match(r"^(.*_)(\d{3,})$", name.rsplit(":", 1)[-1])
+            if match:
+                self.used_numbers.setdefault(match.group(1), set()).add(int(match.group(2)))
+
+    def get_number(self, index):
+        """
+        Get the instance number at the given position of the blocks of the variant.
+        :param index: position, from 0
+        :type index: int
+        :returns: instance number
+        :rtype: int
+        """
+        block = self.block + self.BLOCK_STRIDE * (index // (self.BLOCK_SIZE - 1))
+        return block * self.BLOCK_SIZE + index % (self.BLOCK_SIZE - 1) + 1
+
+    def allocate(self, prefix):
+        """
+        Get the next free instance number of a name prefix and keep it as used.
+        :param prefix: name before the instance number (ie: 'ch_ChickA_rig_')
+        :type prefix: str
+        :returns: instance number
+        :rtype: int
+        """
+        if self.used_numbers is None:
+            self.snapshot()
+        used_numbers = self.used_numbers.get(prefix, set())
+        allocated_numbers = self.allocated_numbers.setdefault(prefix, set())
+        index = self.next_indexes.get(prefix, 0)
+        number = self.get_number(index)
+        while number in used_numbers or number in allocated_numbers:
+            logging.warning("Object or namespace '{}{:03d}' exists. Upgrade instance number.".format(prefix, number))
+            index += 1
+            number = self.get_number(index)
+        allocated_numbers.add(number)
+        self.next_indexes[prefix] = index + 1
+        return number
+
+
+def get_variant_instance_update(variant):
+    """
+    Get the base instance number of a sub shot variant: 100 for 'B', 200 for 'C', ..., 2500 for 'Z'.
+    :param variant: variant letter of the sub shot
+    :type variant: str
+    :returns: base instance number, None if the variant is not a letter
+    :rtype: int
+    """
+    if not variant or not variant.isalpha() or len(variant) != 1:
+        return
+    return (ord(variant.upper()) - ord("A")) * InstanceNumberAllocator.BLOCK_SIZE
+
+
+class RenameOperation(collections.namedtuple("RenameOperation", ["kind", "node", "new_name"])):
+    """
+    One step of a rename plan: rename a node, change the namespace of a reference node, or switch a proxy.
+    """
+    __slots__ = ()
+
+    RENAME = "rename"
+    NAMESPACE = "namespace"
+    SWITCH = "switch"
+
+
+class RenamePlan(object):
+    """
+    Renames and namespace changes of the members of one sub shot set, computed before touching the scene.
+    """
+
+    def __init__(self, variant, instance_update, allocator):
+        self.variant = variant
+        self.instance_update = instance_update
+        self.allocator = allocator
+        self.operations = list()
+
+    def add(self, kind, node, new_name=None):
+        """
+        Add a step to the plan.
+        :param kind: RenameOperation kind
+        :type kind: str
+        :param node: node to edit
+        :type node: str
+        :param new_name: new name or namespace of the node
+        :type new_name: str
+        """
+        self.operations.append(RenameOperation(kind, node, new_name))
+
+    def get_targets(self):
+        """
+        Get the names and namespaces given by the plan.
+        :returns: edited node by new name or namespace
+        :rtype: dict
+        """
+        return dict((x.new_name, x.node) for x in self.operations if x.kind != RenameOperation.SWITCH)
+
+    def get_proxies(self):
+        """
+        Get the proxies to switch to their published asset once the plan is applied.
+        :returns: proxy names
+        :rtype: list[str]
+        """
+        return [x.node for x in self.operations if x.kind == RenameOperation.SWITCH]
+
+
+class RenamePlanner(object):
+    """
+    Plan the instance renames of the sub shot sets from the parent scene, check the plans of all variants together,
+    then apply one plan in a single pass which is rolled back if a step fails.
+    The proxies of a plan are switched afterwards, in their own phase (see MglSubShotSet.switch_proxies_to_assets).
+    """
+
+    def __init__(self, core):
+        self.core = core
+
+    def plan(self, assets_filtered, instance_update, allocator=None, variant=None):
+        """
+        Compute the renames and namespace changes of members grouped by asset, without editing the scene.
+        :param assets_filtered: components filtered by asset name
+        :type assets_filtered: dict
+        :param instance_update: base number to iterate instance numbers
+        :type instance_update: int
+        :param allocator: free instance numbers of the variant, from a new snapshot of the scene if not given
+        :type allocator: InstanceNumberAllocator
+        :param variant: variant letter of the sub shot
+        :type variant: str
+        :returns: the plan
+        :rtype: RenamePlan
+        """
+        allocator = allocator or InstanceNumberAllocator(instance_update, self.core.scene_query)
+        plan = RenamePlan(variant, instance_update, allocator)
+        members = [x for members in assets_filtered.values() for x in members]
+        node_types = self.core.scene_query.get_node_types(members)
+        planned_references = set()
+        for name, members in assets_filtered.items():
+            for member in members:
+                is_proxy = bool(re.match(r"proxy_\w+_\d{3}_.*", member))
+                # Check if the member is or has a reference node to change his namespace and rename it.
+                if node_types.get(member) == "reference":
+                    reference_node = member
+                else:
+                    reference_node = self.core.get_top_reference_node(member)
+                if is_proxy and not reference_node:
+                    plan.add(RenameOperation.SWITCH, member)
+                    continue
+                # In case of a reference has multiple top nodes, we don't want to iterate on the same reference node.
+                if reference_node in planned_references:
+                    continue
+                # Take the next free instance number of the variant for this name, only when it is used.
+                new_name = self.core.build_instance_name(member, allocator.allocate(
+                    self.core.get_instance_prefix(member)))
+                if not reference_node:
+                    plan.add(RenameOperation.RENAME, member, new_name)
+                    continue
+                planned_references.add(reference_node)
+                plan.add(RenameOperation.NAMESPACE, reference_node, new_name)
+                if not new_name.endswith("RN"):
+                    new_name = "{}RN".format(new_name)
+                plan.add(RenameOperation.RENAME, reference_node, new_name)
+        return plan
+
+    def plan_variants(self, subshot_sets):
+        """
+        Compute the plan of each sub shot set from the same snapshot of the scene.
+        :param subshot_sets: sub shot names and their set names
+        :type subshot_sets: dict
+        :returns: plan by variant
+        :rtype: dict
+        """
+        plans = collections.OrderedDict()
+        used_numbers = None
+        for variant in sorted(subshot_sets):
+            subshot_set = subshot_sets[variant]
+            instance_update = get_variant_instance_update(variant)
+            if instance_update is None or not subshot_set or not cmds.objExists(subshot_set):
+                continue
+            allocator = InstanceNumberAllocator(instance_update, self.core.scene_query, used_numbers)
+            if used_numbers is None:
+                allocator.snapshot()
+                used_numbers = allocator.used_numbers
+            assets_filtered = self.core.sort_by_asset_name(sorted(self.core.scene_query.get_set_members(subshot_set)))
+            plans[variant] = self.plan(assets_filtered, instance_update, allocator, variant)
+        return plans
+
+    def get_collisions(self, plans):
+        """
+        Find the names and namespaces given to different nodes by one plan or the plans of several variants.
+        :param plans: plan by variant
+        :type plans: dict
+        :returns: colliding name and the variant and node of each plan using it, sorted by name
+        :rtype: list[tuple]
+        """
+        users_by_name = dict()
+        for variant, plan in plans.items():
+            # Go through the operations, a name given twice by the same plan is a collision too.
+            for operation in plan.operations:
+                if operation.kind != RenameOperation.SWITCH:
+                    users_by_name.setdefault(operation.new_name, list()).append((variant, operation.node))
+        return [(x, users_by_name[x]) for x in sorted(users_by_name)
+                if len(set(node for _, node in users_by_name[x])) > 1]
+
+    def apply(self, plan):
+        """
+        Apply the renames and namespace changes of a plan in one pass.
+        If a rename fails, the applied ones are reverted before raising the error.
+        :param plan: the plan to apply
+        :type plan: RenamePlan
+        :returns: node and new name or namespace of each applied step
+        :rtype: list[tuple]
+        :raises RuntimeError: if the plan gives the same name to several nodes, before renaming anything
+        """
+        collisions = self.get_collisions({plan.variant: plan})
+        if collisions:
+            raise RuntimeError("Names planned for several nodes: {}.".format(
+                ", ".join("'{}'".format(new_name) for new_name, _ in collisions)))
+        applied = list()
+        with BulkEditSession("subshotApplyRenamePlan") as session:
+            # Unlock every reference node at once, the session locks them back at its end.
+            session.unlock(set(x.node for x in plan.operations if x.kind == RenameOperation.NAMESPACE))
+            try:
+                for operation in plan.operations:
+                    if operation.kind == RenameOperation.NAMESPACE:
+                        logging.info("Changing the namespace of: '{}'.".format(operation.node))
+                        file_name = cmds.referenceQuery(operation.node, filename=True)
+                        previous = cmds.referenceQuery(operation.node, namespace=True, shortName=True).lstrip(":")
+                        cmds.file(file_name, edit=True, namespace=operation.new_name)
+                        applied.append((operation, file_name, previous))
+                    elif operation.kind == RenameOperation.RENAME:
+                        logging.info("Renaming the element: '{}'.".format(operation.node))
+                        new_name = session.rename(operation.node, operation.new_name)
+                        applied.append((operation, new_name, operation.node))
+            except Exception:
+                logging.error("Renaming failed, reverting the {} applied steps.".format(len(applied)))
+                self._revert(applied, session)
+                raise
+        return [(operation.node, operation.new_name) for operation, _, _ in applied]
+
+    def _revert(self, applied, session):
+        for operation, current, previous in reversed(applied):
+            if operation.kind == RenameOperation.NAMESPACE:
+                cmds.file(current, edit=True, namespace=previous)
+            else:
+                session.rename(current, previous)
+
+
+class FileCacheWarmer(object):
+    """
+    Read files ahead in background threads, so the next reads of these files are served by the file cache of the
+    operating system instead of the network storage. Each path is read once, whatever the number of its loads, in
+    the order of its first use.
+    """
+    CHUNK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, paths, workers=4):
+        self.paths = list(collections.OrderedDict.fromkeys(x for x in paths if x))
+        self.workers = workers
+        self.read_sizes = dict()
+        self.read_errors = dict()
+        self._pool = None
+        self._is_stopped = False
+
+    def start(self):
+        """
+        Start reading the files in the background.
+        :returns: the warmer
+        :rtype: FileCacheWarmer
+        """
+        if self.paths and self._pool is None:
+            self._is_stopped = False
+            self._pool = ThreadPool(min(self.workers, len(self.paths)))
+            for path in self.paths:
+                self._pool.apply_async(self._read, (path,), callback=self._store)
+        return self
+
+    def stop(self):
+        """
+        Stop the reads without waiting for them: the ones not started are skipped, the others end at their next chunk.
+        :returns: read size by path of the reads already done, unreadable and skipped files are not in the dict
+        :rtype: dict
+        """
+        if self._pool is None:
+            return dict(self.read_sizes)
+        self._is_stopped = True
+        # The threads end by themselves, the main thread never waits for a read.
+        self._pool.close()
+        self._pool = None
+        # Log from the main thread only, the reads run in the pool.
+        for path, error in sorted(self.read_errors.items()):
+            logging.warning("Cannot read ahead '{}': {}".format(path, error))
+        return dict(self.read_sizes)
+
+    def _store(self, result):
+        path, size, error = result
+        if error:
+            self.read_errors[path] = error
+        else:
+            self.read_sizes[path] = size
+
+    def _read(self, path):
+        size = 0
+        try:
+            with open(path, "rb") as file_object:
+                while not self._is_stopped:
+                    chunk = file_object.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+        except (IOError, OSError) as error:
+            return path, size, error
+        return path, size, None
+
+
+class ControllerTarget(collections.namedtuple("ControllerTarget", ["controller", "scale_attr", "uniform_scale"])):
+    """
+    Rig controller driven by a proxy controller, with the attribute receiving the scale of the proxy controller.
+    A uniform scale attribute is driven by the X axis of the proxy controller.
+    """
+    __slots__ = ()
+
+
+class ControllerMappingTable(object):
+    """
+    Correspondence from the controllers of the proxies to the controllers of the rigs, by rig convention.
+    The proxy controllers are the transforms of the nurbs curves of the proxy, in their listing order: the first one
+    drives the first controller of the rig, and so on. A rig convention applies when its first controllers exist,
+    the transfer stops at the first missing one.
+    The mapping is resolved once per rig file, the next switches of the same asset reuse the proxy controller paths
+    and the rig controllers without walking the hierarchies again.
+    """
+    RIG_CONTROLLERS = collections.OrderedDict((
+        # NOD rigs: world, global and local controllers, the world one has a float attribute for the uniform scale.
+        ("nod", (ControllerTarget("world_C0_ctl", "global_scale", True),
+                 ControllerTarget("global_C0_ctl", None, False),
+                 ControllerTarget("local_C0_ctl", None, False))),
+        # ATL rigs: god and base controllers.
+        ("atl", (ControllerTarget("m_god_ctl_01", "scale", False),
+                 ControllerTarget("m_base_ctl_01", None, False))),
+    ))
+
+    def __init__(self):
+        self._mappings = dict()
+
+    def clear(self):
+        """
+        Forget the resolved mappings.
+        """
+        self._mappings.clear()
+
+    def get_mapping(self, proxy_name, ref_namespace, rig_path=None):
+        """
+        Get the rig controller driven by each controller of a proxy.
+        :param proxy_name: name of the proxy element
+        :type proxy_name: str
+        :param ref_namespace: namespace of the reference of the rig
+        :type ref_namespace: str
+        :param rig_path: path of the rig file, to reuse the mapping resolved for the same rig
+        :type rig_path: str
+        :returns: proxy controller and rig controller target pairs in transfer order, None if the rig follows no
+                  known convention
+        :rtype: list[tuple]
+        """
+        mapping = self._mappings.get(rig_path) if rig_path else None
+        controllers = self.get_proxy_controllers(proxy_name, mapping[0]) if mapping else None
+        if controllers is None:
+            targets = self.get_rig_controllers(ref_namespace)
+            if targets is None:
+                return
+            relative_paths = self.list_proxy_controllers(proxy_name)[:len(targets)]
+            mapping = (relative_paths, targets[:len(relative_paths)])
+            if rig_path and relative_paths:
+                self._mappings[rig_path] = mapping
+            controllers = self.get_proxy_controllers(proxy_name, relative_paths) or list()
+        return [(controller, target._replace(controller="{}:{}".format(ref_namespace, target.controller)))
+                for controller, target in zip(controllers, mapping[1])]
+
+    def get_rig_controllers(self, ref_namespace):
+        """
+        Find the convention of a rig from its existing controllers.
+        :param ref_namespace: namespace of the reference of the rig
+        :type ref_namespace: str
+        :returns: controllers of the rig without namespace, None if the rig follows no known convention
+        :rtype: list[ControllerTarget]
+        """
+        names = ["{}:{}".format(ref_namespace, x.controller) for targets in self.RIG_CONTROLLERS.values()
+                 for x in targets]
+        existing = set(cmds.ls(names) or list())
+        for targets in self.RIG_CONTROLLERS.values():
+            found = list()
+            for target in targets:
+                if "{}:{}".format(ref_namespace, target.controller) not in existing:
+                    break
+                found.append(target)
+            if not found:
+                continue
+            first = found[0]
+            # The uniform scale attribute is unique to the root controller of the convention.
+            if first.uniform_scale and not cmds.attributeQuery(first.scale_attr, exists=True,
+                                                               node="{}:{}".format(ref_namespace, first.controller)):
+                continue
+            return found
+
+    def list_proxy_controllers(self, proxy_name):
+        """
+        Walk the hierarchy of a proxy to find its controllers.
+        :param proxy_name: name of the proxy element
+        :type proxy_name: str
+        :returns: paths of the controllers relative to the proxy, an empty path for the proxy itself
+        :rtype: list[str]
+        """
+        proxy_paths = cmds.ls(proxy_name, long=True)
+        if not proxy_paths:
+            return list()
+        shapes = cmds.listRelatives(proxy_name, allDescendents=True, noIntermediate=True, type="nurbsCurve",
+                                    fullPath=True) or list()
+        relative_paths = list()
+        for shape in shapes:
+            relative_path = shape.rsplit("|", 1)[0][len(proxy_paths[0]) + 1:]
+            if relative_path not in relative_paths:
+                relative_paths.append(relative_path)
+        return relative_paths
+
+    def get_proxy_controllers(self, proxy_name, relative_paths):
+        """
+        Get the controllers of a proxy from their relative paths.
+        :param proxy_name: name of the proxy element
+        :type proxy_name: str
+        :param relative_paths: paths of the controllers relative to the proxy
+        :type relative_paths: list[str]
+        :returns: shortest unique names of the controllers, None if one of them does not exist
+        :rtype: list[str]
+        """
+        proxy_paths = cmds.ls(proxy_name, long=True)
+        if not proxy_paths:
+            return
+        paths = ["|".join(x for x in (proxy_paths[0], relative_path) if x) for relative_path in relative_paths]
+        if not paths:
+            return list()
+        # Short and long names are listed in the same order.
+        long_names = cmds.ls(paths, long=True) or list()
+        if len(long_names) != len(set(paths)):
+            return
+        short_by_long = dict(zip(long_names, cmds.ls(paths)))
+        return [short_by_long[x] for x in paths]
+
+
+class ShotCache(object):
+    """
+    Bounded cache of the shot relationships queried on Shotgrid.
+    Entries expire after the time to live and the least recently used ones are evicted first.
+    The cache is shared with the Shotgrid queries of the UI worker thread, each access holds its lock.
+    """
+
+    def __init__(self, ttl=300, max_size=256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the data stored for the given key if it is still valid.
+        :param key: cache key (ie: (project id, shot code))
+        :type key: tuple
+        :returns: stored data, None if missing or expired
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            stored_at, data = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                return
+            # Put the entry back at the end to mark it as the most recently used.
+            self._entries[key] = entry
+            return data
+
+    def set(self, key, data):
+        """
+        Store data for the given key and evict the least recently used entries over the max size.
+        :param key: cache key (ie: (project id, shot code))
+        :type key: tuple
+        :param data: data to store
+        :type data: dict
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), data)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, shot_code=None):
+        """
+        Remove the entries of the given shot, or every entry.
+        :param shot_code: name of the shot
+        :type shot_code: str
+        """
+        with self._lock:
+            if not shot_code:
+                self._entries.clear()
+                return
+            for key in [x for x in self._entries if x[-1] == shot_code]:
+                del self._entries[key]
+
+
+class ShotTopology(object):
+    """
+    In memory graph of the parent/sub shot relationships prefetched from Shotgrid.
+    """
+
+    def __init__(self):
+        self.shots = dict()
+
+    def add_shots(self, project_id, data_shots, shot_codes=None):
+        """
+        Store the given shots. Omitted shots, and requested shots which were not found, are stored as empty.
+        :param project_id: id of the project
+        :type project_id: int
+        :param data_shots: Shotgrid shot data with 'code', 'shots' and 'parent_shots' fields
+        :type data_shots: list[dict]
+        :param shot_codes: names of the requested shots
+        :type shot_codes: list[str]
+        """
+        for shot_code in shot_codes or list():
+            self.shots[(project_id, shot_code)] = dict()
+        for data_shot in data_shots:
+            if data_shot.get("sg_status_list") == "omit":
+                data_shot = dict(data_shot, shots=list(), parent_shots=list(), omitted=True)
+            self.shots[(project_id, data_shot["code"])] = data_shot
+
+    def get(self, key):
+        """
+        Get the data of a prefetched shot.
+        :param key: (project id, shot code)
+        :type key: tuple
+        :returns: shot data, empty if the shot was not found, None if the shot was not prefetched
+        :rtype: dict
+        """
+        data_shot = self.shots.get(key)
+        if data_shot is not None and data_shot.get("omitted"):
+            return dict()
+        return data_shot
+
+    def get_sub_shots(self, key):
+        """
+        Get the names of the sub shots of a prefetched shot.
+        :param key: (project id, shot code)
+        :type key: tuple
+        :returns: slave shot names
+        :rtype: list[str]
+        """
+        return [slave.get("name") for slave in (self.get(key) or dict()).get("shots", list())]
+
+    def get_parent_shots(self, key):
+        """
+        Get the names of the parent shots of a prefetched shot.
+        :param key: (project id, shot code)
+        :type key: tuple
+        :returns: parent shot names
+        :rtype: list[str]
+        """
+        return [parent.get("name") for parent in (self.get(key) or dict()).get("parent_shots", list())]
+
+    def invalidate(self, shot_code=None):
+        """
+        Forget a prefetched shot and the shots linked to it, or every shot.
+        :param shot_code: name of the shot
+        :type shot_code: str
+        """
+        if not shot_code:
+            self.clear()
+            return
+        # The shots linked to it hold the other end of its relationships.
+        linked_codes = {shot_code}
+        for key, data_shot in self.shots.items():
+            links = [x.get("name") for x in data_shot.get("shots", list()) + data_shot.get("parent_shots", list())]
+            if key[-1] == shot_code:
+                linked_codes.update(links)
+            elif shot_code in links:
+                linked_codes.add(key[-1])
+        for key in [x for x in self.shots if x[-1] in linked_codes]:
+            del self.shots[key]
+
+    def clear(self):
+        """
+        Forget every prefetched shot.
+        """
+        self.shots = dict()
+
+
+class SubShotFinding(collections.namedtuple("SubShotFinding", ["kind", "subshot", "subshot_set", "component",
+                                                               "top_node", "progress"])):
+    """
+    One result of the streaming sanity check of the sub shot sets.
+    Progress kinds mark the steps of the check, the other kinds are issues which fail it.
+    """
+    __slots__ = ()
+
+    # Progress inside a step, with the done fraction of the step.
+    PROGRESS = "progress"
+    # Steps of the check.
+    SUBSHOT_STARTED = "subshot_started"
+    SUBSHOT_CHECKED = "subshot_checked"
+    SETS_CHECKED = "sets_checked"
+    DUPLICATED_CHECKED = "duplicated_checked"
+    MISSING_CHECKED = "missing_checked"
+    # Issues fixed by removing the component from its set.
+    OBJECT_SET = "object_set"
+    AUDIO = "audio"
+    NON_TOP = "non_top"
+    ASSEMBLY = "assembly"
+    BLACK_LISTED = "black_listed"
+    # Issues without fix.
+    SET_MISSING = "set_missing"
+    SET_EMPTY = "set_empty"
+    DUPLICATED = "duplicated"
+    MISSING = "missing"
+    RENAME_COLLISION = "rename_collision"
+
+    MESSAGES = {
+        SET_MISSING: "Set does not exist.\n\n",
+        SET_EMPTY: "Set is empty, it needs to be filled.\n\n",
+        OBJECT_SET: "Set object found '{}'.\n",
+        AUDIO: "Audio object found '{}'.\n",
+        NON_TOP: "Non top dag node: '{}'.\n",
+        ASSEMBLY: "Is an assembly: '{}'.\n",
+        BLACK_LISTED: "Is an extra assembly or camera: '{}'.\n",
+        DUPLICATED: "{}\n",
+        MISSING: "{}\n",
+        RENAME_COLLISION: "Name planned for several nodes: '{}'.\n",
+    }
+
+    def __new__(cls, kind, subshot=None, subshot_set=None, component=None, top_node=None, progress=None):
+        return super(SubShotFinding, cls).__new__(cls, kind, subshot, subshot_set, component, top_node, progress)
+
+    @property
+    def is_issue(self):
+        """
+        Check if the finding fails the sanity check.
+        :rtype: bool
+        """
+        return self.kind in self.MESSAGES
+
+    @property
+    def is_step(self):
+        """
+        Check if the finding ends a step of the check, to report the progress.
+        :rtype: bool
+        """
+        return self.kind in (self.SUBSHOT_CHECKED, self.SET_MISSING, self.SET_EMPTY, self.SETS_CHECKED,
+                             self.DUPLICATED_CHECKED, self.MISSING_CHECKED)
+
+
+class SubShotCheckReport(object):
+    """
+    Report of the sanity check of the sub shot sets, built from the streamed findings.
+    The fix data is updated with each finding, the message is only formatted when asked.
+    """
+
+    def __init__(self, shot_code):
+        self.shot_code = shot_code
+        self.findings = list()
+        self.state = True
+        self.data = dict()
+        self.is_complete = False
+        self._current_data = None
+
+    def add(self, finding):
+        """
+        Add a finding to the report.
+        :param finding: result of the check
+        :type finding: SubShotFinding
+        """
+        if finding.kind == finding.PROGRESS:
+            return
+        self.findings.append(finding)
+        if finding.is_issue:
+            self.state = False
+        kind = finding.kind
+        if kind == finding.SUBSHOT_STARTED:
+            self._current_data = {"remove": [], "add": []}
+        elif kind == finding.NON_TOP:
+            self._current_data["add"].append(finding.top_node)
+            self._current_data["remove"].append(finding.component)
+        elif kind in (finding.OBJECT_SET, finding.AUDIO, finding.ASSEMBLY, finding.BLACK_LISTED):
+            self._current_data["remove"].append(finding.component)
+        elif kind == finding.SUBSHOT_CHECKED:
+            self.data.update({finding.subshot_set: self._current_data})
+        elif kind == finding.SETS_CHECKED:
+            self.data.update({"duplicated": list()})
+        elif kind == finding.DUPLICATED:
+            self.data["duplicated"].append(finding.component)
+        elif kind == finding.MISSING:
+            self.data.setdefault("missing", list()).append(finding.component)
+        elif kind == finding.RENAME_COLLISION:
+            self.data.setdefault("collisions", list()).append(finding.component)
+
+    @property
+    def message(self):
+        """
+        Format the message of the report from its findings.
+        :rtype: str
+        """
+        if self.state and self.is_complete:
+            return "Congrats.\n\nEverything is okay.\nReady to build the sub shots.\n"
+        lines = list()
+        is_okay = True
+        for finding in self.findings:
+            kind = finding.kind
+            if kind == finding.SUBSHOT_STARTED:
+                lines.append("{}_{}:\n".format(self.shot_code, finding.subshot))
+                is_okay = True
+            elif kind == finding.SUBSHOT_CHECKED:
+                if is_okay:
+                    lines.append("Everything is okay.\n")
+                lines.append("\n")
+            elif kind == finding.SETS_CHECKED:
+                lines.append("Duplicated on sets: (no fix)\n")
+                is_okay = True
+            elif kind == finding.DUPLICATED_CHECKED:
+                if is_okay:
+                    lines.append("Everything is okay.\n")
+                lines.append("\nMissing top nodes: (no fix)\n")
+            elif kind == finding.MISSING_CHECKED:
+                lines.append("\nRename collisions: (no fix)\n")
+            elif finding.is_issue:
+                lines.append(finding.MESSAGES[kind].format(finding.component))
+                is_okay = False
+        return "".join(lines)
+
+    def to_dict(self):
+        """
+        Get the report as a dictionary, the format used by the fix and the share step.
+        :returns: state, fix data and message of the report
+        :rtype: dict
+        """
+        return {"state": self.state, "data": self.data, "message": self.message}
+
+
+class SubShotValidator(object):
+    """
+    Incremental sanity check of the sub shot sets, run in small time slices while Maya is idle.
+    Set membership and DAG callbacks mark the sub shots to check again, the findings of the others are kept.
+    The missing top nodes are only checked again for the nodes which changed: the members added to or removed from
+    the checked sets, and the nodes added, removed, reparented or renamed in the scene.
+    """
+
+    def __init__(self, core, time_slice=0.02, chunk_size=500):
+        self.core = core
+        self.time_slice = time_slice
+        self.chunk_size = chunk_size
+        self.subshot_sets = dict()
+        self.shot_code = None
+        self.membership_index = MembershipIndex()
+        self.findings_by_subshot = dict()
+        self.overlap_findings = list()
+        self.dirty_subshots = set()
+        self.is_overlap_dirty = False
+        self.missing = set()
+        self.dirty_nodes = set()
+        self.is_missing_dirty = True
+        self.on_validated = None
+        self.on_invalidated = None
+        self.callback_ids = list()
+        self.idle_callback_id = None
+        self._subshot_by_set = dict()
+        self._set_callback_ids = dict()
+        self._check = None
+        self._check_subshot = None
+        self._check_findings = list()
+        self._previous_members_by_set = dict()
+
+    def watch(self, subshot_sets, shot_code):
+        """
+        Start checking the given sub shot sets, and check them again each time they change.
+        :param subshot_sets: sub shot names and their set names
+        :type subshot_sets: dict
+        :param shot_code: name of the parent shot
+        :type shot_code: str
+        """
+        self.stop()
+        self.subshot_sets = dict(subshot_sets)
+        self.shot_code = shot_code
+        self._subshot_by_set = dict((y, x) for x, y in self.subshot_sets.items() if y)
+        for subshot_set in self._subshot_by_set:
+            self._add_set_callback(subshot_set)
+        self.callback_ids = [
+            OpenMaya.MDGMessage.addNodeAddedCallback(self._on_set_added, "objectSet"),
+            OpenMaya.MDGMessage.addNodeRemovedCallback(self._on_set_removed, "objectSet"),
+            OpenMaya.MDGMessage.addNodeAddedCallback(self._on_dag_added, "dagNode"),
+            OpenMaya.MDGMessage.addNodeRemovedCallback(self._on_dag_removed, "dagNode"),
+            OpenMaya.MDagMessage.addParentAddedCallback(self._on_parent_changed),
+            OpenMaya.MDagMessage.addParentRemovedCallback(self._on_parent_changed),
+            OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject(), self._on_name_changed)]
+        for message in (OpenMaya.MSceneMessage.kAfterOpen, OpenMaya.MSceneMessage.kAfterNew):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addCallback(message, self._on_scene_changed))
+        self.invalidate()
+
+    def stop(self):
+        """
+        Stop listening to the scene changes and forget the results.
+        """
+        callback_ids = self.callback_ids + list(self._set_callback_ids.values())
+        if self.idle_callback_id is not None:
+            callback_ids.append(self.idle_callback_id)
+        if callback_ids:
+            OpenMaya.MMessage.removeCallbacks(callback_ids)
+        self.callback_ids = list()
+        self._set_callback_ids = dict()
+        self.idle_callback_id = None
+        self.subshot_sets = dict()
+        self.findings_by_subshot = dict()
+        self.overlap_findings = list()
+        self.dirty_subshots = set()
+        self.is_overlap_dirty = False
+        self.missing = set()
+        self.dirty_nodes = set()
+        self.is_missing_dirty = True
+        self.membership_index.clear()
+        self._check = None
+        self._previous_members_by_set = dict()
+
+    def invalidate(self, subshots=None, nodes=None):
+        """
+        Mark sub shots and nodes to check again, and the comparison between all sets.
+        Without any argument, everything is checked again.
+        :param subshots: suffixes of the sub shots
+        :type subshots: list or set
+        :param nodes: names of the nodes which may have become missing, or not missing anymore
+        :type nodes: list or set
+        """
+        if subshots is None and nodes is None:
+            subshots = self.subshot_sets.keys()
+            self.is_missing_dirty = True
+        elif not subshots and not nodes:
+            return
+        self.dirty_subshots.update(subshots or list())
+        self.dirty_nodes.update(nodes or list())
+        # The comparison between all sets, or the set being checked, has changed: start the check again.
+        if self._check_subshot is None or self._check_subshot in self.dirty_subshots:
+            self._check = None
+        self.is_overlap_dirty = True
+        if self.idle_callback_id is None and self.subshot_sets:
+            self.idle_callback_id = OpenMaya.MEventMessage.addEventCallback("idle", self._on_idle)
+        # Tell the views of the set members which sets may have changed.
+        if self.on_invalidated and subshots:
+            self.on_invalidated(list(subshots))
+
+    def is_valid(self):
+        """
+        Check if every result is up to date with the scene.
+        :rtype: bool
+        """
+        return bool(self.subshot_sets) and not self.dirty_subshots and not self.is_overlap_dirty
+
+    def get_state(self):
+        """
+        Get the state of the sanity check from the cached results.
+        :returns: True if the sets are okay, False if there are issues, None if the check is not up to date
+        :rtype: bool
+        """
+        if not self.is_valid():
+            return None
+        findings = self.overlap_findings + [x for y in self.findings_by_subshot.values() for x in y]
+        return not any(finding.is_issue for finding in findings)
+
+    def get_report(self):
+        """
+        Get the report of the sanity check from the cached results.
+        :returns: state, fix data and message of the check, None if the check is not up to date
+        :rtype: dict
+        """
+        if not self.is_valid():
+            return None
+        report = SubShotCheckReport(self.shot_code)
+        for subshot in self.subshot_sets:
+            for finding in self.findings_by_subshot.get(subshot, list()):
+                report.add(finding)
+        for finding in self.overlap_findings:
+            report.add(finding)
+        report.is_complete = True
+        return report.to_dict()
+
+    def validate(self, time_limit=None):
+        """
+        Check the dirty sub shots and the comparison between all sets.
+        :param time_limit: time in seconds to stop after, check everything if not given
+        :type time_limit: float
+        :returns: True if every result is up to date
+        :rtype: bool
+        """
+        end_time = time.time() + time_limit if time_limit is not None else None
+        while end_time is None or time.time() < end_time:
+            if self._check is None and not self._start_next_check():
+                return True
+            try:
+                finding = next(self._check)
+            except StopIteration:
+                self._end_check()
+                continue
+            # Progress findings only hand the time back, they are not kept.
+            if finding.kind != finding.PROGRESS:
+                self._check_findings.append(finding)
+        return False
+
+    def _start_next_check(self):
+        self._check_findings = list()
+        if self.dirty_subshots:
+            # Follow the order of the sub shots to check the sets.
+            subshot = next(x for x in self.subshot_sets if x in self.dirty_subshots)
+            subshot_set = self.subshot_sets[subshot]
+            # Keep the members from before the first try, a restarted check starts from a partial index.
+            if subshot_set not in self._previous_members_by_set:
+                self._previous_members_by_set[subshot_set] = set(self.membership_index.members_by_set.get(
+                    subshot_set, list()))
+            self.membership_index.remove_set(subshot_set)
+            self._check_subshot = subshot
+            self._check = self.core.iter_subshot_set_content(subshot, subshot_set, self.membership_index)
+            return True
+        if self.is_overlap_dirty:
+            self._check_subshot = None
+            self._check = self._iter_overlap()
+            return True
+        return False
+
+    def _iter_overlap(self):
+        # Check the dirty nodes by chunks, so that the check can be paused, then report from the kept results.
+        if self.is_missing_dirty:
+            self.is_missing_dirty = False
+            self.missing = set()
+            self.dirty_nodes.update(self.core.get_scene_index().top_nodes)
+        checked_count = 0
+        while self.dirty_nodes:
+            top_nodes = self.core.get_scene_index().top_nodes
+            ignored = self.core.get_ignored_top_nodes()
+            sets_by_member = self.membership_index.sets_by_member
+            for _ in range(min(self.chunk_size, len(self.dirty_nodes))):
+                node = self.dirty_nodes.pop()
+                if node in top_nodes and node not in ignored and node not in sets_by_member:
+                    self.missing.add(node)
+                else:
+                    self.missing.discard(node)
+                checked_count += 1
+            yield SubShotFinding(SubShotFinding.PROGRESS,
+                                 progress=float(checked_count) / (checked_count + len(self.dirty_nodes)))
+        yield SubShotFinding(SubShotFinding.SETS_CHECKED)
+        for element in self.membership_index.get_duplicated():
+            yield SubShotFinding(SubShotFinding.DUPLICATED, component=element)
+        yield SubShotFinding(SubShotFinding.DUPLICATED_CHECKED)
+        for element in sorted(self.missing):
+            yield SubShotFinding(SubShotFinding.MISSING, component=element)
+
+    def _end_check(self):
+        if self._check_subshot is not None:
+            self.findings_by_subshot[self._check_subshot] = self._check_findings
+            self.dirty_subshots.discard(self._check_subshot)
+            # The members added to or removed from the set may have become missing, or not missing anymore.
+            subshot_set = self.subshot_sets[self._check_subshot]
+            previous_members = self._previous_members_by_set.pop(subshot_set, set())
+            self.dirty_nodes.update(previous_members.symmetric_difference(
+                self.membership_index.members_by_set.get(subshot_set, list())))
+        else:
+            self.overlap_findings = self._check_findings
+            self.is_overlap_dirty = False
+        self._check = None
+        self._check_subshot = None
+        self._check_findings = list()
+
+    def _add_set_callback(self, subshot_set):
+        selection = OpenMaya.MSelectionList()
+        try:
+            selection.add(subshot_set)
+        except RuntimeError:
+            return
+        self._set_callback_ids[subshot_set] = OpenMaya.MObjectSetMessage.addSetMembersModifiedCallback(
+            selection.getDependNode(0), self._on_set_members_modified, subshot_set)
+
+    def _invalidate_member(self, member):
+        self.invalidate(set(self._subshot_by_set[x] for x in self.membership_index.get_sets(member)))
+
+    def _on_idle(self, *args):
+        try:
+            is_valid = self.validate(self.time_slice)
+        except Exception as error:
+            logging.warning("Sub shot sets validation failed: {}".format(error))
+            self.stop()
+            return
+        if not is_valid:
+            return
+        # Nothing left to check, stop using idle time until the next change.
+        OpenMaya.MMessage.removeCallback(self.idle_callback_id)
+        self.idle_callback_id = None
+        if self.on_validated:
+            self.on_validated(self.get_state())
+
+    def _on_set_members_modified(self, node, subshot_set):
+        self.invalidate([self._subshot_by_set[subshot_set]])
+
+    def _on_set_added(self, node, *args):
+        subshot_set = OpenMaya.MFnDependencyNode(node).name()
+        if subshot_set not in self._subshot_by_set:
+            return
+        self._add_set_callback(subshot_set)
+        self.invalidate([self._subshot_by_set[subshot_set]])
+
+    def _on_set_removed(self, node, *args):
+        subshot_set = OpenMaya.MFnDependencyNode(node).name()
+        if subshot_set not in self._subshot_by_set:
+            return
+        callback_id = self._set_callback_ids.pop(subshot_set, None)
+        if callback_id is not None:
+            OpenMaya.MMessage.removeCallback(callback_id)
+        self.invalidate([self._subshot_by_set[subshot_set]])
+
+    def _invalidate_top_node(self, dag_path):
+        # A node added under, or removed from, a top node can change whether it is ignored (ie: cameras).
+        path = dag_path.fullPathName()
+        if path:
+            self.invalidate(nodes=[path.split("|")[1]])
+
+    def _on_dag_added(self, node, *args):
+        try:
+            dag_path = OpenMaya.MDagPath.getAPathTo(node)
+        except RuntimeError:
+            return
+        self._invalidate_member(dag_path.partialPathName())
+        self._invalidate_top_node(dag_path)
+
+    def _on_dag_removed(self, node, *args):
+        try:
+            name = OpenMaya.MFnDependencyNode(node).name()
+            dag_path = OpenMaya.MDagPath.getAPathTo(node)
+        except RuntimeError:
+            self.invalidate()
+            return
+        self._invalidate_member(name)
+        self.invalidate(nodes=[name])
+        self._invalidate_top_node(dag_path)
+
+    def _on_parent_changed(self, child, parent, *args):
+        self._invalidate_member(child.partialPathName())
+        self.invalidate(nodes=[child.partialPathName()])
+        self._invalidate_top_node(child)
+        self._invalidate_top_node(parent)
+
+    def _on_name_changed(self, node, previous_name, *args):
+        if previous_name in self._subshot_by_set:
+            self.invalidate([self._subshot_by_set[previous_name]])
+        elif previous_name:
+            self._invalidate_member(previous_name)
+            if node.hasFn(OpenMaya.MFn.kDagNode):
+                self.invalidate(nodes=[previous_name, OpenMaya.MFnDependencyNode(node).name()])
+
+    def _on_scene_changed(self, *args):
+        # The sets of the new scene are other nodes.
+        if self._set_callback_ids:
+            OpenMaya.MMessage.removeCallbacks(list(self._set_callback_ids.values()))
+        self._set_callback_ids = dict()
+        for subshot_set in self._subshot_by_set:
+            self._add_set_callback(subshot_set)
+        self.invalidate()
 
 
 class MglSubShotSet(object):
@@ -14,9 +2359,64 @@ class MglSubShotSet(object):
     Callback class for the mglSubShotSet tool.
     """
 
-    def __init__(self):
-        self.engine = sgtk.platform.current_engine()
+    def __init__(self, shot_cache_ttl=300, shot_cache_size=256):
+        self._engine = None
         self.tasks = ("lay", "ani")
+        self.shot_cache = ShotCache(ttl=shot_cache_ttl, max_size=shot_cache_size)
+        self.shot_topology = ShotTopology()
+        self.scene_query = get_scene_query()
+        self.scene_index = SceneIndex(self.scene_query)
+        self.assembly_registry = AssemblyRegistry()
+        self.membership_index = MembershipIndex()
+        self.validator = SubShotValidator(self)
+        self.rename_planner = RenamePlanner(self)
+        self.controller_mappings = ControllerMappingTable()
+
+    @property
+    def engine(self):
+        """
+        Get the current toolkit engine. sgtk is imported on first use, so the module loads without it.
+        :returns: the engine, None if toolkit is not running
+        :rtype: sgtk.platform.Engine
+        """
+        if self._engine is None:
+            try:
+                import sgtk
+            except ImportError:
+                return None
+            self._engine = sgtk.platform.current_engine()
+        return self._engine
+
+    @engine.setter
+    def engine(self, engine):
+        self._engine = engine
+
+    def set_scene_backend(self, backend):
+        """
+        Switch the backend of the scene queries, the scene index is built again with it.
+        :param backend: 'api' or 'cmds'
+        :type backend: str
+        """
+        self.scene_index.remove_callbacks()
+        self.scene_query = get_scene_query(backend)
+        self.scene_index = SceneIndex(self.scene_query)
+
+    def get_scene_index(self):
+        """
+        Get the scene index up to date with the current scene.
+        :returns: the scene index
+        :rtype: SceneIndex
+        """
+        self.scene_index.sync()
+        return self.scene_index
+
+    def remove_callbacks(self):
+        """
+        Remove the scene callbacks registered by this instance.
+        """
+        self.scene_index.remove_callbacks()
+        self.assembly_registry.remove_callbacks()
+        self.validator.stop()
 
     def is_subshot(self, shot_code=None):
         """
@@ -35,8 +2435,8 @@ class MglSubShotSet(object):
                 logging.error(message)
                 return
         # Check the shot name to know if we are in a sub shot. A sub shot has to contain a letter as suffix.
-        is_subshot = re.match(r"^sq\d{4}_sh\d{4}\w$", str(shot_code))
-        if is_subshot:
+        shot = ShotCode.parse(shot_code)
+        if shot and shot.is_subshot:
             return True
         return False
 
@@ -84,7 +2484,8 @@ class MglSubShotSet(object):
                 self.custom_raise(message)
             raise RuntimeError(message)
         # Check the scene context to know if the tool can be used or not.
-        is_subshot = bool(re.match(r"^sq\d{4}_sh\d{4}\w$", str(shot_code)))
+        shot = ShotCode.parse(shot_code)
+        is_subshot = bool(shot and shot.is_subshot)
         has_sub_shots = self.get_sub_shots(shot_code)
         if not on_subshot:
             if task not in self.tasks or is_subshot or not has_sub_shots:
@@ -131,21 +2532,75 @@ class MglSubShotSet(object):
         :rtype: list[str]
         """
         # Query the shot info from the shot name and the current task.
+        data_shot = self.get_shot_relationships(shot_code)
+        if not data_shot:
+            logging.info("No sub shots found. Please verify the shot info on Shotgrid.")
+            return
+        # Get the name of the slave shots.
+        slave_shots = [slave.get("name") for slave in data_shot["shots"]]
+        return slave_shots
+
+    def get_shot_relationships(self, shot_code=None):
+        """
+        Get the sub shots and parent shots of a shot, from the shot cache or from Shotgrid.
+        :param shot_code: name of the shot
+        :type shot_code: str
+        :returns: shot data with 'shots' and 'parent_shots' fields, empty if the shot is not found
+        :rtype: dict
+        """
         context = self.engine.context
         if not shot_code:
             shot_code = context.entity["name"]
-        sub_shot_field = "shots"
+        key = (context.project.get("id"), shot_code)
+        # Prefetched shots are answered without any query.
+        data_shot = self.shot_topology.get(key)
+        if data_shot is not None:
+            return data_shot
+        data_shot = self.shot_cache.get(key)
+        if data_shot is not None:
+            return data_shot
+        # Query both relationships at once, the other one is often asked right after.
         sg_filters = [
             ["project", "is", context.project],
             ["code", "is", shot_code],
             ["sg_status_list", "is_not", "omit"]]
-        data_shot = self.engine.shotgun.find("Shot", filters=sg_filters, fields=[sub_shot_field])
-        if not data_shot:
-            logging.info("No sub shots found. Please verify the shot info on Shotgrid.")
-            return
-        # Get the name of the slave shots.
-        slave_shots = [slave.get("name") for slave in data_shot[0][sub_shot_field]]
-        return slave_shots
+        data_shots = self.engine.shotgun.find("Shot", filters=sg_filters, fields=["shots", "parent_shots"])
+        data_shot = data_shots[0] if data_shots else dict()
+        self.shot_cache.set(key, data_shot)
+        return data_shot
+
+    def prefetch_shot_topology(self, sequence=None, shot_codes=None):
+        """
+        Fetch the relationships, status and cut ranges of every shot of a sequence, or of the given shots,
+        in a single Shotgrid query. The next relationship queries on those shots are answered from memory.
+        :param sequence: name of the sequence (ie: 'sq0010')
+        :type sequence: str
+        :param shot_codes: names of the shots
+        :type shot_codes: list[str]
+        :returns: the shot topology
+        :rtype: ShotTopology
+        """
+        if not sequence and not shot_codes:
+            raise ValueError("A sequence or a list of shot codes is needed to prefetch the shot topology.")
+        context = self.engine.context
+        sg_filters = [["project", "is", context.project]]
+        if sequence:
+            sg_filters.append(["sg_sequence.Sequence.code", "is", sequence])
+        if shot_codes:
+            sg_filters.append(["code", "in", list(shot_codes)])
+        fields = ["code", "shots", "parent_shots", "sg_status_list", "sg_cut_in", "sg_cut_out"]
+        data_shots = self.engine.shotgun.find("Shot", filters=sg_filters, fields=fields)
+        self.shot_topology.add_shots(context.project.get("id"), data_shots, shot_codes)
+        return self.shot_topology
+
+    def invalidate_shot_cache(self, shot_code=None):
+        """
+        Forget the cached relationships of the given shot, or of every shot.
+        :param shot_code: name of the shot
+        :type shot_code: str
+        """
+        self.shot_cache.invalidate(shot_code)
+        self.shot_topology.invalidate(shot_code)
 
     def get_subshot_sets_with_slave_shots(self, slave_shots, shot_code):
         """
@@ -164,7 +2619,10 @@ class MglSubShotSet(object):
             return subshot_sets
         # Per slave shot found, get the suffix and search for a set with good name.
         for slave_shot in slave_shots:
-            suffix = re.findall(r"^sq\d{4}_sh\d{4}(\w$)", slave_shot)[0]
+            subshot = ShotCode.parse(slave_shot)
+            if not subshot or not subshot.is_subshot:
+                continue
+            suffix = subshot.variant
             subshot_set = self.get_target_subshot_set(shot_code, suffix)
             if subshot_set:
                 # If found, add it to the dict.
@@ -179,7 +2637,8 @@ class MglSubShotSet(object):
         :returns: existing sub shot sets. (ie: {'B': None, 'C': None})
         :rtype: dict
         """
-        latest_sets = {re.findall(r"^sq\d{4}_sh\d{4}(\w$)", x)[0]: None for x in slave_shots if slave_shots}
+        subshots = [ShotCode.parse(x) for x in slave_shots or list()]
+        latest_sets = {x.variant: None for x in subshots if x and x.is_subshot}
         return latest_sets
 
     def get_target_subshot_set(self, shot_code, targeted_subshot):
@@ -192,9 +2651,9 @@ class MglSubShotSet(object):
         :returns: subshot set name
         :rtype: str
         """
-        is_subshot = re.match(r"^sq\d{4}_sh\d{4}\w$", str(shot_code))
-        if is_subshot:
-            name = "{}_{}".format(shot_code[:-1], targeted_subshot)
+        shot = ShotCode.parse(shot_code)
+        if shot:
+            name = shot.get_set_name(targeted_subshot)
         else:
             name = "{}_{}".format(shot_code, targeted_subshot)
         subshot_set = cmds.ls(name, type='objectSet')
@@ -212,36 +2671,47 @@ class MglSubShotSet(object):
         :returns: subshot set name
         :rtype: str
         """
-        # Check the content of the selection and get the targeted set.
-        self.check_and_fix_selection()
+        # Check the content of the selection and get the targeted set. Its members can stay in it.
         targeted_set = self.get_target_subshot_set(shot_code, targeted_subshot)
-        if targeted_set:
-            # If the subshot set exists, delete it.
-            cmds.delete(targeted_set)
-        else:
-            # If the subshot set does not exist, build the name of the set.
+        members = self.check_and_fix_selection(select=False, exclude_set=targeted_set)
+        if not targeted_set:
+            # If the subshot set does not exist, create it.
             targeted_set = "{}_{}".format(shot_code, targeted_subshot)
-        return cmds.sets(name=targeted_set)
+            if not members:
+                return cmds.sets(name=targeted_set, empty=True)
+            return cmds.sets(members, name=targeted_set)
+        # If the subshot set exists, replace its content.
+        editor = SetMembershipEditor()
+        editor.remove(targeted_set, self.scene_query.get_set_members(targeted_set))
+        editor.add(targeted_set, members)
+        editor.apply()
+        return targeted_set
 
-    def check_and_fix_selection(self):
+    def check_and_fix_selection(self, select=True, exclude_set=None):
         """
         Check and correct the current selection to set it as a subshot set.
+        :param select: select the corrected nodes
+        :type select: bool
+        :param exclude_set: sub shot set whose members are accepted, the one being replaced
+        :type exclude_set: str
         :returns: new selection with top node names.
         :rtype: set[str]
         """
         # Get the current selection.
-        current_sel = cmds.ls(sl=True)
+        current_sel = self.scene_query.get_selection()
         message = ""
         if not current_sel:
             message += "No selection found.\n"
             self.custom_raise(message)
+        # Get the type of each selected element at once.
+        node_types = self.scene_query.get_node_types(current_sel)
         # Check if the selection has objectSets and stop the process if there are.
-        object_set = [element for element in current_sel if cmds.objectType(element, isType="objectSet")]
+        object_set = [element for element in current_sel if node_types.get(element) == "objectSet"]
         if object_set:
             message += "Sets are not accepted: '{}'.\n".format(", ".join(object_set))
             current_sel = [selected for selected in current_sel if selected not in object_set]
         # Check if the selection has audios and stop the process if there are.
-        object_audio = [element for element in current_sel if cmds.objectType(element, isType="audio")]
+        object_audio = [element for element in current_sel if node_types.get(element) == "audio"]
         if object_audio:
             message += "Audios are not accepted: '{}'.\n".format(', '.join(object_audio))
             current_sel = [selected for selected in current_sel if selected not in object_audio]
@@ -252,7 +2722,7 @@ class MglSubShotSet(object):
             message += "Non dag objects found: '{}'.\n".format(", ".join(non_dag_nodes))
             parent_sel = [selected for selected in current_sel if selected not in non_dag_nodes]
         # Do not accept duplicated elements on sub shot sets.
-        has_duplicated = self.check_duplicated_on_sets(parent_sel)
+        has_duplicated = self.check_duplicated_on_sets(parent_sel, exclude_set=exclude_set)
         if has_duplicated:
             message += "Duplicated on sets found: '{}'.\n".format(', '.join(has_duplicated))
             parent_sel = [selected for selected in current_sel if selected not in has_duplicated]
@@ -270,7 +2740,8 @@ class MglSubShotSet(object):
             message += "Those elements have been removed from your selection before being added to the set."
             cmds.confirmDialog(title="Selection report", message=message, button=["Close"], icon="error",
                                defaultButton="Close", cancelButton="Close")
-        cmds.select(parent_sel)
+        if select:
+            self.scene_query.select(parent_sel)
         return parent_sel
 
     def get_top_nodes_from_list(self, components):
@@ -281,12 +2752,7 @@ class MglSubShotSet(object):
         :returns: top node names
         :rtype: set
         """
-        parent_sel = set()
-        for component in components:
-            # While a component has a parent, continue the research.
-            top_node = self.get_top_node_from_element(component)
-            parent_sel.add(top_node)
-        return parent_sel
+        return set(self.get_scene_index().get_top_nodes(components))
 
     def get_top_node_from_element(self, component):
         """
@@ -296,13 +2762,8 @@ class MglSubShotSet(object):
         :returns: top node name
         :rtype: str
         """
-        # While a component has a parent, continue the research.
-        while True:
-            top_node = cmds.listRelatives(component, parent=True)
-            if not top_node:
-                # When no parent found, add the component inside the list.
-                return component
-            component = top_node[0]
+        # The scene index already knows the top node of each dag node.
+        return self.get_scene_index().get_top_node(component)
 
     def get_non_dag_nodes_on_selection(self, components):
         """
@@ -311,41 +2772,41 @@ class MglSubShotSet(object):
         :type components: list or tuple or set
         """
         non_dag_nodes = list()
-        dag_objects = cmds.ls(assemblies=True)
+        dag_objects = self.get_scene_index().top_nodes
         for component in components:
             if component not in dag_objects:
                 non_dag_nodes.append(component)
         if non_dag_nodes:
             return non_dag_nodes
 
-    def check_duplicated_on_sets(self, components, subshot_sets=None):
+    def get_membership_index(self, subshot_sets=None):
+        """
+        Rebuild the membership index from the given sub shot sets.
+        :param subshot_sets: existing sub shot sets, the ones of the current shot if not given
+        :type subshot_sets: list
+        :returns: the membership index
+        :rtype: MembershipIndex
+        """
+        if not subshot_sets:
+            shot_code = self.engine.context.entity["name"]
+            subshot_sets = self.get_subshot_sets(shot_code)
+        self.membership_index.build(subshot_sets or list())
+        return self.membership_index
+
+    def check_duplicated_on_sets(self, components, subshot_sets=None, exclude_set=None):
         """
-        Get assemblies and check if the current has it.
+        Get the components which are already on a sub shot set.
         :param components: elements in the scene
         :type components: list or tuple or set
         :param subshot_sets: existing sub shot sets
         :type subshot_sets: list
+        :param exclude_set: sub shot set to ignore
+        :type exclude_set: str
         :returns: duplicated nodes
         :rtype: list
         """
-        # Create a list to store duplicated elements inside.
-        duplicated = list()
-        # Get the sub shot sets.
-        if not subshot_sets:
-            shot_code = self.engine.context.entity["name"]
-            subshot_sets = self.get_subshot_sets(shot_code)
-        if not subshot_sets:
-            return duplicated
-        # Get the content for each set.
-        for subshot_set in subshot_sets:
-            set_members = cmds.sets(subshot_set, q=True)
-            if not set_members:
-                continue
-            # Check if the element is on other set and store it inside the list.
-            for set_member in set_members:
-                if set_member in components:
-                    duplicated.append(set_member)
-        return duplicated
+        membership_index = self.get_membership_index(subshot_sets)
+        return membership_index.get_assigned(components, exclude_set)
 
     def check_has_assemblies(self, components):
         """
@@ -355,21 +2816,12 @@ class MglSubShotSet(object):
         :returns: assembly nodes
         :rtype: list
         """
-        if isinstance(components, (str, unicode)):
+        if isinstance(components, STRING_TYPES):
             components = [components]
-        # Get assemblies in the scene.
-        assemblies = assembly_tools.get_scene_assemblies()
-        if not assemblies:
-            return
-        # Get assembly names.
-        assembly_ref_nodes = [str(assembly.refNode) for assembly in assemblies]
-        top_nodes = list()
-        for assembly in assembly_ref_nodes:
-            # For each reference node, get their children top nodes.
-            nodes = cmds.referenceQuery(assembly, nodes=True)
-            top_nodes.extend(cmds.ls(nodes, assemblies=True))
-        # Compare top nodes from reference with assembly top nodes.
-        bad_nodes = [top_node for top_node in top_nodes if top_node in components]
+        # Get the assembly top nodes from the registry, resolved once for the whole check.
+        top_nodes = self.assembly_registry.get_top_nodes()
+        # Compare the components with assembly top nodes.
+        bad_nodes = [component for component in components if component in top_nodes]
         return bad_nodes
 
     def check_has_common_elements(self, nodes_list):
@@ -382,7 +2834,7 @@ class MglSubShotSet(object):
         """
         common_elements = ["trash_grp", "layLights_all_grp", "focusVis_grp", "cycloLay_msh", "animBot"]
         common_elements.extend(self.get_top_node_cameras())
-        if isinstance(nodes_list, (str, unicode)):
+        if isinstance(nodes_list, STRING_TYPES):
             nodes_list = [nodes_list]
         nodes_in_common_elements = [element for element in common_elements if element in nodes_list]
         return nodes_in_common_elements
@@ -402,9 +2854,11 @@ class MglSubShotSet(object):
         if not targeted_set:
             message = "No pipelined set created.\nPlease create one at least before using this feature."
             self.custom_raise(message)
-        self.check_and_fix_selection()
+        members = self.check_and_fix_selection(select=False)
         # Add the selection to the given set.
-        cmds.sets(include=targeted_set, noWarnings=True)
+        editor = SetMembershipEditor()
+        editor.add(targeted_set, members)
+        editor.apply()
         return targeted_set
 
     def remove_to_set(self, targeted_subshot, shot_code):
@@ -423,125 +2877,159 @@ class MglSubShotSet(object):
             message = "No pipelined set created.\nPlease create one at least before using this feature."
             self.custom_raise(message)
         # Remove the selection from the given set.
-        cmds.sets(rm=targeted_set)
+        editor = SetMembershipEditor()
+        editor.remove(targeted_set, self.scene_query.get_selection())
+        editor.apply()
         return targeted_set
 
-    def check_subshot_content(self, subshot_sets):
+    def iter_subshot_content(self, subshot_sets, shot_code=None, check_renames=False):
         """
-        Fix the content of subshot sets.
+        Check the content of sub shot sets, yielding the findings as each set and component is processed.
         :param subshot_sets: sub shot names and their set names
         :type subshot_sets: dict
+        :param shot_code: name of the shot, the one of the current context if not given
+        :type shot_code: str
+        :param check_renames: also plan the instance renames of every variant to find their collisions, which
+            queries the reference of each member
+        :type check_renames: bool
+        :returns: progress steps and issues of the check
+        :rtype: generator[SubShotFinding]
         """
-        shot_code = self.engine.context.entity["name"]
-        # Prepare variables to build a correct report.
-        all_components = list()
-        report = {"state": True, "data": dict(), "message": None}
-        message = str()
+        if not shot_code:
+            shot_code = self.engine.context.entity["name"]
+        membership_index = self.membership_index
+        membership_index.clear()
         for subshot, subshot_set in subshot_sets.items():
-            # Prepare lower keys to build a correct report.
-            data = {"remove": [], "add": []}
-            message += "{}_{}:\n".format(shot_code, subshot)
-            has_set = None
-            if subshot_set:
-                has_set = cmds.objExists(subshot_set)
-            if subshot_set is None or not has_set:
-                report["state"] = False
-                message += "Set does not exist.\n\n"
-                continue
-            # Get components of the current sub shot.
-            components = cmds.sets(subshot_set, query=True)
-            if not components:
-                report["state"] = False
-                message += "Set is empty, it needs to be filled.\n\n".format(subshot_set)
-                continue
-            for component in components:
-                # Check if there are sets.
-                is_set = cmds.objectType(component, isType="objectSet")
-                if is_set:
-                    report["state"] = False
-                    data["remove"].append(component)
-                    message += "Set object found '{}'.\n".format(component)
-                # Check if there are audios.
-                is_audio = cmds.objectType(component, isType="audio")
-                if is_audio:
-                    report["state"] = False
-                    data["remove"].append(component)
-                    message += "Audio object found '{}'.\n".format(component)
-                # Check if there are non-top dag nodes.
-                is_non_dag_node = self.get_non_top_dag_nodes(component)
-                if is_non_dag_node:
-                    report["state"] = False
-                    top_node = self.get_top_node_from_element(component)
-                    all_components.append(top_node)
-                    data["add"].append(top_node)
-                    data["remove"].append(component)
-                    message += "Non top dag node: '{}'.\n".format(component)
-                # Check if there are assembly nodes.
-                is_assembly = self.check_has_assemblies(component)
-                if is_assembly:
-                    report["state"] = False
-                    data["remove"].append(component)
-                    message += "Is an assembly: '{}'.\n".format(component)
-                # Check if there are extra assembly nodes.
-                black_listed = self.check_has_common_elements(component)
-                if black_listed:
-                    report["state"] = False
-                    data["remove"].append(component)
-                    message += "Is an extra assembly or camera: '{}'.\n".format(component)
-            # Check if there are something to report on this sub shot or not.
-            if not any([data["remove"], data["add"]]):
-                message += "Everything is okay.\n"
-            report["data"].update({subshot_set: data})
-            message += "\n"
-            # Merge component from sub shots into a single list to compare them.
-            all_components.extend(components)
-        message += "Duplicated on sets: (no fix)\n"
+            for finding in self.iter_subshot_set_content(subshot, subshot_set, membership_index):
+                yield finding
+        for finding in self.iter_subshot_sets_overlap(membership_index):
+            yield finding
+        if not check_renames:
+            return
+        yield SubShotFinding(SubShotFinding.MISSING_CHECKED)
+        # Names given to different nodes by the renames of several variants collide once the sub shots are built.
+        plans = self.rename_planner.plan_variants(subshot_sets)
+        for new_name, users in self.rename_planner.get_collisions(plans):
+            variants = ", ".join(sorted(set(variant for variant, _ in users)))
+            yield SubShotFinding(SubShotFinding.RENAME_COLLISION, variants, component=new_name)
+
+    def iter_subshot_set_content(self, subshot, subshot_set, membership_index, progress_interval=250):
+        """
+        Check the content of one sub shot set and index its members.
+        :param subshot: suffix of the sub shot
+        :type subshot: str
+        :param subshot_set: name of the sub shot set
+        :type subshot_set: str
+        :param membership_index: index filled with the members of the set
+        :type membership_index: MembershipIndex
+        :param progress_interval: number of components checked between two progress findings
+        :type progress_interval: int
+        :returns: progress steps and issues of the set
+        :rtype: generator[SubShotFinding]
+        """
+        yield SubShotFinding(SubShotFinding.SUBSHOT_STARTED, subshot, subshot_set)
+        has_set = None
+        if subshot_set:
+            has_set = cmds.objExists(subshot_set)
+        if subshot_set is None or not has_set:
+            yield SubShotFinding(SubShotFinding.SET_MISSING, subshot, subshot_set)
+            return
+        # Get components of the current sub shot.
+        components = self.scene_query.get_set_members(subshot_set)
+        if not components:
+            yield SubShotFinding(SubShotFinding.SET_EMPTY, subshot, subshot_set)
+            return
+        # Get the type of each component of the set at once.
+        node_types = self.scene_query.get_node_types(components)
+        for index, component in enumerate(components):
+            # Report the progress of big sets, so that the check can be cancelled or paused.
+            if index and not index % progress_interval:
+                yield SubShotFinding(SubShotFinding.PROGRESS, subshot, subshot_set,
+                                     progress=float(index) / len(components))
+            # Check if there are sets.
+            if node_types.get(component) == "objectSet":
+                yield SubShotFinding(SubShotFinding.OBJECT_SET, subshot, subshot_set, component)
+            # Check if there are audios.
+            if node_types.get(component) == "audio":
+                yield SubShotFinding(SubShotFinding.AUDIO, subshot, subshot_set, component)
+            # Check if there are non-top dag nodes.
+            if self.get_non_top_dag_nodes(component):
+                top_node = self.get_top_node_from_element(component)
+                membership_index.add_member(subshot_set, top_node)
+                yield SubShotFinding(SubShotFinding.NON_TOP, subshot, subshot_set, component, top_node)
+            # Check if there are assembly nodes.
+            if self.check_has_assemblies(component):
+                yield SubShotFinding(SubShotFinding.ASSEMBLY, subshot, subshot_set, component)
+            # Check if there are extra assembly nodes.
+            if self.check_has_common_elements(component):
+                yield SubShotFinding(SubShotFinding.BLACK_LISTED, subshot, subshot_set, component)
+        # Index the components of each sub shot set to compare them.
+        for component in components:
+            membership_index.add_member(subshot_set, component)
+        yield SubShotFinding(SubShotFinding.SUBSHOT_CHECKED, subshot, subshot_set)
+
+    def iter_subshot_sets_overlap(self, membership_index):
+        """
+        Compare the members of all sub shot sets with each other and with the top nodes of the scene.
+        :param membership_index: index of the members of all sub shot sets
+        :type membership_index: MembershipIndex
+        :returns: progress steps, duplicated and missing issues
+        :rtype: generator[SubShotFinding]
+        """
+        yield SubShotFinding(SubShotFinding.SETS_CHECKED)
         # If there are elements on multiple sets, report them.
-        counts = {i: all_components.count(i) for i in all_components}
-        duplicated = list()
-        for element, number in counts.items():
-            if number > 1:
-                report["state"] = False
-                duplicated.append(element)
-                message += "{}\n".format(element)
-        report["data"].update({"duplicated": duplicated})
-        if not duplicated:
-            message += "Everything is okay.\n"
+        for element in membership_index.get_duplicated():
+            yield SubShotFinding(SubShotFinding.DUPLICATED, component=element)
+        yield SubShotFinding(SubShotFinding.DUPLICATED_CHECKED)
         # If there are missing assemblies on sets, report them.
-        message += "\nMissing top nodes: (no fix)\n"
-        missing_assemblies = self.check_missing_assemblies(all_components)
-        if missing_assemblies:
-            report["state"] = False
-            report["data"].update({"missing": missing_assemblies})
-            for element in missing_assemblies:
-                message += "{}\n".format(element)
-        if report["state"]:
-            message = "Congrats.\n\nEverything is okay.\nReady to build the sub shots.\n"
-        report["message"] = message
-        return report
+        for element in self.check_missing_assemblies(membership_index.sets_by_member):
+            yield SubShotFinding(SubShotFinding.MISSING, component=element)
+
+    def check_subshot_content(self, subshot_sets, shot_code=None, fail_fast=False, check_renames=False):
+        """
+        Check the content of subshot sets.
+        :param subshot_sets: sub shot names and their set names
+        :type subshot_sets: dict
+        :param shot_code: name of the shot, the one of the current context if not given
+        :type shot_code: str
+        :param fail_fast: stop at the first issue, when only the state of the report is needed
+        :type fail_fast: bool
+        :param check_renames: also find the collisions between the instance renames of the variants
+        :type check_renames: bool
+        :returns: state, fix data and message of the check
+        :rtype: dict
+        """
+        if not shot_code:
+            shot_code = self.engine.context.entity["name"]
+        report = SubShotCheckReport(shot_code)
+        for finding in self.iter_subshot_content(subshot_sets, shot_code, check_renames):
+            report.add(finding)
+            if fail_fast and not report.state:
+                return report.to_dict()
+        report.is_complete = True
+        return report.to_dict()
 
     def fix_subshot_content(self, check_report):
         """
         Fix the content of sub shot sets.
         :param check_report: result of the check function linked
         :type check_report: dict
+        :returns: the check report, with the members added and removed on each set as 'diff'
+        :rtype: dict
         """
         no_fix = False
         data = check_report.get("data")
+        editor = SetMembershipEditor()
         # For each element on the report, auto fix it depends on the keyword.
         for subshot_set, action in data.items():
-            if subshot_set in ["duplicated", "missing"]:
+            if subshot_set in ["duplicated", "missing", "collisions"]:
                 if data[subshot_set]:
                     no_fix = True
                 continue
-            if action.get("add"):
-                # Add on set.
-                cmds.select(action.get("add"), ne=True)
-                cmds.sets(include=subshot_set, noWarnings=True)
-            if action.get("remove"):
-                # Remove from set.
-                cmds.select(action.get("remove"), ne=True)
-                cmds.sets(rm=subshot_set)
+            editor.add(subshot_set, action.get("add") or list())
+            editor.remove(subshot_set, action.get("remove") or list())
+        # Apply the fixes of every set at once.
+        check_report["diff"] = editor.apply()
         if not no_fix:
             check_report["state"] = True
         return check_report
@@ -550,38 +3038,35 @@ class MglSubShotSet(object):
         """
         Check if there are missing top nodes inside the content result of all sub shot sets.
         :param set_components: content of all sub shot sets
-        :type set_components: list
+        :type set_components: list or set or dict
         :returns: missing elements between set components and all top nodes.
         :rtype: list
         """
-        missing_elements = list()
-        top_nodes = cmds.ls(assemblies=True)
-        black_list = ["trash_grp", "layLights_all_grp", "focusVis_grp", "cycloLay_msh"]
-        top_cams = self.get_top_node_cameras()
-        assemblies = self.check_has_assemblies(top_nodes)
-        top_nodes = [top_node for top_node in top_nodes if top_node not in top_cams and not top_node in assemblies]
-        top_nodes = [top_node for top_node in top_nodes if top_node not in black_list]
-        for node in top_nodes:
-            if node not in set_components:
-                missing_elements.append(node)
+        if not isinstance(set_components, (set, dict)):
+            set_components = set(set_components)
+        top_nodes = sorted(self.get_scene_index().top_nodes)
+        ignored = self.get_ignored_top_nodes()
+        missing_elements = [node for node in top_nodes if node not in ignored and node not in set_components]
         return missing_elements
 
+    def get_ignored_top_nodes(self):
+        """
+        Get the top nodes which do not need to be on a sub shot set.
+        :returns: cameras, assemblies and black listed top nodes
+        :rtype: set
+        """
+        ignored = {"trash_grp", "layLights_all_grp", "focusVis_grp", "cycloLay_msh"}
+        ignored.update(self.get_top_node_cameras())
+        ignored.update(self.assembly_registry.get_top_nodes())
+        return ignored
+
     def get_top_node_cameras(self):
         """
         List all the top nodes that contains cameras as child.
         :returns: top nodes cameras
         :rtype: list
         """
-        cams = cmds.listCameras()
-        top_cams = list()
-        for cam in cams:
-            is_non_dag_node = self.get_non_top_dag_nodes(cam)
-            if is_non_dag_node:
-                top_node = self.get_top_node_from_element(cam)
-                top_cams.append(top_node)
-            else:
-                top_cams.append(cam)
-        return top_cams
+        return list(self.get_scene_index().camera_top_nodes)
 
     def get_subshot_sets(self, shot_code=None):
         """
@@ -594,15 +3079,12 @@ class MglSubShotSet(object):
         if not shot_code:
             context = self.engine.context
             shot_code = context.entity["name"]
-        is_subshot = re.match(r"^sq\d{4}_sh\d{4}\w$", str(shot_code))
-        if is_subshot:
-            name = r"{}_*".format(shot_code[:-1])
-        else:
-            name = r"{}_*".format(shot_code)
+        shot = ShotCode.parse(shot_code)
+        name = r"{}_*".format(shot.parent_name if shot else shot_code)
         # Filter sets components that starts with the shot name.
         filter_sets = cmds.ls(name, type='objectSet')
         # Filter sets that match the naming convention of the sub shot sets.
-        filter_matches = [element for element in filter_sets if re.match(r"^sq\d{4}_sh\d{4}_\w$", element)]
+        filter_matches = [element for element in filter_sets if ShotCode.parse_set_name(element)]
         return filter_matches
 
     def get_subshot_variant(self, shot_code=None):
@@ -616,9 +3098,9 @@ class MglSubShotSet(object):
         if not shot_code:
             context = self.engine.context
             shot_code = context.entity["name"]
-        subshot_variants = re.findall(r"^sq\d{4}_sh\d{4}(\w)$", shot_code)
-        if subshot_variants:
-            return subshot_variants[0]
+        shot = ShotCode.parse(shot_code)
+        if shot:
+            return shot.variant
         return
 
     def get_subshot_set_variant(self, targeted_set):
@@ -629,9 +3111,9 @@ class MglSubShotSet(object):
         :returns: the variant letter
         :rtype: str
         """
-        subshot_variant = re.findall(r"^sq\d{4}_sh\d{4}_(\w)$", targeted_set)
-        if subshot_variant:
-            return subshot_variant[0]
+        subshot = ShotCode.parse_set_name(targeted_set)
+        if subshot:
+            return subshot.variant
         return
 
     def get_subshot_set_variants(self, subshot_sets, shot_code=None):
@@ -646,14 +3128,14 @@ class MglSubShotSet(object):
             context = self.engine.context
             shot_code = context.entity["name"]
         sorted_subshot_sets = dict()
-        is_subshot = re.match(r"^sq\d{4}_sh\d{4}\w$", str(shot_code))
-        if is_subshot:
-            shot_code = shot_code[:-1]
+        shot = ShotCode.parse(shot_code)
+        if not shot:
+            return sorted_subshot_sets
         # Build a dict with variant letter and its set name linked.
         for subshot_set in subshot_sets:
-            set_variants = re.findall(r"^{}_(\w$)".format(shot_code), str(subshot_set))
-            if set_variants:
-                sorted_subshot_sets[set_variants[0]] = subshot_set
+            subshot = ShotCode.parse_set_name(subshot_set)
+            if subshot and subshot.parent_name == shot.parent_name:
+                sorted_subshot_sets[subshot.variant] = subshot_set
         return sorted_subshot_sets
 
     def get_top_reference_nodes_from_list(self, components):
@@ -681,10 +3163,11 @@ class MglSubShotSet(object):
         :returns: top node reference name
         :rtype: str
         """
-        is_referenced = cmds.referenceQuery(component, isNodeReferenced=True)
-        if not is_referenced:
-            return
-        return cmds.referenceQuery(component, topReference=True, referenceNode=True)
+        scene_index = self.get_scene_index()
+        if component in scene_index.top_nodes:
+            # Top nodes are indexed with their reference node.
+            return scene_index.get_reference_node(component)
+        return self.scene_query.get_reference_node(component)
 
     def get_non_dag_nodes_on_set(self, targeted_set):
         """
@@ -693,8 +3176,8 @@ class MglSubShotSet(object):
         :type targeted_set: str
         """
         non_dag_nodes = list()
-        dag_objects = cmds.ls(assemblies=True)
-        set_members = cmds.sets(targeted_set, q=True)
+        dag_objects = self.get_scene_index().top_nodes
+        set_members = self.scene_query.get_set_members(targeted_set)
         for set_member in set_members:
             if set_member not in dag_objects:
                 non_dag_nodes.append(set_member)
@@ -707,8 +3190,7 @@ class MglSubShotSet(object):
         :param component: element in the scene
         :type component: str
         """
-        dag_objects = cmds.ls(assemblies=True)
-        if component not in dag_objects:
+        if component not in self.get_scene_index().top_nodes:
             return True
         return False
 
@@ -718,8 +3200,8 @@ class MglSubShotSet(object):
         :param targeted_set: sub shot set name
         :type targeted_set: str
         """
-        set_members = cmds.sets(targeted_set, q=True)
-        cmds.select(set_members)
+        set_members = self.scene_query.get_set_members(targeted_set)
+        self.scene_query.select(set_members)
 
     def custom_raise(self, message):
         """
@@ -753,19 +3235,11 @@ class MglSubShotSet(object):
         :rtype: list[str]
         """
         # Query the shot info from the shot name.
-        context = self.engine.context
-        if not shot_code:
-            shot_code = context.entity["name"]
-        parent_shot_field = "parent_shots"
-        sg_filters = [
-            ["project", "is", context.project],
-            ["code", "is", shot_code],
-            ["sg_status_list", "is_not", "omit"]]
-        data_shot = self.engine.shotgun.find("Shot", filters=sg_filters, fields=[parent_shot_field])
+        data_shot = self.get_shot_relationships(shot_code)
         if not data_shot:
             cmds.error("No parent shot found.\nPlease verify the shot info on Shotgrid.")
         # Get the name of the slave shots.
-        parent_shots = [slave.get("name") for slave in data_shot[0][parent_shot_field]]
+        parent_shots = [slave.get("name") for slave in data_shot["parent_shots"]]
         return parent_shots
 
     def manage_set_content(self, shot_code=None):
@@ -774,8 +3248,6 @@ class MglSubShotSet(object):
         :param shot_code: name of the shot
         :type shot_code: str
         """
-        # Define a base number for the instance depending on the variant sub shot.
-        rules = {"B": 100, "C": 200, "D": 300, "E": 400, "F": 500, "G": 600, "H": 700, "I": 800, "J": 900}
         if not shot_code:
             context = self.engine.context
             shot_code = context.entity["name"]
@@ -790,160 +3262,215 @@ class MglSubShotSet(object):
         if subshot_variant != set_variant:
             cmds.error("Scene variant and sub shot set variant do not match together.")
         # Get the corresponding base instance number.
-        instance_update = rules.get(subshot_variant)
-        set_members = cmds.sets(targeted_set, q=True)
+        instance_update = get_variant_instance_update(subshot_variant)
+        set_members = self.scene_query.get_set_members(targeted_set)
         set_members.sort()
+        # Resolve the latest rig of every proxy at once, before switching them.
+        proxy_names = [x.split("_")[1] for x in set_members if re.match(r"proxy_\w+_\d{3}_.*", x)]
+        asset_paths = self.get_latest_published_paths(proxy_names)
         # Sort asset by names and upgrade their instance number.
         assets_filtered = self.sort_by_asset_name(set_members)
-        self.increase_instance_number(assets_filtered, instance_update)
-        cmds.delete(targeted_set)
+        allocator = InstanceNumberAllocator(instance_update, self.scene_query)
+        with BulkEditSession("subshotManageSetContent"):
+            plan = self.rename_planner.plan(assets_filtered, instance_update, allocator, subshot_variant)
+            self.rename_planner.apply(plan)
+            # Then switch every proxy: references created with their final namespace, animations transferred after.
+            self.switch_proxies_to_assets(plan.get_proxies(), instance_update, asset_paths, allocator, targeted_set)
+            cmds.delete(targeted_set)
 
     def sort_by_asset_name(self, set_members):
         """
-        Sort a list by asset names based on an underscore name split.
+        Group a list by the asset name token of each name.
         :param set_members: list of component
         :type set_members: list or tuple or set
         :returns: results by asset name (ie: {"ChickA": ["ch_ChickA_rig_001RN", "ch_ChickA_rig_001:all_grp"]})
         :rtype: dict
         """
-        # Build a dict by asset names as key and matching components as values.
-        assets_filtered = dict()
-        for set_member in set_members:
-            # Get the asset name by using the common naming convention.
-            split_name = set_member.split("_")
-            matches = list()
-            # Add a flexibility to avoid index error by splitting the name.
-            if len(split_name) > 1:
-                asset_name = split_name[1]
-            else:
-                asset_name = split_name[0]
-            for y in set_members:
-                # If the name split matches is on the asset, then keep it.
-                if asset_name in y:
-                    matches.append(y)
-            if matches:
-                assets_filtered.update({asset_name: matches})
-        return assets_filtered
+        # Group the components by the asset name token of their name, in one pass.
+        return AssetMemberIndex(set_members).get_groups()
 
-    def increase_instance_number(self, assets_filtered, instance_update):
+    def increase_instance_number(self, assets_filtered, instance_update, asset_paths=None, allocator=None,
+                                 subshot_set=None):
         """
         Increase the instance number by the given base number and rename the component with their namespaces.
         :param assets_filtered: components filtered by asset name
         :type assets_filtered: dict
         :param instance_update: base number to iterate instance numbers
         :type instance_update: int
+        :param asset_paths: latest rig path by asset name for the proxies, queried for the proxies if not given
+        :type asset_paths: dict
+        :param allocator: free instance numbers of the variant, from a new snapshot of the scene if not given
+        :type allocator: InstanceNumberAllocator
+        :param subshot_set: set to add the assets replacing the proxies to
+        :type subshot_set: str
         """
         # Need a dict like this: (ie: {"ChickA": ["ch_ChickA_rig_001RN", "ch_ChickA_rig_001:all_grp"]})
-        reference_nodes = set()
-        for name, members in assets_filtered.items():
-            # The count will be used to iterate the instance number added to the base instance number of the variant.
-            count = 1
-            for member in members:
-                logging.info("Renaming the element: '{}'.".format(member))
-                is_proxy = bool(re.match(r"proxy_\w+_\d{3}_.*", member))
-                # Keep three string groups from the name: before/after instance number of the first namespace, suffix.
-                while not is_proxy:
-                    name_parts = re.findall(r"(\w+_)\d{3}(_\w*)?(:.+)?$", member)
-                    new_instance_number = str(instance_update + count)
-                    if name_parts:
-                        name_parts = name_parts[0]
-                        if len(name_parts) >= 3:
-                            new_name = "{}{}".format(name_parts[0], new_instance_number, name_parts[1])
-                        else:
-                            new_name = "{}{}".format(name_parts[0], new_instance_number)
-                    else:
-                        # Or copy the full name of the member if no match with the expected naming convention.
-                        if member.endswith("_"):
-                            member = member[:-1]
-                        new_name = "{}_{}".format(member, new_instance_number)
-                    # Add a security to know if the name or namespace still exist, if yes, add an interation.
-                    obj_exists = cmds.objExists(new_name)
-                    namespace_exists = cmds.namespace(exists=new_name)
-                    conditions = any((obj_exists, namespace_exists))
-                    if conditions:
-                        count += 1
-                        logging.warning("Object or namespace '{}' exists. Upgrade instance number.".format(new_name))
-                    else:
-                        break
-                # Check if the member is or has a reference node to change his namespace and rename it.
-                reference_node = None
-                is_reference = cmds.objectType(member, isType="reference")
-                has_reference = self.get_top_reference_node(member)
-                if is_reference:
-                    reference_node = member
-                elif has_reference:
-                    reference_node = has_reference
-                elif is_proxy:
-                    logging.info("The component '{}' is a proxy. Will be replaced by a published asset.".format(member))
-                    do_switch = self.switch_proxy_to_asset(member, instance_update)
-                    if not do_switch:
-                        logging.warning("Cannot find assets on SG from the proxy name. Pass.")
-                else:
-                    cmds.rename(member, new_name)
-                # In case of a reference has multiple top nodes, we don't want to iterate on the same reference node.
-                if reference_node and reference_node not in reference_nodes:
-                    reference_nodes.add(reference_node)
-                    # Unlock the reference node to rename it and lock it back.
-                    cmds.lockNode(reference_node, lock=False)
-                    # Get the file from the reference node to rename the namespace of this file.
-                    file_name = cmds.referenceQuery(reference_node, f=True)
-                    cmds.file(file_name, edit=True, namespace=new_name)
-                    if new_name.endswith("RN"):
-                        cmds.rename(reference_node, new_name)
-                    elif not new_name.endswith("RN"):
-                        new_name = "{}RN".format(new_name)
-                        cmds.rename(reference_node, new_name)
-                    cmds.lockNode(new_name, lock=True)
-                count += 1
-
-    def switch_proxy_to_asset(self, proxy_name, instance_update):
+        plan = self.rename_planner.plan(assets_filtered, instance_update, allocator)
+        with BulkEditSession("subshotIncreaseInstanceNumber"):
+            self.rename_planner.apply(plan)
+            self.switch_proxies_to_assets(plan.get_proxies(), instance_update, asset_paths, plan.allocator,
+                                          subshot_set)
+
+    def get_instance_prefix(self, member):
+        """
+        Get the part of the name of a member before its instance number.
+        :param member: name of the component
+        :type member: str
+        :returns: name prefix (ie: 'ch_ChickA_rig_' for 'ch_ChickA_rig_001:all_grp')
+        :rtype: str
+        """
+        # Keep three string groups from the name: before/after instance number of the first namespace, suffix.
+        name_parts = re.findall(r"(\w+_)\d{3,}(_\w*)?(:.+)?$", member)
+        if name_parts:
+            return name_parts[0][0]
+        # Or copy the full name of the member if no match with the expected naming convention.
+        if member.endswith("_"):
+            member = member[:-1]
+        return "{}_".format(member)
+
+    def build_instance_name(self, member, instance_number):
+        """
+        Build the new name of a member with the given instance number.
+        :param member: name of the component
+        :type member: str
+        :param instance_number: new instance number
+        :type instance_number: int
+        :returns: new name
+        :rtype: str
+        """
+        return "{}{:03d}".format(self.get_instance_prefix(member), instance_number)
+
+    def switch_proxy_to_asset(self, proxy_name, instance_update, asset_paths=None, allocator=None):
         """
         Get the asset name from proxy element inside
         :param proxy_name: name of the proxy element name like this: proxy_name_001(+ suffix accepted)
         :type proxy_name: str
         :param instance_update: base number to iterate instance numbers
         :type instance_update: int
+        :param asset_paths: latest rig path by asset name, queried for this proxy only if not given
+        :type asset_paths: dict
+        :param allocator: free instance numbers of the variant, from a new snapshot of the scene if not given
+        :type allocator: InstanceNumberAllocator
         :returns: reference node found and loaded
         :rtype: bool
         """
-        asset_name_parts = proxy_name.split("_")
-        if not len(asset_name_parts) > 2:
-            logging.warning("Proxy does not have a good naming convention, pass it.")
-            return False
-        asset_name = asset_name_parts[1]
-        last_published_file = self.get_latest_published_files(asset_name, "entity.Asset.code", "maya_rig_publish_high_file", "rig")
-        if not last_published_file:
-            return
-        asset_path = last_published_file.get("path").get("local_path")
-        namespace = self.build_proxy_name(asset_name, asset_path, instance_update)
-        try:
-            context = self.engine.context
-            (b_module, b_class_name) = mglImport.get_module_python_class(
-                root_class="Builder",
-                root_module="mglMayaScene",
-                stage_name="build",
-                context=context)
-            b = b_class_name()
-            ref_file = b.create_reference(asset_path, namespace=namespace)
-        except Exception:
-            logging.warning("Import failed: '{}'.".format(asset_name))
-            return
-        # Get the reference node created.
-        current_reference = ref_file.refNode.name()
-        reference_obj = pymel.core.ls(ref_file.nodes(), assemblies=True)
-        referenced_assemblies = [ref.name() for ref in reference_obj]
-        if not current_reference:
-            logging.warning("No asset found to switch the proxy: {}. Rename it only.".format(proxy_name))
-            cmds.rename(proxy_name, namespace)
-        self.copy_proxy_anim_to_reference(referenced_assemblies[0], proxy_name)
-        cmds.delete(proxy_name)
-        cmds.select(referenced_assemblies)
-        shot_code = context.entity["name"]
+        shot_code = self.engine.context.entity["name"]
         # Get the variant of the shot and his linked sub shot set.
-        subshot_variant = self.get_subshot_variant(shot_code)
-        targeted_set = self.get_target_subshot_set(shot_code, subshot_variant)
-        cmds.sets(include=targeted_set, noWarnings=True)
-        return namespace
+        targeted_set = self.get_target_subshot_set(shot_code, self.get_subshot_variant(shot_code))
+        switched = self.switch_proxies_to_assets([proxy_name], instance_update, asset_paths, allocator, targeted_set)
+        return switched.get(proxy_name)
+
+    def switch_proxies_to_assets(self, proxy_names, instance_update, asset_paths=None, allocator=None,
+                                 subshot_set=None):
+        """
+        Replace proxies with a reference of their published asset.
+        Each reference is created unloaded by the pipeline builder, with its build steps and its final namespace, while
+        the rig files are read ahead in the background. Every reference is then loaded in one pass, and the animations
+        of the proxies are transferred once every rig is loaded.
+        :param proxy_names: names of the proxy elements like this: proxy_name_001(+ suffix accepted)
+        :type proxy_names: list[str]
+        :param instance_update: base number to iterate instance numbers
+        :type instance_update: int
+        :param asset_paths: latest rig path by asset name, queried for these proxies only if not given
+        :type asset_paths: dict
+        :param allocator: free instance numbers of the variant, from a new snapshot of the scene if not given
+        :type allocator: InstanceNumberAllocator
+        :param subshot_set: set to add the referenced assemblies to
+        :type subshot_set: str
+        :returns: namespace of the new reference by switched proxy name
+        :rtype: dict
+        """
+        asset_names = collections.OrderedDict()
+        for proxy_name in proxy_names:
+            asset_name_parts = proxy_name.split("_")
+            if not len(asset_name_parts) > 2:
+                logging.warning("Proxy does not have a good naming convention, pass it: '{}'.".format(proxy_name))
+                continue
+            asset_names[proxy_name] = asset_name_parts[1]
+        if not asset_names:
+            return dict()
+        if asset_paths is None:
+            asset_paths = self.get_latest_published_paths(asset_names.values())
+        allocator = allocator or InstanceNumberAllocator(instance_update, self.scene_query)
+        switched = collections.OrderedDict()
+        with BulkEditSession("subshotSwitchProxies"):
+            # Read the rig files ahead in the order of the proxies, a rig used by several proxies is read once.
+            cache_warmer = FileCacheWarmer(asset_paths.get(x) for x in asset_names.values()).start()
+            builder = None
+            reference_nodes = collections.OrderedDict()
+            try:
+                for proxy_name, asset_name in asset_names.items():
+                    asset_path = asset_paths.get(asset_name)
+                    if not asset_path:
+                        logging.warning("Cannot find assets on SG from the proxy name '{}'. Pass.".format(proxy_name))
+                        continue
+                    logging.info("The component '{}' is a proxy. Will be replaced by a published asset.".format(
+                        proxy_name))
+                    namespace = self.build_proxy_name(asset_name, asset_path, instance_update, allocator)
+                    try:
+                        builder = builder or self.get_reference_builder()
+                        reference_nodes[proxy_name] = self.create_unloaded_reference(builder, asset_path, namespace)
+                    except Exception:
+                        logging.warning("Import failed: '{}'.".format(asset_name))
+                        continue
+                    switched[proxy_name] = namespace
+                # Load every reference in one pass, their files are read ahead meanwhile.
+                for reference_node in reference_nodes.values():
+                    if not cmds.referenceQuery(reference_node, isLoaded=True):
+                        cmds.file(loadReference=reference_node, loadReferenceDepth="all")
+            finally:
+                cache_warmer.stop()
+            # Transfer the animations of the proxies once every rig is loaded.
+            assemblies = list()
+            for proxy_name, reference_node in reference_nodes.items():
+                referenced_assemblies = cmds.ls(cmds.referenceQuery(reference_node, nodes=True, dagPath=True) or list(),
+                                                assemblies=True)
+                if not referenced_assemblies:
+                    logging.warning("No asset found to switch the proxy: {}. Rename it only.".format(proxy_name))
+                    cmds.rename(proxy_name, switched[proxy_name])
+                    continue
+                # The proxy is deleted right after, its curves are moved to the rig instead of duplicated.
+                self.copy_proxy_anim_to_reference(referenced_assemblies[0], proxy_name, move_curves=True,
+                                                  rig_path=asset_paths.get(asset_names[proxy_name]))
+                cmds.delete(proxy_name)
+                assemblies.extend(referenced_assemblies)
+            if subshot_set and assemblies:
+                editor = SetMembershipEditor()
+                editor.add(subshot_set, assemblies)
+                editor.apply()
+        return switched
+
+    def create_unloaded_reference(self, builder, asset_path, namespace):
+        """
+        Create a reference with the build steps of the pipeline builder, without loading it.
+        A builder which does not take the load depth of the reference loads it when it creates it.
+        :param builder: pipeline builder
+        :type builder: mglMayaScene Builder
+        :param asset_path: path of the file to reference
+        :type asset_path: str
+        :param namespace: namespace of the reference
+        :type namespace: str
+        :returns: reference node
+        :rtype: str
+        """
+        try:
+            reference_file = builder.create_reference(asset_path, namespace=namespace, loadReferenceDepth="none")
+        except TypeError:
+            reference_file = builder.create_reference(asset_path, namespace=namespace)
+        return str(reference_file.refNode)
+
+    def get_reference_builder(self):
+        """
+        Get the pipeline builder of the current context, which creates the asset references with the build steps
+        of the pipeline.
+        :returns: the builder
+        :rtype: mglMayaScene Builder
+        """
+        # Imported on first use, it is not needed to load the module.
+        import mglImport
+        _, builder_class = mglImport.get_module_python_class(root_class="Builder", root_module="mglMayaScene",
+                                                             stage_name="build", context=self.engine.context)
+        return builder_class()
 
     def get_latest_published_files(self, name, entity_type, publish_file_type, task):
         """
@@ -976,7 +3503,47 @@ class MglSubShotSet(object):
             return
         return published_files[0]
 
-    def build_proxy_name(self, asset_name, asset_path, instance_update):
+    def get_latest_published_paths(self, names, entity_type="entity.Asset.code",
+                                   publish_file_type="maya_rig_publish_high_file", task="rig"):
+        """
+        Get the local path of the latest published file of each given asset with a single query.
+        :param names: asset names
+        :type names: list or tuple or set
+        :param entity_type: entity field to filter the names on
+        :type entity_type: str
+        :param publish_file_type: published file type to get
+        :type publish_file_type: str
+        :param task: task to get the file
+        :type task: str
+        :returns: local path by asset name, assets without publish are not in the dict
+        :rtype: dict
+        """
+        names = sorted(set(names))
+        if not names:
+            return dict()
+        context = self.engine.context
+        sg_filters = [
+            ["project", "is", context.project],
+            [entity_type, "in", names],
+            ["published_file_type.PublishedFileType.short_name", "is", publish_file_type],
+            ["task.Task.content", "is", task],
+            ["sg_status_list", "is_not", "omit"]]
+        published_files = self.engine.shotgun.find("PublishedFile", filters=sg_filters,
+                                                   fields=["path", "version_number", entity_type])
+        # Keep the highest version of each asset.
+        latest_files = dict()
+        for published_file in published_files:
+            name = published_file.get(entity_type)
+            latest_file = latest_files.get(name)
+            version = published_file.get("version_number") or 0
+            if latest_file is None or version > (latest_file.get("version_number") or 0):
+                latest_files[name] = published_file
+        for name in names:
+            if name not in latest_files:
+                logging.warning("No published file found for '{}'.".format(name))
+        return {name: x.get("path").get("local_path") for name, x in latest_files.items()}
+
+    def build_proxy_name(self, asset_name, asset_path, instance_update, allocator=None):
         """
         Build the proxy name following the shot_namespace template.
         :param asset_name: asset name to import as reference
@@ -984,6 +3551,8 @@ class MglSubShotSet(object):
         :param asset_path: asset path to import as reference
         :type asset_name: str
         :type instance_update: int
+        :param allocator: free instance numbers of the variant, from a new snapshot of the scene if not given
+        :type allocator: InstanceNumberAllocator
         :returns: reference node found and loaded
         """
         # Get the shot_namespace template to build the namespace.
@@ -992,107 +3561,65 @@ class MglSubShotSet(object):
         pf_fields = alembic_template.get_fields(asset_path)
         pf_fields['extra_info'] = pf_fields.get("Task")
         name_start = "_".join((pf_fields["short_asset_type"], asset_name, pf_fields["extra_info"]))
-        equivalents = cmds.ls("{}_*".format(name_start))
-        equivalents.sort()
-
-        # Upgrade the instance number.
-        if equivalents:
-            int_iteration = 1
-            last_iteration = re.findall(name_start + r"_(\d{3})(?:_?\w*)", equivalents[-1])
-            if last_iteration:
-                int_iteration = int(last_iteration[0])
-            else:
-                logging.warning("Not expected name from proxy equivalent '{}', set its instance number as '001'.")
-            if int_iteration > instance_update:
-                new_iteration = int_iteration + 1
-            else:
-                new_iteration = instance_update + int_iteration + 1
-        else:
-            new_iteration = instance_update + 1
-        pf_fields['iteration_number'] = new_iteration
+        # Take the next free instance number of the variant for this asset.
+        allocator = allocator or InstanceNumberAllocator(instance_update, self.scene_query)
+        pf_fields['iteration_number'] = allocator.allocate("{}_".format(name_start))
         # Build the namespace.
         namespace = namespace_template.apply_fields(pf_fields).replace("-", "_")
         return namespace
 
-    def copy_proxy_anim_to_reference(self, ref_assembly, proxy_name):
+    def copy_proxy_anim_to_reference(self, ref_assembly, proxy_name, move_curves=False, rig_path=None):
         """
         Paste the proxy's matrix to the world controller of each referenced assemblies.
         :param ref_assembly: name of the referenced assembly: proxy_ChickMutantA001_001(+ suffix accepted)
         :type ref_assembly: str
         :param proxy_name: name of the proxy element name like this: proxy_name_001(+ suffix accepted)
         :type proxy_name: str
+        :param move_curves: reconnect the animation curves of the proxy instead of duplicating them, when the proxy
+                            is deleted afterwards
+        :type move_curves: bool
+        :param rig_path: path of the rig file, to reuse the controller mapping resolved for the same rig
+        :type rig_path: str
         """
-        # Get info from world/global/local controllers from NOD rigs.
+        # Get the rig controllers driven by the proxy controllers, NOD (world/global/local) or ATL (god/base) rigs.
         ref_namespace = ref_assembly.split(":")[0]
-        world_ctl_name = "{}:world_C0_ctl".format(ref_namespace)
-        global_ctl_name = "{}:global_C0_ctl".format(ref_namespace)
-        local_ctl_name = "{}:local_C0_ctl".format(ref_namespace)
-        scale_attr_name = "global_scale"
-        # Get info from god/base controllers from ATL rigs.
-        god_ctl_name = "{}:m_god_ctl_01".format(ref_namespace)
-        base_ctl_name = "{}:m_base_ctl_01".format(ref_namespace)
-        has_assembly_world_ctl = cmds.objExists(world_ctl_name)
-        has_assembly_global_ctl = cmds.objExists(global_ctl_name)
-        has_assembly_local_ctl = cmds.objExists(local_ctl_name)
-        has_assembly_god_ctl = cmds.objExists(god_ctl_name)
-        has_assembly_base_ctl = cmds.objExists(base_ctl_name)
-        has_scale_attr = None
-        # This attribute is unique on global controllers, it is a float attribute for uniformed scale.
-        if has_assembly_world_ctl:
-            has_scale_attr = cmds.attributeQuery(scale_attr_name, node=world_ctl_name, exists=True)
-        if not any((has_assembly_world_ctl, has_assembly_global_ctl, has_assembly_local_ctl, god_ctl_name, base_ctl_name)):
+        mapping = self.controller_mappings.get_mapping(proxy_name, ref_namespace, rig_path)
+        if mapping is None:
             logging.error("The element '{}' is not prevent to be animated properly. Pass.".format(ref_namespace))
             return
-        try:
-            proxy_controllers_shape = cmds.listRelatives(proxy_name, ad=True, ni=True, type="nurbsCurve")
-            proxy_controllers = list()
-            for ctl in proxy_controllers_shape:
-                proxy_controllers.append(cmds.listRelatives(ctl, parent=True)[0])
-        except (TypeError, ValueError):
+        if not mapping:
             logging.error("No children found inside '{}'. Pass.".format(proxy_name))
             return
-        for count, ctl in enumerate(proxy_controllers):
-            # Count is used to do 3 loops max, and to control the order to copy animations.
-            if count == 0:
-                # Firstly, we copy animation from parent to world or god controller.
-                has_keys = bool(cmds.findKeyframe(ctl, curve=True, animation="objects", at=['translate', 'rotate']))
-                if has_assembly_world_ctl and has_scale_attr:
-                    # By default, we parent the controller to get the same base and avoid attrib without keys.
-                    constraint = cmds.parentConstraint(ctl, world_ctl_name)
-                    cmds.delete(constraint)
-                    if has_keys:
-                        # If the controller has animation keys, copy the animation.
-                        cmds.copyKey(ctl, at=["translate", "rotate"], option="curve", animation="objects")
-                        cmds.pasteKey(world_ctl_name, animation="objects", o="replaceCompletely")
-                    has_scale_keys = bool(cmds.findKeyframe(ctl, curve=True, animation="objects", at="scaleX"))
-                    if has_scale_keys:
-                        # We consider the scale as uniform on this prod, we copy the X axis to the given attribute.
-                        cmds.copyKey(ctl, at=["scaleX"], option="curve", animation="objects")
-                        cmds.pasteKey(world_ctl_name, animation="objects", o="replaceCompletely", at=scale_attr_name)
-                    else:
-                        # Scale parent if no key, to match the scale base.
-                        proxy_uniform_scale = cmds.getAttr("{}.scaleX".format(ctl))
-                        cmds.setAttr("{}.{}".format(world_ctl_name, scale_attr_name), proxy_uniform_scale)
-                elif has_assembly_god_ctl:
-                    # Copy animations.
-                    self.copy_matrix_and_anim(ctl, god_ctl_name, has_keys, copy_scale=True)
-            elif count == 1:
-                # Secondly, we copy animation from sub parent to global or base controller.
-                has_keys = bool(cmds.findKeyframe(ctl, curve=True, animation="objects", at=["translate", "rotate"]))
-                if has_assembly_world_ctl and has_assembly_global_ctl:
-                    self.copy_matrix_and_anim(ctl, global_ctl_name, has_keys)
-                elif has_assembly_god_ctl and has_assembly_base_ctl:
-                    self.copy_matrix_and_anim(ctl, base_ctl_name, has_keys)
-            elif count == 2:
-                # Then we do the same for the local one.
-                has_keys = bool(cmds.findKeyframe(ctl, curve=True, animation="objects", at=["translate", "rotate"]))
-                if has_assembly_world_ctl and has_assembly_global_ctl and has_assembly_local_ctl:
-                    self.copy_matrix_and_anim(ctl, local_ctl_name, has_keys)
-                break
-
-    def copy_matrix_and_anim(self, parent, target, has_keys, copy_scale=False, scale_attr="scale"):
-        """
-        Constraint the target to the parent, delete the constraint and copy/paste the animation curves on the target.
+        # Read the poses and the curves of the controllers at once, before editing the rig.
+        proxy_controllers = [x for x, _ in mapping]
+        world_matrices = self.scene_query.get_world_matrices(proxy_controllers)
+        curves_by_controller = self.scene_query.get_anim_curves(proxy_controllers)
+        transform_attrs = self.get_transform_attributes()
+        # The controllers are copied in the order of the mapping: parent, sub parent then local.
+        for ctl, target in mapping:
+            curves = curves_by_controller.get(ctl, dict())
+            has_keys = any(x in curves for x in transform_attrs)
+            if not target.uniform_scale:
+                self.copy_matrix_and_anim(ctl, target.controller, has_keys, copy_scale=bool(target.scale_attr),
+                                          scale_attr=target.scale_attr or "scale", move_curves=move_curves,
+                                          world_matrix=world_matrices.get(ctl), curves=curves)
+                continue
+            # By default, we match the pose of the controller to get the same base and avoid attrib without keys.
+            self.copy_matrix_and_anim(ctl, target.controller, has_keys, move_curves=move_curves,
+                                      world_matrix=world_matrices.get(ctl), curves=curves)
+            if "scaleX" in curves:
+                # We consider the scale as uniform on this prod, we copy the X axis to the given attribute.
+                self.transfer_anim_curves(ctl, curves, target.controller, {"scaleX": target.scale_attr}, move_curves)
+            else:
+                # Scale parent if no key, to match the scale base.
+                proxy_uniform_scale = cmds.getAttr("{}.scaleX".format(ctl))
+                cmds.setAttr("{}.{}".format(target.controller, target.scale_attr), proxy_uniform_scale)
+
+    def copy_matrix_and_anim(self, parent, target, has_keys, copy_scale=False, scale_attr="scale", move_curves=False,
+                             world_matrix=None, curves=None):
+        """
+        Match the world pose of the target with the parent and drive the target with the animation curves of the
+        parent.
         :param parent: parent object name to get matrix
         :type parent: str
         :param target: target object name to get matrix
@@ -1103,20 +3630,99 @@ class MglSubShotSet(object):
         :type copy_scale: bool
         :param scale_attr:
         :type scale_attr: str
-        """
-        # Parent the target to the parent once.
-        constraint = cmds.parentConstraint(parent, target)
-        cmds.delete(constraint)
+        :param move_curves: reconnect the curves of the parent to the target instead of duplicating them
+        :type move_curves: bool
+        :param world_matrix: world matrix of the parent, queried if not given
+        :type world_matrix: list[float]
+        :param curves: animation curve by attribute of the parent, queried if not given
+        :type curves: dict
+        """
+        # Match the pose of the parent once.
+        self.match_world_pose(parent, target, world_matrix)
+        if curves is None:
+            curves = self.scene_query.get_anim_curves([parent]).get(parent, dict())
         # Copy animation if there are.
         if has_keys:
-            cmds.copyKey(parent, at=["translate", "rotate"], option="curve", animation="objects")
-            cmds.pasteKey(target, animation="objects", o="replaceCompletely")
+            self.transfer_anim_curves(parent, curves, target, self.get_transform_attributes(), move_curves)
         if not copy_scale:
             return
-        has_scale_keys = cmds.findKeyframe(parent, curve=True, animation="objects", at=scale_attr)
-        if has_scale_keys:
-            cmds.copyKey(parent, at=scale_attr, option="curve", animation="objects")
-            cmds.pasteKey(target, animation="objects", o="replaceCompletely", at=scale_attr)
+        scale_attrs = [x for x in curves if x in (scale_attr, scale_attr + "X", scale_attr + "Y", scale_attr + "Z")]
+        if scale_attrs:
+            self.transfer_anim_curves(parent, curves, target, scale_attrs, move_curves)
         else:
             proxy_scale = cmds.getAttr("{}.{}".format(parent, scale_attr))
             cmds.setAttr("{}.{}".format(target, scale_attr), proxy_scale)
+
+    def get_transform_attributes(self):
+        """
+        Get the translate and rotate attributes transferred from a proxy controller to a rig controller.
+        :returns: attribute names
+        :rtype: tuple[str]
+        """
+        return tuple("{}{}".format(x, axis) for x in ("translate", "rotate") for axis in "XYZ")
+
+    def match_world_pose(self, parent, target, world_matrix=None):
+        """
+        Move the target to the world translation and rotation of the parent, like a parent constraint created and
+        deleted at once, without adding nodes to the graph.
+        :param parent: parent object name to get matrix
+        :type parent: str
+        :param target: target object name
+        :type target: str
+        :param world_matrix: world matrix of the parent, queried if not given
+        :type world_matrix: list[float]
+        """
+        if world_matrix is None:
+            world_matrix = self.scene_query.get_world_matrices([parent]).get(parent)
+        if world_matrix is None:
+            logging.warning("Cannot get the world matrix of '{}'. Pass.".format(parent))
+            return
+        transformation = OpenMaya.MTransformationMatrix(OpenMaya.MMatrix(world_matrix))
+        # Express the rotation in the rotate order of the target.
+        rotation = transformation.rotation().reorder(cmds.getAttr("{}.rotateOrder".format(target)))
+        cmds.xform(target, worldSpace=True, rotation=[math.degrees(x) for x in (rotation.x, rotation.y, rotation.z)],
+                   translation=list(transformation.translation(OpenMaya.MSpace.kWorld)))
+
+    def transfer_anim_curves(self, source, curves, target, attributes, move_curves=False):
+        """
+        Drive attributes of the target with the animation curves of the source, without the clipboard.
+        The curves are duplicated with one command, or reconnected from the source when it is deleted afterwards.
+        Curves already driving the target attributes are replaced.
+        :param source: animated node
+        :type source: str
+        :param curves: animation curve by attribute of the source
+        :type curves: dict
+        :param target: node to animate
+        :type target: str
+        :param attributes: source attributes to transfer, or target attribute by source attribute
+        :type attributes: list or tuple or dict
+        :param move_curves: reconnect the curves instead of duplicating them
+        :type move_curves: bool
+        :returns: animated target attributes
+        :rtype: list[str]
+        """
+        if not isinstance(attributes, dict):
+            attributes = dict((x, x) for x in attributes)
+        source_attrs = [x for x in sorted(attributes) if x in curves]
+        if not source_attrs:
+            return list()
+        source_curves = sorted(set(curves[x] for x in source_attrs))
+        if move_curves:
+            new_curves = dict(zip(source_curves, source_curves))
+        else:
+            new_curves = dict(zip(source_curves, cmds.duplicate(source_curves)))
+        previous_curves = self.scene_query.get_anim_curves([target]).get(target, dict())
+        replaced_curves = set()
+        for source_attr in source_attrs:
+            target_attr = attributes[source_attr]
+            curve = curves[source_attr]
+            if move_curves:
+                cmds.disconnectAttr("{}.output".format(curve), "{}.{}".format(source, source_attr))
+            cmds.connectAttr("{}.output".format(new_curves[curve]), "{}.{}".format(target, target_attr), force=True)
+            if previous_curves.get(target_attr) not in (None, curve):
+                replaced_curves.add(previous_curves[target_attr])
+        # The curves coming from a reference cannot be deleted, they are only disconnected.
+        replaced_curves = [x for x in sorted(replaced_curves) if not cmds.referenceQuery(x, isNodeReferenced=True)]
+        if replaced_curves:
+            cmds.delete(replaced_curves)
+        return [attributes[x] for x in source_attrs]
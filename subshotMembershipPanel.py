@@ -0,0 +1,209 @@
+"""
+Live view of the members of the sub shot sets, one column per sub shot.
+
+The lists are Qt item views: only the visible rows are drawn, whatever the size of the sets. The membership changes
+reported by the idle validator of the core are applied row by row, and the search only filters the rows.
+"""
+import bisect
+
+from maya import cmds
+from maya import OpenMayaUI
+from maya import utils
+from PySide2 import QtCore, QtWidgets
+from shiboken2 import wrapInstance
+
+
+def get_maya_main_window():
+    """
+    Get the main window of Maya as a Qt widget.
+    :returns: the main window, None in batch mode
+    :rtype: QtWidgets.QWidget
+    """
+    pointer = OpenMayaUI.MQtUtil.mainWindow()
+    if not pointer:
+        return
+    return wrapInstance(int(pointer), QtWidgets.QWidget)
+
+
+class MemberListModel(QtCore.QAbstractListModel):
+    """
+    Sorted members of one set. A change of the set inserts and removes rows, the views keep their scroll and
+    selection.
+    """
+
+    def __init__(self, parent=None):
+        super(MemberListModel, self).__init__(parent)
+        self.members = list()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.members)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role not in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole):
+            return None
+        return self.members[index.row()]
+
+    def set_members(self, members):
+        """
+        Update the rows with the current members of the set.
+        :param members: member names
+        :type members: list or tuple or set
+        :returns: True if the rows changed
+        :rtype: bool
+        """
+        members = sorted(set(members))
+        previous_members = set(self.members)
+        removed = previous_members.difference(members)
+        added = sorted(set(members).difference(previous_members))
+        if not removed and not added:
+            return False
+        # Reset the model when most of the rows change, it is cheaper than moving them one by one.
+        if len(removed) + len(added) > len(self.members) // 2:
+            self.beginResetModel()
+            self.members = members
+            self.endResetModel()
+            return True
+        root = QtCore.QModelIndex()
+        for row in reversed([x for x, member in enumerate(self.members) if member in removed]):
+            self.beginRemoveRows(root, row, row)
+            del self.members[row]
+            self.endRemoveRows()
+        for member in added:
+            row = bisect.bisect_left(self.members, member)
+            self.beginInsertRows(root, row, row)
+            self.members.insert(row, member)
+            self.endInsertRows()
+        return True
+
+
+class MembershipPanel(QtWidgets.QWidget):
+    """
+    Tool window listing the members of each sub shot set, with a search field filtering every column.
+    Selecting rows selects those members in the scene.
+    """
+
+    def __init__(self, core, parent=None):
+        super(MembershipPanel, self).__init__(parent or get_maya_main_window())
+        self.core = core
+        self.subshot_sets = dict()
+        self.models = dict()
+        self.filter_models = dict()
+        self.labels = dict()
+        self.dirty_subshots = set()
+        self.is_refresh_pending = False
+        self.setWindowFlags(QtCore.Qt.Tool)
+        self.setWindowTitle("Sub shot set members")
+        self.resize(600, 500)
+        main_layout = QtWidgets.QVBoxLayout(self)
+        self.search_field = QtWidgets.QLineEdit()
+        self.search_field.setPlaceholderText("Filter the members...")
+        self.search_field.setClearButtonEnabled(True)
+        self.search_field.textChanged.connect(self.set_filter)
+        main_layout.addWidget(self.search_field)
+        self.columns_layout = QtWidgets.QHBoxLayout()
+        main_layout.addLayout(self.columns_layout)
+
+    def set_subshot_sets(self, subshot_sets):
+        """
+        Build one column per sub shot, when the sub shots or their sets changed.
+        :param subshot_sets: sub shot names and their set names
+        :type subshot_sets: dict
+        """
+        if dict(subshot_sets) == self.subshot_sets:
+            return
+        self.subshot_sets = dict(subshot_sets)
+        while self.columns_layout.count():
+            column = self.columns_layout.takeAt(0).widget()
+            if column:
+                column.deleteLater()
+        self.models = dict()
+        self.filter_models = dict()
+        self.labels = dict()
+        for subshot in sorted(self.subshot_sets):
+            self.columns_layout.addWidget(self._build_column(subshot))
+        self.mark_dirty(self.subshot_sets.keys())
+
+    def mark_dirty(self, subshots=None):
+        """
+        Read the members of the given sub shot sets again, once Maya is idle.
+        :param subshots: suffixes of the sub shots, all of them if not given
+        :type subshots: list or set
+        """
+        self.dirty_subshots.update(self.subshot_sets.keys() if subshots is None else subshots)
+        # A hidden panel is refreshed when it is shown again.
+        if self.is_refresh_pending or not self.isVisible():
+            return
+        self.is_refresh_pending = True
+        utils.executeDeferred(self.refresh)
+
+    def refresh(self):
+        """
+        Update the columns of the changed sub shot sets.
+        """
+        self.is_refresh_pending = False
+        dirty_subshots = self.dirty_subshots.intersection(self.models)
+        self.dirty_subshots = set()
+        for subshot in dirty_subshots:
+            subshot_set = self.subshot_sets.get(subshot)
+            members = list()
+            if subshot_set and cmds.objExists(subshot_set):
+                members = self.core.scene_query.get_set_members(subshot_set)
+            self.models[subshot].set_members(members)
+            self._update_label(subshot)
+
+    def set_filter(self, text):
+        """
+        Show only the members containing the given text, in every column.
+        :param text: text to search
+        :type text: str
+        """
+        for subshot, filter_model in self.filter_models.items():
+            filter_model.setFilterFixedString(text)
+            self._update_label(subshot)
+
+    def showEvent(self, event):
+        super(MembershipPanel, self).showEvent(event)
+        if self.dirty_subshots:
+            self.mark_dirty(list())
+
+    def _build_column(self, subshot):
+        column = QtWidgets.QWidget()
+        column_layout = QtWidgets.QVBoxLayout(column)
+        column_layout.setContentsMargins(0, 0, 0, 0)
+        label = QtWidgets.QLabel()
+        label.setToolTip(self.subshot_sets.get(subshot) or "No set for this sub shot.")
+        column_layout.addWidget(label)
+        model = MemberListModel(column)
+        filter_model = QtCore.QSortFilterProxyModel(column)
+        filter_model.setSourceModel(model)
+        filter_model.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        filter_model.setFilterFixedString(self.search_field.text())
+        view = QtWidgets.QListView()
+        # Same height for every row: the view only lays out and draws the visible ones.
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QtWidgets.QListView.Batched)
+        view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        view.setModel(filter_model)
+        view.selectionModel().selectionChanged.connect(lambda *args: self._on_selection_changed(view))
+        column_layout.addWidget(view)
+        self.models[subshot] = model
+        self.filter_models[subshot] = filter_model
+        self.labels[subshot] = label
+        self._update_label(subshot)
+        return column
+
+    def _update_label(self, subshot):
+        count = self.models[subshot].rowCount()
+        shown_count = self.filter_models[subshot].rowCount()
+        if shown_count == count:
+            self.labels[subshot].setText("{} ({})".format(subshot, count))
+        else:
+            self.labels[subshot].setText("{} ({}/{})".format(subshot, shown_count, count))
+
+    def _on_selection_changed(self, view):
+        members = [x.data() for x in view.selectionModel().selectedIndexes()]
+        if members:
+            self.core.scene_query.select(members)
@@ -1,10 +1,11 @@
 import logging
+import threading
 
 from maya import cmds
-import re
+from maya import utils
 
 from .. import subshotCore
-reload(subshotCore)
+from .. import subshotMembershipPanel
 
 
 class MglSubShotSetUI(object):
@@ -20,9 +21,12 @@ class MglSubShotSetUI(object):
         self.shot_code = None
         self.task = None
         self.win_name = "mglSubShotSet"
-        self.shot_code, self.task = self.core.check_context()
-        self.slave_shots = self.core.get_sub_shots(self.shot_code)
-        self.subshot_sets = self.core.get_subshot_sets_with_slave_shots(self.slave_shots, self.shot_code)
+        self.slave_shots = list()
+        self.subshot_sets = dict()
+        self.data_buttons = list()
+        self.is_loading = False
+        self.loader = None
+        self.membership_panel = None
 
     def init_ui(self):
         """
@@ -48,43 +52,125 @@ class MglSubShotSetUI(object):
         # Row layout for the 2 first buttons.
         row_button_a = cmds.rowLayout(numberOfColumns=2, adj=True, parent=main_layout)
         help_set = "Create a pipelined set from the current selection. Replace the existing one if there are."
-        cmds.button(label="Set from selection", width=btn_width, height=btn_height, ann=help_set,
-                    command=self.set_from_selection, parent=row_button_a)
+        self.data_buttons.append(cmds.button(label="Set from selection", width=btn_width, height=btn_height,
+                                             ann=help_set, command=self.set_from_selection, parent=row_button_a))
         help_tip = "Show a popup to give you some tips about this tool."
         cmds.button(label="Quick help", width=btn_width, height=btn_height, bgc=[0.6, 0.7, 0.5], ann=help_tip,
                     c=self.show_help, parent=row_button_a)
         # Row layout for the 2 middle buttons.
         row_button_b = cmds.rowLayout(numberOfColumns=2, adj=True, parent=main_layout)
         help_add = "Add the current selection to the given pipelined set if there is one at least."
-        cmds.button(label="Add to set", width=btn_width, height=btn_height, ann=help_add,
-                    command=self.add_to_set, parent=row_button_b)
+        self.data_buttons.append(cmds.button(label="Add to set", width=btn_width, height=btn_height, ann=help_add,
+                                             command=self.add_to_set, parent=row_button_b))
         help_remove = "Remove the current selection to the given pipelined set if there is one at least."
-        cmds.button(label="Remove from set", width=btn_width, height=btn_height, ann=help_remove,
-                    c=self.remove_to_set, parent=row_button_b)
+        self.data_buttons.append(cmds.button(label="Remove from set", width=btn_width, height=btn_height,
+                                             ann=help_remove, c=self.remove_to_set, parent=row_button_b))
         # Row layout for the last button.
         row_button_c = cmds.rowLayout(numberOfColumns=2, adj=True, parent=main_layout)
         help_san_check = "Select the components of the targeted sub shot set."
-        self.sc_button = cmds.button(label="Select set members", width=btn_width, height=btn_height, ann=help_san_check,
-                                     c=self.select_set_members, parent=row_button_c)
+        self.data_buttons.append(cmds.button(label="Select set members", width=btn_width, height=btn_height,
+                                             ann=help_san_check, c=self.select_set_members, parent=row_button_c))
         help_san_check = "Launch a sanity check about the content of your subshot sets."
         self.sc_button = cmds.button(label="Sanity Check", width=btn_width, height=btn_height, ann=help_san_check,
                                      c=self.check_and_fix_subshot_sets, parent=row_button_c)
+        self.data_buttons.append(self.sc_button)
+        # Row layout for the members view.
+        row_button_d = cmds.rowLayout(numberOfColumns=1, adj=True, parent=main_layout)
+        help_members = "Show the members of every sub shot set, with a search field."
+        self.data_buttons.append(cmds.button(label="Set members view", height=btn_height, ann=help_members,
+                                             c=self.show_membership_panel, parent=row_button_d))
+        self.set_loading_state(self.is_loading)
+
+    def set_loading_state(self, is_loading):
+        """
+        Disable the controls using the sub shot data while it is loading.
+        :param is_loading: the data is loading
+        :type is_loading: bool
+        """
+        self.is_loading = is_loading
+        if not self.current_win:
+            return
+        for button in self.data_buttons:
+            cmds.button(button, edit=True, enable=not is_loading)
+        cmds.optionMenu(self.parm_subshot, edit=True, enable=not is_loading)
+        if is_loading:
+            cmds.textField(self.parm_shot, edit=True, text="{} (loading...)".format(self.shot_code))
+        else:
+            self.refresh_shot()
+
+    def load_data(self):
+        """
+        Query the sub shots on Shotgrid in a worker thread, the window is filled when the results arrive.
+        """
+        self.set_loading_state(True)
+        self.loader = threading.Thread(target=self._query_shotgrid, args=(self.shot_code,),
+                                       name="mglSubShotSetLoader")
+        self.loader.daemon = True
+        self.loader.start()
+
+    def _query_shotgrid(self, shot_code):
+        # Runs in the worker thread: only Shotgrid is queried here, the scene and the UI are left to the main thread.
+        error = None
+        try:
+            # The relationships are kept in the shot cache of the core for the main thread.
+            self.core.get_shot_relationships(shot_code)
+        except Exception as exception:
+            error = exception
+        utils.executeDeferred(self.on_data_loaded, shot_code, error)
 
-    def callback_check_context(self):
+    def on_data_loaded(self, shot_code, error=None):
         """
-        Compare data scene with the tool's data and refresh the tool's ones if are different.
+        Fill the window with the sub shots and their sets, on the main thread once the Shotgrid queries are done.
+        :param shot_code: name of the shot the data has been loaded for
+        :type shot_code: str
+        :param error: error raised by the Shotgrid queries
+        :type error: Exception
         """
-        # Check the scene context to know if the tool can be used or not.
-        self.shot_code, self.task = self.core.check_context()
-        # Check if there is slave shots to work with.
-        slave_shots = self.core.get_sub_shots(self.shot_code)
-        slave_shots.sort()
-        if slave_shots == self.slave_shots:
+        self.loader = None
+        if not self.current_win or not cmds.window(self.current_win, query=True, exists=True):
             return
-        # If there are slave shots, refresh the UI with them.
-        self.refresh_shot()
+        if error:
+            logging.warning("Cannot load the sub shots of '{}' from Shotgrid: {}".format(shot_code, error))
+        try:
+            # Served from the shot cache filled by the worker.
+            self.shot_code, self.task = self.core.check_context()
+        except Exception:
+            # The tool cannot be used in this context, the error has been shown to the user.
+            cmds.deleteUI(self.current_win, wnd=True)
+            raise
+        self.slave_shots = self.core.get_sub_shots(self.shot_code)
+        self.subshot_sets = self.core.get_subshot_sets_with_slave_shots(self.slave_shots, self.shot_code)
         self.reset_subshot_menu_items()
+        self.set_loading_state(False)
+        self.update_membership_panel()
+        # Check the sub shot sets while Maya is idle to color the sanity check button.
+        self.core.validator.watch(self.subshot_sets, self.shot_code)
+
+    def callback_check_context(self, *args):
+        """
+        Refresh the tool's data after a scene event, once the engine has switched its context to the scene.
+        """
+        utils.executeDeferred(self.refresh_context)
+
+    def refresh_context(self):
+        """
+        Compare the engine context with the tool's one: load the sub shots again if it changed, else only read the
+        sub shot sets of the scene again.
+        """
+        if self.is_loading or not self.current_win or not cmds.window(self.current_win, query=True, exists=True):
+            return
+        try:
+            shot_code, task = self.core.get_shot_code_and_task_from_engine()
+        except Exception:
+            # Non pipelined scene: the context check of the loaded data shows the error to the user.
+            shot_code, task = None, None
+        if (shot_code, task) != (self.shot_code, self.task):
+            self.shot_code, self.task = shot_code, task
+            self.load_data()
+            return
         self.subshot_sets = self.core.get_subshot_sets_with_slave_shots(self.slave_shots, self.shot_code)
+        self.update_membership_panel()
+        self.core.validator.watch(self.subshot_sets, self.shot_code)
 
     def refresh_shot(self):
         """
@@ -117,8 +203,10 @@ class MglSubShotSetUI(object):
         self.slave_shots.sort()
         for item in self.slave_shots:
             # Create a menu item from the suffix of each subshot name.
-            suffix = re.findall(r"^sq\d{4}_sh\d{4}(\w+$)", item)[0]
-            cmds.menuItem(suffix, parent=self.parm_subshot)
+            subshot = subshotCore.ShotCode.parse(item)
+            if not subshot or not subshot.is_subshot:
+                continue
+            cmds.menuItem(subshot.variant, parent=self.parm_subshot)
 
     def set_targeted_subshot(self, value):
         """
@@ -130,9 +218,10 @@ class MglSubShotSetUI(object):
         """
         Create maya set from top nodes of each selected component. Replace the existing one if there is.
         """
-        self.callback_check_context()
         new_set = self.core.set_from_selection(self.shot_code, self.targeted_subshot)
         self.subshot_sets[self.targeted_subshot] = new_set
+        self.update_membership_panel()
+        self.core.validator.watch(self.subshot_sets, self.shot_code)
 
     def show_help(self, *args):
         """
@@ -155,8 +244,6 @@ class MglSubShotSetUI(object):
         """
         Add the top node of each selected component on the given maya set.
         """
-        # Check the scene context to know if the tool can be used or not.
-        self.callback_check_context()
         # Add the current selection to the given subshot set.
         updated_set = self.core.add_to_set(self.targeted_subshot, self.shot_code)
         self.subshot_sets[self.targeted_subshot] = updated_set
@@ -165,8 +252,6 @@ class MglSubShotSetUI(object):
         """
         Remove selected components from the given maya set.
         """
-        # Check the scene context to know if the tool can be used or not.
-        self.callback_check_context()
         # Remove the current selection from the given subshot set.
         updated_set = self.core.remove_to_set(self.targeted_subshot, self.shot_code)
         self.subshot_sets[self.targeted_subshot] = updated_set
@@ -178,6 +263,81 @@ class MglSubShotSetUI(object):
         targeted_set = self.subshot_sets.get(self.targeted_subshot)
         self.core.select_set_members(targeted_set)
 
+    def show_membership_panel(self, *args):
+        """
+        Show the members of every sub shot set in a separate panel.
+        """
+        if self.membership_panel is None:
+            self.membership_panel = subshotMembershipPanel.MembershipPanel(self.core)
+        self.membership_panel.show()
+        self.membership_panel.raise_()
+        self.update_membership_panel()
+
+    def update_membership_panel(self, subshots=None):
+        """
+        Follow the sub shot sets of the tool in the members panel, and read again the members of the given ones.
+        :param subshots: suffixes of the sub shots whose members changed, none if not given
+        :type subshots: list
+        """
+        if self.membership_panel is None:
+            return
+        self.membership_panel.set_subshot_sets(self.subshot_sets)
+        if subshots:
+            self.membership_panel.mark_dirty(subshots)
+
+    def close_membership_panel(self):
+        """
+        Close the members panel with the window.
+        """
+        if self.membership_panel is None:
+            return
+        self.membership_panel.close()
+        self.membership_panel.deleteLater()
+        self.membership_panel = None
+
+    def run_sanity_check(self):
+        """
+        Check the content of the sub shot sets with a progress bar which can be cancelled with Esc.
+        :returns: the check report, None if the check has been cancelled
+        :rtype: dict
+        """
+        report = subshotCore.SubShotCheckReport(self.shot_code)
+        # One step per sub shot set, then the duplicated and missing steps, each one split in hundredths.
+        cmds.progressWindow(title="Sanity Check", progress=0, maxValue=(len(self.subshot_sets) + 2) * 100,
+                            status="Checking the sub shot sets...", isInterruptable=True)
+        steps = 0
+        try:
+            for finding in self.core.iter_subshot_content(self.subshot_sets, self.shot_code):
+                report.add(finding)
+                if not finding.is_step and finding.kind != finding.PROGRESS:
+                    continue
+                if cmds.progressWindow(query=True, isCancelled=True):
+                    logging.warning("Sanity check cancelled.")
+                    return
+                if finding.kind == finding.PROGRESS:
+                    cmds.progressWindow(edit=True, progress=steps * 100 + int(100 * finding.progress))
+                    continue
+                steps += 1
+                status = "Checked '{}'.".format(finding.subshot_set) if finding.subshot_set else "Checked sets."
+                cmds.progressWindow(edit=True, progress=steps * 100, status=status)
+        finally:
+            cmds.progressWindow(endProgress=True)
+        report.is_complete = True
+        return report.to_dict()
+
+    def update_sanity_check_button(self, state=None):
+        """
+        Color the sanity check button from the cached results of the idle validator.
+        :param state: state of the sanity check, the cached one if not given
+        :type state: bool
+        """
+        if state is None:
+            state = self.core.validator.get_state()
+        if state is None:
+            return
+        color = [0.6, 0.7, 0.5] if state else [0.6, 0.1, 0.1]
+        self.sc_button = cmds.button(self.sc_button, edit=True, bgc=color)
+
     def check_and_fix_subshot_sets(self, *args):
         """
         Check the content of the subshot set and fix it if asked.
@@ -185,8 +345,10 @@ class MglSubShotSetUI(object):
         default = "Close"
         fix = "Fix"
         title = "Sanity Check Report"
-        # Check the content of each sub shot sets.
-        check_report = self.core.check_subshot_content(self.subshot_sets)
+        # Check the content of each sub shot sets, from the results of the idle validator when they are up to date.
+        check_report = self.core.validator.get_report() or self.run_sanity_check()
+        if check_report is None:
+            return
         message = check_report.get("message")
         print("\nSANITY CHECK REPORT {}\n{}{}".format("-"*80, message, "-"*100))
         # Show a popup to summarize to report of the check.
@@ -216,9 +378,22 @@ class MglSubShotSetUI(object):
             # Delete UI and its preferences if it exists.
             cmds.deleteUI(self.win_name, wnd=True)
             cmds.windowPref(self.win_name, removeAll=True)
+        # The shot of the scene is known without any query, the sub shots are loaded once the window is shown.
+        self.shot_code, self.task = self.core.get_shot_code_and_task_from_engine()
+        self.is_loading = True
         # Set the UI and show it.
         self.init_ui()
+        # Stop the scene callbacks of the core with the window.
+        cmds.scriptJob(uiDeleted=[self.current_win, self.core.remove_callbacks], runOnce=True)
+        cmds.scriptJob(uiDeleted=[self.current_win, self.close_membership_panel], runOnce=True)
+        # The context of the tool only changes with the scene, the buttons trust the data of the last scene event.
+        for event in ("SceneOpened", "SceneSaved"):
+            cmds.scriptJob(event=[event, self.callback_check_context], parent=self.current_win)
+        self.core.validator.on_validated = self.update_sanity_check_button
+        # The members panel follows the membership changes seen by the validator.
+        self.core.validator.on_invalidated = self.update_membership_panel
         cmds.showWindow(self.current_win)
+        self.load_data()
 
 
 def launcher():
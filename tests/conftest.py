@@ -0,0 +1,66 @@
+"""
+Shared fixtures of the tests. The tool runs on the fake maya, Shotgrid and pipeline modules of the benchmark, which
+are registered before the tool is imported.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import subshotBenchmark  # noqa: E402
+
+CMDS, SHOTGUN, ASSEMBLY_TOOLS = subshotBenchmark.install_fake_modules()
+
+
+@pytest.fixture
+def scene():
+    """
+    Empty fake scene, with its call counts reset.
+    :returns: counted fake cmds
+    :rtype: subshotBenchmark.CallCounter
+    """
+    CMDS._implementation.__init__()
+    CMDS.reset()
+    del ASSEMBLY_TOOLS.references[:]
+    SHOTGUN.entities = {"Shot": list(), "PublishedFile": list()}
+    return CMDS
+
+
+@pytest.fixture
+def shotgun(scene):
+    """
+    Fake Shotgrid of the fake engine, without any entity.
+    :rtype: subshotBenchmark.FakeShotgun
+    """
+    return SHOTGUN
+
+
+@pytest.fixture
+def assembly_tools(scene):
+    """
+    Fake assembly_tools module, without any assembly.
+    :rtype: module
+    """
+    return ASSEMBLY_TOOLS
+
+
+@pytest.fixture
+def add_rig(scene):
+    """
+    Add referenced rigs with one top node to the fake scene.
+    :returns: function taking the namespace of the rig and returning its top node
+    :rtype: function
+    """
+    implementation = scene._implementation
+
+    def add(namespace):
+        ref_node = namespace + "RN"
+        implementation.add_reference(ref_node, "/assets/{}.ma".format(namespace), namespace)
+        top_node = implementation.add_node(namespace + ":all_grp", reference=ref_node)
+        implementation.references[ref_node]["nodes"].append(top_node)
+        return top_node
+    return add
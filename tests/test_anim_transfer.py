@@ -0,0 +1,80 @@
+import pytest
+
+import subshotCore
+
+
+class AnimCurveCmds(object):
+    """
+    Scene of animation curves connected to attributes, which the benchmark scene does not have.
+    """
+
+    def __init__(self, connections, referenced=()):
+        self.connections = dict(connections)
+        self.referenced = set(referenced)
+        self.deleted = list()
+        self.duplicate_calls = 0
+
+    def listConnections(self, nodes, **kwargs):
+        plugs = list()
+        for plug, curve in sorted(self.connections.items()):
+            if plug.split(".", 1)[0] in nodes:
+                plugs.extend([plug, curve + ".output"])
+        return plugs
+
+    def duplicate(self, curves):
+        self.duplicate_calls += 1
+        return [x + "1" for x in curves]
+
+    def connectAttr(self, source, destination, force=False):
+        self.connections[destination] = source.split(".", 1)[0]
+
+    def disconnectAttr(self, source, destination):
+        assert self.connections.pop(destination) == source.split(".", 1)[0]
+
+    def referenceQuery(self, node, isNodeReferenced=False):
+        return node in self.referenced
+
+    def delete(self, nodes):
+        self.deleted.extend(nodes)
+
+
+@pytest.fixture
+def core():
+    return subshotCore.MglSubShotSet()
+
+
+def test_curves_are_duplicated(core, monkeypatch):
+    fake_cmds = AnimCurveCmds({"proxy_ctl.translateX": "proxy_ctl_translateX", "proxy_ctl.rotateY": "proxy_ctl_rotateY",
+                               "rig:ctl.translateX": "rig_ctl_translateX"})
+    monkeypatch.setattr(subshotCore, "cmds", fake_cmds)
+    curves = core.scene_query.get_anim_curves(["proxy_ctl"])["proxy_ctl"]
+    attributes = core.transfer_anim_curves("proxy_ctl", curves, "rig:ctl", core.get_transform_attributes())
+    assert attributes == ["rotateY", "translateX"]
+    assert fake_cmds.duplicate_calls == 1
+    assert fake_cmds.connections == {"proxy_ctl.translateX": "proxy_ctl_translateX",
+                                     "proxy_ctl.rotateY": "proxy_ctl_rotateY",
+                                     "rig:ctl.translateX": "proxy_ctl_translateX1",
+                                     "rig:ctl.rotateY": "proxy_ctl_rotateY1"}
+    # The curve previously driving the rig controller is replaced.
+    assert fake_cmds.deleted == ["rig_ctl_translateX"]
+
+
+def test_curves_are_moved(core, monkeypatch):
+    fake_cmds = AnimCurveCmds({"proxy_ctl.scaleX": "proxy_ctl_scaleX", "rig:world.global_scale": "rig_global_scale"},
+                              referenced=["rig_global_scale"])
+    monkeypatch.setattr(subshotCore, "cmds", fake_cmds)
+    curves = core.scene_query.get_anim_curves(["proxy_ctl"])["proxy_ctl"]
+    attributes = core.transfer_anim_curves("proxy_ctl", curves, "rig:world", {"scaleX": "global_scale"},
+                                           move_curves=True)
+    assert attributes == ["global_scale"]
+    assert fake_cmds.duplicate_calls == 0
+    assert fake_cmds.connections == {"rig:world.global_scale": "proxy_ctl_scaleX"}
+    # A curve of the reference is only disconnected.
+    assert fake_cmds.deleted == list()
+
+
+def test_attributes_without_curve_are_skipped(core, monkeypatch):
+    fake_cmds = AnimCurveCmds(dict())
+    monkeypatch.setattr(subshotCore, "cmds", fake_cmds)
+    assert core.transfer_anim_curves("proxy_ctl", dict(), "rig:ctl", core.get_transform_attributes()) == list()
+    assert fake_cmds.duplicate_calls == 0
@@ -0,0 +1,25 @@
+from subshotCore import AssetMemberIndex, AssetMemberName
+
+
+class TestAssetMemberName(object):
+
+    def test_parse_referenced_member(self):
+        name = AssetMemberName.parse("ch_ChickA_rig_001:all_grp")
+        assert (name.asset_type, name.asset_name, name.task, name.instance_number) == ("ch", "ChickA", "rig", 1)
+        assert name.namespace == "ch_ChickA_rig_001"
+        assert name.suffix == ""
+
+    def test_parse_reference_node(self):
+        name = AssetMemberName.parse("ch_ChickA_rig_102RN")
+        assert (name.asset_name, name.instance_number, name.suffix) == ("ChickA", 102, "RN")
+
+    def test_parse_outside_convention(self):
+        name = AssetMemberName.parse("trash_grp")
+        assert name.asset_name == "grp"
+        assert name.instance_number is None
+
+    def test_index_groups_whole_asset_names(self):
+        index = AssetMemberIndex(["ch_ChickA_rig_001RN", "ch_Chick_rig_001:all_grp", "ch_ChickA_rig_001:all_grp",
+                                  "ch_ChickA_rig_001RN"])
+        assert index.get_groups() == {"ChickA": ["ch_ChickA_rig_001RN", "ch_ChickA_rig_001:all_grp"],
+                                      "Chick": ["ch_Chick_rig_001:all_grp"]}
@@ -0,0 +1,72 @@
+import pytest
+
+from subshotCore import BulkEditSession
+
+
+@pytest.fixture
+def recorded(scene, monkeypatch):
+    """
+    Record the refresh and undo chunk calls of the fake scene.
+    :returns: recorded calls, as (command, flags)
+    :rtype: list
+    """
+    implementation = scene._implementation
+    calls = list()
+
+    def record(name, command):
+        def recording(*args, **kwargs):
+            calls.append((name, kwargs))
+            return command(*args, **kwargs)
+        return recording
+    for name in ("refresh", "undoInfo"):
+        monkeypatch.setattr(implementation, name, record(name, getattr(implementation, name)))
+    implementation.add_node("a", "reference")
+    implementation.nodes["a"].locked = True
+    return calls
+
+
+def test_settings_are_restored_on_error(scene, recorded):
+    implementation = scene._implementation
+    with pytest.raises(ValueError):
+        with BulkEditSession() as session:
+            assert implementation.evaluation_mode == "off"
+            session.unlock(["a"])
+            assert not implementation.nodes["a"].locked
+            raise ValueError("Edit failed.")
+    assert implementation.nodes["a"].locked
+    assert implementation.evaluation_mode == "parallel"
+    assert BulkEditSession.active is None
+    assert ("undoInfo", {"closeChunk": True}) in recorded
+    assert recorded[-1] == ("refresh", {"suspend": False})
+
+
+def test_failed_enter_restores_the_settings(scene, recorded, monkeypatch):
+    implementation = scene._implementation
+
+    def evaluation_manager(*args, **kwargs):
+        if kwargs.get("query"):
+            return ["parallel"]
+        raise RuntimeError("Cannot switch the evaluation mode.")
+    monkeypatch.setattr(implementation, "evaluationManager", evaluation_manager)
+    with pytest.raises(RuntimeError):
+        with BulkEditSession():
+            pass
+    assert BulkEditSession.active is None
+    assert implementation.undo_chunks == 0
+    assert recorded[-1] == ("refresh", {"suspend": False})
+
+
+def test_nested_session_uses_the_outer_one(scene, recorded):
+    implementation = scene._implementation
+    with BulkEditSession() as outer:
+        with BulkEditSession() as inner:
+            assert inner is outer
+            inner.unlock(["a"])
+        # The inner session ends without locking back or closing the undo chunk.
+        assert not implementation.nodes["a"].locked
+        assert BulkEditSession.active is outer
+        assert implementation.evaluation_mode == "off"
+    assert implementation.nodes["a"].locked
+    assert implementation.undo_chunks == 1
+    assert [x for x in recorded if x[0] == "undoInfo"] == [
+        ("undoInfo", {"openChunk": True, "chunkName": "subshotBulkEdit"}), ("undoInfo", {"closeChunk": True})]
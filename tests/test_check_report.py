@@ -0,0 +1,67 @@
+import subshotCore
+
+SHOT_CODE = "sq0010_sh0010"
+SUBSHOT_SETS = {"B": "sq0010_sh0010_B", "C": "sq0010_sh0010_C", "D": "sq0010_sh0010_D", "E": None}
+
+
+def build_scene(scene, assembly_tools):
+    implementation = scene._implementation
+    for node in ("cat", "dog", "owl"):
+        implementation.add_node(node)
+    implementation.add_node("cat_ctl", parent="cat")
+    implementation.add_node("props_set", "objectSet")
+    implementation.add_reference("set_Env_lay_001RN", "/assets/set/Env/lay.ma", "set_Env_lay_001")
+    implementation.add_node("set_Env_lay_001:all_grp", reference="set_Env_lay_001RN")
+    implementation.references["set_Env_lay_001RN"]["nodes"].append("set_Env_lay_001:all_grp")
+    assembly_tools.references.append("set_Env_lay_001RN")
+    scene.sets(["cat_ctl", "props_set", "dog"], name="sq0010_sh0010_B")
+    scene.sets(["cat", "set_Env_lay_001:all_grp"], name="sq0010_sh0010_C")
+    scene.sets([], name="sq0010_sh0010_D")
+
+
+def test_message_matches_the_previous_check(scene, assembly_tools):
+    build_scene(scene, assembly_tools)
+    report = subshotCore.MglSubShotSet().check_subshot_content(SUBSHOT_SETS, shot_code=SHOT_CODE)
+    # Text of the check before the findings were streamed, for the same scene.
+    assert report["message"] == ("sq0010_sh0010_B:\n"
+                                 "Non top dag node: 'cat_ctl'.\n"
+                                 "Set object found 'props_set'.\n"
+                                 "Non top dag node: 'props_set'.\n"
+                                 "\n"
+                                 "sq0010_sh0010_C:\n"
+                                 "Is an assembly: 'set_Env_lay_001:all_grp'.\n"
+                                 "\n"
+                                 "sq0010_sh0010_D:\n"
+                                 "Set is empty, it needs to be filled.\n"
+                                 "\n"
+                                 "sq0010_sh0010_E:\n"
+                                 "Set does not exist.\n"
+                                 "\n"
+                                 "Duplicated on sets: (no fix)\n"
+                                 "cat\n"
+                                 "props_set\n"
+                                 "\n"
+                                 "Missing top nodes: (no fix)\n"
+                                 "owl\n")
+    assert not report["state"]
+    assert report["data"]["sq0010_sh0010_B"] == {"remove": ["cat_ctl", "props_set", "props_set"],
+                                                 "add": ["cat", "props_set"]}
+    assert report["data"]["missing"] == ["owl"]
+
+
+def test_message_of_a_clean_scene(scene, assembly_tools):
+    build_scene(scene, assembly_tools)
+    scene.sets(["cat_ctl", "props_set"], remove="sq0010_sh0010_B")
+    scene.sets(["cat", "owl"], addElement="sq0010_sh0010_B")
+    scene.sets(["set_Env_lay_001:all_grp"], remove="sq0010_sh0010_C")
+    core = subshotCore.MglSubShotSet()
+    report = core.check_subshot_content({"B": "sq0010_sh0010_B"}, shot_code=SHOT_CODE)
+    assert report["state"]
+    assert report["message"] == "Congrats.\n\nEverything is okay.\nReady to build the sub shots.\n"
+
+
+def test_fail_fast_stops_at_the_first_issue(scene, assembly_tools):
+    build_scene(scene, assembly_tools)
+    report = subshotCore.MglSubShotSet().check_subshot_content(SUBSHOT_SETS, shot_code=SHOT_CODE, fail_fast=True)
+    assert not report["state"]
+    assert report["message"] == "sq0010_sh0010_B:\nNon top dag node: 'cat_ctl'.\n"
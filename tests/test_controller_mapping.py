@@ -0,0 +1,61 @@
+import pytest
+
+from subshotCore import ControllerMappingTable, ControllerTarget
+
+
+@pytest.fixture
+def rig_scene(scene, monkeypatch):
+    """
+    Proxy with two controllers and two references of the same NOD rig.
+    """
+    implementation = scene._implementation
+    implementation.add_node("proxy_Cat_001")
+    implementation.add_node("ctl_a", parent="proxy_Cat_001")
+    implementation.add_node("ctl_aShape", "nurbsCurve", "ctl_a")
+    implementation.add_node("ctl_b", parent="ctl_a")
+    implementation.add_node("ctl_bShape", "nurbsCurve", "ctl_b")
+    for namespace in ("ch_Cat_rig_101", "ch_Cat_rig_102"):
+        implementation.add_node(namespace + ":world_C0_ctl")
+        implementation.nodes[namespace + ":world_C0_ctl"].attrs["global_scale"] = 1.0
+        implementation.add_node(namespace + ":global_C0_ctl")
+        implementation.add_node(namespace + ":local_C0_ctl")
+
+    # The fake scene only lists the children, the table asks for the full paths of the descendant curves.
+    def list_relatives(node, type=None, **kwargs):
+        return [implementation._long(x) for x in implementation._descendants(node)
+                if implementation.nodes[x].type == type] or None
+    monkeypatch.setattr(implementation, "listRelatives", list_relatives)
+    return scene
+
+
+def test_mapping_follows_the_rig_convention(rig_scene):
+    mapping = ControllerMappingTable().get_mapping("proxy_Cat_001", "ch_Cat_rig_101")
+    assert mapping == [("ctl_a", ControllerTarget("ch_Cat_rig_101:world_C0_ctl", "global_scale", True)),
+                       ("ctl_b", ControllerTarget("ch_Cat_rig_101:global_C0_ctl", None, False))]
+
+
+def test_mapping_of_the_same_rig_is_reused(rig_scene):
+    table = ControllerMappingTable()
+    table.get_mapping("proxy_Cat_001", "ch_Cat_rig_101", "/assets/Cat/rig.ma")
+    rig_scene.reset()
+    mapping = table.get_mapping("proxy_Cat_001", "ch_Cat_rig_102", "/assets/Cat/rig.ma")
+    assert [x.controller for _, x in mapping] == ["ch_Cat_rig_102:world_C0_ctl", "ch_Cat_rig_102:global_C0_ctl"]
+    # The hierarchies are not walked again, the rig convention is not looked up again.
+    assert "listRelatives" not in rig_scene.calls
+    assert "attributeQuery" not in rig_scene.calls
+
+
+def test_other_rig_is_resolved_again(rig_scene):
+    table = ControllerMappingTable()
+    table.get_mapping("proxy_Cat_001", "ch_Cat_rig_101", "/assets/Cat/rig.ma")
+    rig_scene.reset()
+    table.get_mapping("proxy_Cat_001", "ch_Cat_rig_102", "/assets/Cat/rig_v2.ma")
+    assert rig_scene.calls["listRelatives"] == 1
+    table.clear()
+    table.get_mapping("proxy_Cat_001", "ch_Cat_rig_102", "/assets/Cat/rig.ma")
+    assert rig_scene.calls["listRelatives"] == 2
+
+
+def test_unknown_convention(rig_scene):
+    rig_scene._implementation.add_node("pr_Box_rig_101:root_ctl")
+    assert ControllerMappingTable().get_mapping("proxy_Cat_001", "pr_Box_rig_101") is None
@@ -0,0 +1,29 @@
+import subshotCore
+from subshotCore import InstanceNumberAllocator
+
+
+class TestInstanceNumberAllocator(object):
+
+    def test_blocks_of_a_variant(self):
+        allocator = InstanceNumberAllocator(subshotCore.get_variant_instance_update("B"), used_numbers=dict())
+        assert allocator.get_number(0) == 101
+        assert allocator.get_number(98) == 199
+        # The next block of the variant is after the blocks of every other variant.
+        assert allocator.get_number(99) == 2701
+
+    def test_variants_do_not_share_numbers(self):
+        numbers = dict()
+        for variant in "BCZ":
+            allocator = InstanceNumberAllocator(subshotCore.get_variant_instance_update(variant),
+                                                used_numbers=dict())
+            numbers[variant] = set(allocator.get_number(x) for x in range(300))
+        assert not numbers["B"] & numbers["C"]
+        assert not numbers["B"] & numbers["Z"]
+        assert not numbers["C"] & numbers["Z"]
+
+    def test_allocate_skips_used_numbers(self, scene, add_rig):
+        add_rig("ch_Cat_rig_101")
+        scene._implementation.add_node("ch_Cat_rig_102")
+        allocator = InstanceNumberAllocator(100)
+        assert [allocator.allocate("ch_Cat_rig_") for _ in range(3)] == [103, 104, 105]
+        assert allocator.allocate("ch_Dog_rig_") == 101
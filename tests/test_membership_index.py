@@ -0,0 +1,31 @@
+from subshotCore import MembershipIndex
+
+
+class TestMembershipIndex(object):
+
+    def test_duplicated_members_follow_the_sets(self):
+        index = MembershipIndex()
+        index.add_set("set_B", ["a", "b"])
+        index.add_set("set_C", ["b", "c"])
+        assert index.get_duplicated() == ["b"]
+        assert sorted(index.get_sets("b")) == ["set_B", "set_C"]
+        index.add_set("set_C", ["c"])
+        assert index.get_duplicated() == list()
+        index.add_member("set_C", "c")
+        assert index.get_duplicated() == ["c"]
+        index.remove_set("set_C")
+        assert index.get_duplicated() == list()
+        assert index.get_sets("c") == list()
+
+    def test_missing_nodes(self):
+        index = MembershipIndex()
+        index.add_set("set_B", ["a"])
+        assert index.get_missing(["a", "b"]) == ["b"]
+
+    def test_build_from_scene(self, scene):
+        scene.sets(["a", "b"], name="set_B")
+        scene.sets(["b"], name="set_C")
+        index = MembershipIndex()
+        index.build(["set_B", "set_C", "set_D", None])
+        assert sorted(index.members_by_set) == ["set_B", "set_C"]
+        assert index.get_duplicated() == ["b"]
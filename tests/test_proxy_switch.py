@@ -0,0 +1,102 @@
+import sys
+
+import pytest
+
+import subshotCore
+
+
+class FakeReferenceFile(object):
+    """
+    Reference returned by the pipeline builder.
+    """
+
+    def __init__(self, ref_node):
+        self.refNode = ref_node
+
+
+class FakeBuilder(object):
+    """
+    Pipeline builder creating the references in the fake scene.
+    """
+
+    def __init__(self, scene, events):
+        self.implementation = scene._implementation
+        self.events = events
+
+    def create_reference(self, path, namespace=None, loadReferenceDepth="all"):
+        ref_node = namespace + "RN"
+        self.implementation.add_reference(ref_node, path, namespace)
+        self.implementation.references[ref_node]["loaded"] = loadReferenceDepth != "none"
+        top_node = self.implementation.add_node(namespace + ":all_grp", reference=ref_node)
+        self.implementation.references[ref_node]["nodes"].append(top_node)
+        self.events.append(("create", namespace, loadReferenceDepth))
+        return FakeReferenceFile(ref_node)
+
+
+class LoadingBuilder(FakeBuilder):
+    """
+    Pipeline builder which always loads the references it creates.
+    """
+
+    def create_reference(self, path, namespace=None):
+        return FakeBuilder.create_reference(self, path, namespace)
+
+
+@pytest.fixture
+def switch(scene, monkeypatch, tmpdir):
+    """
+    Switch two proxies of the same asset with the given builder class.
+    :returns: function taking the builder class and returning the switched proxies and the recorded events
+    :rtype: function
+    """
+    implementation = scene._implementation
+    rig_path = tmpdir.join("rig.ma")
+    rig_path.write("//Maya ASCII")
+    events = list()
+
+    def load_reference(*args, **kwargs):
+        implementation.references[kwargs["loadReference"]]["loaded"] = True
+        events.append(("load", kwargs["loadReference"]))
+    monkeypatch.setattr(implementation, "file", load_reference)
+
+    def run(builder_class):
+        monkeypatch.setattr(sys.modules["mglImport"], "get_module_python_class",
+                            lambda **kwargs: (None, lambda: builder_class(scene, events)), raising=False)
+        for proxy_name in ("proxy_Cat_001_grp", "proxy_Cat_002_grp"):
+            implementation.add_node(proxy_name)
+        scene.sets([], name="sq0010_sh0010_B", empty=True)
+        core = subshotCore.MglSubShotSet()
+        monkeypatch.setattr(core, "copy_proxy_anim_to_reference",
+                            lambda ref_assembly, proxy_name, **kwargs: events.append(("anim", proxy_name)))
+        switched = core.switch_proxies_to_assets(["proxy_Cat_001_grp", "proxy_Cat_002_grp"], 100,
+                                                 {"Cat": str(rig_path)}, subshot_set="sq0010_sh0010_B")
+        return switched, events
+    return run
+
+
+def test_references_are_loaded_after_their_creation(scene, switch):
+    switched, events = switch(FakeBuilder)
+    assert switched == {"proxy_Cat_001_grp": "ch_asset_rig_101", "proxy_Cat_002_grp": "ch_asset_rig_102"}
+    assert events == [("create", "ch_asset_rig_101", "none"), ("create", "ch_asset_rig_102", "none"),
+                      ("load", "ch_asset_rig_101RN"), ("load", "ch_asset_rig_102RN"),
+                      ("anim", "proxy_Cat_001_grp"), ("anim", "proxy_Cat_002_grp")]
+    assert not scene.objExists("proxy_Cat_001_grp")
+    assert sorted(scene.sets("sq0010_sh0010_B", query=True)) == ["ch_asset_rig_101:all_grp",
+                                                                 "ch_asset_rig_102:all_grp"]
+
+
+def test_builder_loading_the_references(scene, switch):
+    switched, events = switch(LoadingBuilder)
+    assert sorted(switched.values()) == ["ch_asset_rig_101", "ch_asset_rig_102"]
+    assert [x[0] for x in events] == ["create", "create", "anim", "anim"]
+
+
+def test_cache_warmer_does_not_wait_for_the_reads(tmpdir):
+    path = tmpdir.join("rig.ma")
+    path.write("x" * 1024)
+    warmer = subshotCore.FileCacheWarmer([str(path), str(tmpdir.join("missing.ma")), str(path)])
+    assert warmer.paths == [str(path), str(tmpdir.join("missing.ma"))]
+    warmer.start()
+    read_sizes = warmer.stop()
+    # The reads done before the stop are returned, the others are dropped.
+    assert set(read_sizes) <= {str(path)}
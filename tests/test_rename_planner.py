@@ -0,0 +1,59 @@
+import pytest
+
+import subshotCore
+from subshotCore import AssetMemberIndex
+
+
+class TestRenamePlanner(object):
+
+    def test_shared_reference_uses_one_number(self, scene, add_rig):
+        top_node = add_rig("ch_Cat_rig_001")
+        implementation = scene._implementation
+        other_top_node = implementation.add_node("ch_Cat_rig_001:extra_grp", reference="ch_Cat_rig_001RN")
+        implementation.references["ch_Cat_rig_001RN"]["nodes"].append(other_top_node)
+        last_top_node = add_rig("ch_Cat_rig_002")
+        planner = subshotCore.MglSubShotSet().rename_planner
+        plan = planner.plan({"Cat": [top_node, other_top_node, last_top_node]}, 100, variant="B")
+        # The second top node of the first reference takes no number, the next reference gets the next one.
+        assert [(x.kind, x.node, x.new_name) for x in plan.operations] == [
+            (subshotCore.RenameOperation.NAMESPACE, "ch_Cat_rig_001RN", "ch_Cat_rig_101"),
+            (subshotCore.RenameOperation.RENAME, "ch_Cat_rig_001RN", "ch_Cat_rig_101RN"),
+            (subshotCore.RenameOperation.NAMESPACE, "ch_Cat_rig_002RN", "ch_Cat_rig_102"),
+            (subshotCore.RenameOperation.RENAME, "ch_Cat_rig_002RN", "ch_Cat_rig_102RN")]
+
+    def test_failed_apply_is_reverted(self, scene, add_rig, monkeypatch):
+        top_node = add_rig("ch_Cat_rig_001")
+        scene._implementation.add_node("pr_Box_mod_001")
+        core = subshotCore.MglSubShotSet()
+        planner = core.rename_planner
+        plan = planner.plan(AssetMemberIndex([top_node, "pr_Box_mod_001"]).get_groups(), 100, variant="B")
+        assert [x.new_name for x in plan.operations] == ["ch_Cat_rig_101", "ch_Cat_rig_101RN", "pr_Box_mod_101"]
+        rename = scene._implementation.rename
+        calls = list()
+
+        def failing_rename(old_name, new_name, **kwargs):
+            calls.append(old_name)
+            if len(calls) == 2:
+                raise RuntimeError("Cannot rename '{}'.".format(old_name))
+            return rename(old_name, new_name, **kwargs)
+        monkeypatch.setattr(scene._implementation, "rename", failing_rename)
+        with pytest.raises(RuntimeError):
+            planner.apply(plan)
+        implementation = scene._implementation
+        assert "ch_Cat_rig_001RN" in implementation.references
+        assert implementation.references["ch_Cat_rig_001RN"]["namespace"] == "ch_Cat_rig_001"
+        assert "pr_Box_mod_001" in implementation.nodes
+        assert implementation.nodes["ch_Cat_rig_001RN"].locked
+        assert implementation.evaluation_mode == "parallel"
+        assert subshotCore.BulkEditSession.active is None
+
+    def test_apply_refuses_colliding_names(self, scene):
+        scene._implementation.add_node("a")
+        scene._implementation.add_node("b")
+        core = subshotCore.MglSubShotSet()
+        plan = subshotCore.RenamePlan("B", 100, None)
+        plan.add(subshotCore.RenameOperation.RENAME, "a", "x_101")
+        plan.add(subshotCore.RenameOperation.RENAME, "b", "x_101")
+        with pytest.raises(RuntimeError):
+            core.rename_planner.apply(plan)
+        assert sorted(scene._implementation.nodes) == ["a", "b"]
@@ -0,0 +1,70 @@
+import subshotCore
+from subshotCore import SceneIndex
+
+
+class FakeDagPath(object):
+    """
+    Dag path given to the parent changed callbacks, which the fake OpenMaya module never calls.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def fullPathName(self):
+        return self.path
+
+
+def build_hierarchy(scene):
+    implementation = scene._implementation
+    implementation.add_node("grp")
+    implementation.add_node("a", parent="grp")
+    implementation.add_node("b", parent="a")
+    implementation.add_node("other")
+    index = SceneIndex()
+    index.sync()
+    return implementation, index
+
+
+def move_node(implementation, node, parent):
+    previous_parent = implementation.nodes[node].parent
+    implementation.nodes[previous_parent].children.remove(node)
+    implementation.nodes[node].parent = parent
+    implementation.nodes[parent].children.append(node)
+
+
+def test_build_indexes_every_name(scene):
+    _, index = build_hierarchy(scene)
+    assert index.top_nodes == {"grp", "other"}
+    assert index.get_top_node("b") == "grp"
+    assert index.get_top_node("|grp|a|b") == "grp"
+    assert index.get_top_node("other") == "other"
+
+
+def test_sync_moves_a_reparented_hierarchy(scene):
+    implementation, index = build_hierarchy(scene)
+    move_node(implementation, "a", "other")
+    index._on_parent_removed(FakeDagPath("|grp|a"), FakeDagPath("|grp"))
+    index._on_parent_added(FakeDagPath("|other|a"), FakeDagPath("|other"))
+    scene.reset()
+    index.sync()
+    assert index.get_top_node("b") == "other"
+    assert "|grp|a|b" not in index.top_node_by_child
+    assert index.top_node_by_child["|other|a|b"] == "other"
+    # Only the dirty hierarchy is listed again, not the whole scene.
+    assert scene.calls["ls"] <= 4
+
+
+def test_sync_drops_a_removed_hierarchy(scene):
+    implementation, index = build_hierarchy(scene)
+    scene.delete("grp")
+    index._on_parent_removed(FakeDagPath("|grp"), FakeDagPath(""))
+    index.sync()
+    assert index.top_nodes == {"other"}
+    assert not set(index.top_node_by_child) & {"grp", "a", "b", "|grp", "|grp|a", "|grp|a|b"}
+    assert not index._children_by_path.get("|grp")
+
+
+def test_short_names_are_the_shortest_unique_suffix():
+    assert subshotCore.get_short_names(["|a|x", "|b|x", "|c|d|y"]) == {"|a|x": "a|x", "|b|x": "b|x",
+                                                                       "|c|d|y": "y"}
+    assert subshotCore.get_short_names(["|x", "|a|x"]) == {"|x": "|x", "|a|x": "a|x"}
@@ -0,0 +1,35 @@
+import subshotCore
+from subshotCore import SceneQuery
+
+
+class AmbiguousNamesCmds(object):
+    """
+    Scene where a child node has the same name as a top node, which the benchmark scene never has.
+    """
+
+    long_names = ["|grp", "|grp|a", "|other", "|other|grp", "|other|grp|b"]
+
+    def __init__(self):
+        self.calls = list()
+
+    def ls(self, names, long=False):
+        self.calls.append(list(names))
+        return [x for x in self.long_names for name in names if x == name or x.endswith("|" + name)]
+
+
+def test_top_nodes_of_components(scene):
+    implementation = scene._implementation
+    implementation.add_node("grp")
+    implementation.add_node("a", parent="grp")
+    implementation.add_node("b", parent="a")
+    implementation.add_node("mySet", "objectSet")
+    assert SceneQuery().get_top_nodes(["b", "|grp|a", "grp", "mySet", "missing"]) == \
+        ["grp", "grp", "grp", "mySet", "missing"]
+
+
+def test_ambiguous_top_node_uses_the_full_path(monkeypatch):
+    fake_cmds = AmbiguousNamesCmds()
+    monkeypatch.setattr(subshotCore, "cmds", fake_cmds)
+    # Only "a" is asked, the other node named "grp" is found by listing the top names.
+    assert SceneQuery().get_top_nodes(["a", "|other|grp|b"]) == ["|grp", "other"]
+    assert len(fake_cmds.calls) == 2
@@ -0,0 +1,46 @@
+import subshotCore
+from subshotCore import SetMembershipEditor
+
+
+def add_nodes(scene, *names):
+    for name in names:
+        scene._implementation.add_node(name)
+
+
+def test_edits_are_applied_in_one_undo_chunk(scene):
+    add_nodes(scene, "a", "b", "c")
+    scene.sets(["a", "b"], name="set_B")
+    scene.sets(["c"], name="set_C")
+    editor = SetMembershipEditor()
+    editor.add("set_B", ["c", "a"])
+    editor.remove("set_B", ["b"])
+    editor.remove("set_C", ["c", "a"])
+    scene.reset()
+    assert editor.apply() == {"set_B": {"added": ["c"], "removed": ["b"]}, "set_C": {"added": [], "removed": ["c"]}}
+    assert sorted(scene.sets("set_B", query=True)) == ["a", "c"]
+    assert scene.sets("set_C", query=True) is None or not scene.sets("set_C", query=True)
+    assert scene.calls["undoInfo"] == 2
+    assert "select" not in scene.calls
+
+
+def test_last_planned_edit_of_a_member_wins(scene):
+    add_nodes(scene, "a", "b")
+    scene.sets(["a"], name="set_B")
+    editor = SetMembershipEditor()
+    editor.remove("set_B", ["a"])
+    editor.add("set_B", ["a", "b"])
+    editor.remove("set_B", ["b"])
+    assert editor.apply() == dict()
+    assert scene.sets("set_B", query=True) == ["a"]
+
+
+def test_replace_with_an_overlapping_selection(scene):
+    add_nodes(scene, "a", "b", "c", "d")
+    scene.sets(["a", "b"], name="sq0010_sh0010_B")
+    scene.sets(["d"], name="sq0010_sh0010_C")
+    scene.select(["b", "c", "d"])
+    core = subshotCore.MglSubShotSet()
+    assert core.set_from_selection("sq0010_sh0010", "B") == "sq0010_sh0010_B"
+    # The members of the replaced set can stay, the ones of another sub shot set are refused.
+    assert sorted(scene.sets("sq0010_sh0010_B", query=True)) == ["b", "c"]
+    assert scene.sets("sq0010_sh0010_C", query=True) == ["d"]
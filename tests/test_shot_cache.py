@@ -0,0 +1,55 @@
+import threading
+
+import subshotCore
+from subshotCore import ShotCache
+
+
+class TestShotCache(object):
+
+    def test_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(subshotCore.time, "time", lambda: now[0])
+        cache = ShotCache(ttl=10)
+        cache.set((1, "sq0010_sh0010"), {"code": "sq0010_sh0010"})
+        now[0] += 5
+        assert cache.get((1, "sq0010_sh0010")) == {"code": "sq0010_sh0010"}
+        now[0] += 10
+        assert cache.get((1, "sq0010_sh0010")) is None
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ShotCache(max_size=2)
+        cache.set((1, "a"), "a")
+        cache.set((1, "b"), "b")
+        cache.get((1, "a"))
+        cache.set((1, "c"), "c")
+        assert cache.get((1, "b")) is None
+        assert (cache.get((1, "a")), cache.get((1, "c"))) == ("a", "c")
+
+    def test_invalidate_shot(self):
+        cache = ShotCache()
+        cache.set((1, "a"), "a")
+        cache.set((2, "a"), "a")
+        cache.set((1, "b"), "b")
+        cache.invalidate("a")
+        assert (cache.get((1, "a")), cache.get((2, "a")), cache.get((1, "b"))) == (None, None, "b")
+
+    def test_access_from_several_threads(self):
+        cache = ShotCache(max_size=8)
+        errors = list()
+
+        def fill(project_id):
+            try:
+                for index in range(2000):
+                    cache.set((project_id, str(index % 20)), index)
+                    cache.get((project_id, str((index + 7) % 20)))
+                    if not index % 100:
+                        cache.invalidate(str(index % 20))
+            except Exception as error:
+                errors.append(error)
+        threads = [threading.Thread(target=fill, args=(x,)) for x in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == list()
+        assert len(cache._entries) <= 8
@@ -0,0 +1,41 @@
+import pytest
+
+from subshotCore import ShotCode
+
+
+class TestShotCode(object):
+
+    def test_parse_subshot(self):
+        shot = ShotCode.parse("sq0010_sh0010B")
+        assert (shot.sequence, shot.shot, shot.variant) == ("sq0010", "sh0010", "B")
+        assert shot.is_subshot
+        assert shot.parent_name == "sq0010_sh0010"
+        assert shot.get_set_name() == "sq0010_sh0010_B"
+        assert shot.get_parent() is ShotCode.parse("sq0010_sh0010")
+
+    def test_parse_parent_shot(self):
+        shot = ShotCode.parse("sq0010_sh0010")
+        assert not shot.is_subshot
+        assert shot.get_parent() is shot
+        assert shot.get_subshot("C").name == "sq0010_sh0010C"
+
+    @pytest.mark.parametrize("name", ["", None, "sq0010", "sq0010_sh0010BC", "sqABCD_sh0010", "sq0010-sh0010"])
+    def test_parse_invalid(self, name):
+        assert ShotCode.parse(name) is None
+
+    def test_parse_is_interned(self):
+        assert ShotCode.parse("sq0020_sh0030D") is ShotCode.parse("sq0020_sh0030D")
+
+    def test_parse_set_name(self):
+        assert ShotCode.parse_set_name("sq0010_sh0010_B").name == "sq0010_sh0010B"
+        assert ShotCode.parse_set_name("sq0010_sh0010") is None
+        assert ShotCode.parse_set_name("sq0010_sh0010_BC") is None
+
+    def test_invalid_names_are_not_kept(self):
+        ShotCode.parse("sq0010_sh0010")
+        for name in ("trash_grp", "sq0010_sh0010BC", None):
+            assert ShotCode.parse(name) is None
+            assert name not in ShotCode._parsed
+        assert ShotCode.parse_set_name("trash_set") is None
+        assert "trash_set" not in ShotCode._parsed_sets
+        assert "sq0010_sh0010" in ShotCode._parsed
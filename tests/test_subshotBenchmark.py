@@ -0,0 +1,24 @@
+import subshotBenchmark
+import subshotCore
+
+
+def test_parent_shot_scene_has_each_kind_of_issue(scene, shotgun, assembly_tools):
+    subshot_sets = subshotBenchmark.build_parent_shot_scene(scene, shotgun, assembly_tools, 200, assembly_count=3)
+    assert sorted(subshot_sets) == list(subshotBenchmark.VARIANTS)
+    core = subshotCore.MglSubShotSet()
+    assert core.get_sub_shots(subshotBenchmark.SHOT_CODE) == [subshotBenchmark.SHOT_CODE + x
+                                                               for x in subshotBenchmark.VARIANTS]
+    report = core.check_subshot_content(subshot_sets)
+    assert not report["state"]
+    first_set = subshot_sets[subshotBenchmark.VARIANTS[0]]
+    assert report["data"][first_set]["add"]
+    assert report["data"]["duplicated"]
+    assert report["data"]["missing"]
+
+
+def test_call_counter_counts_each_function(scene):
+    scene.ls()
+    scene.ls()
+    scene.objExists("persp")
+    assert scene.calls == {"ls": 2, "objExists": 1}
+    assert scene.total() == 3
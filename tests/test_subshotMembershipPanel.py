@@ -0,0 +1,43 @@
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("PySide2")
+
+
+@pytest.fixture
+def panel_module(monkeypatch):
+    # The fake maya module has no UI, and the panel only needs the main window outside of the tests.
+    open_maya_ui = types.ModuleType("maya.OpenMayaUI")
+    open_maya_ui.MQtUtil = type("MQtUtil", (object,), {"mainWindow": staticmethod(lambda: None)})
+    monkeypatch.setitem(sys.modules, "maya.OpenMayaUI", open_maya_ui)
+    monkeypatch.setattr(sys.modules["maya"], "OpenMayaUI", open_maya_ui, raising=False)
+    monkeypatch.delitem(sys.modules, "subshotMembershipPanel", raising=False)
+    import subshotMembershipPanel
+    return subshotMembershipPanel
+
+
+class TestMemberListModel(object):
+
+    def test_set_members_sorts_and_dedups(self, panel_module):
+        model = panel_module.MemberListModel()
+        assert model.set_members(["c", "a", "b", "a"])
+        assert model.members == ["a", "b", "c"]
+        assert model.rowCount() == 3
+
+    def test_set_members_moves_only_changed_rows(self, panel_module):
+        model = panel_module.MemberListModel()
+        model.set_members(["a", "b", "c", "d", "e"])
+        inserted = list()
+        removed = list()
+        model.rowsInserted.connect(lambda parent, first, last: inserted.append(first))
+        model.rowsRemoved.connect(lambda parent, first, last: removed.append(first))
+        assert model.set_members(["a", "bb", "c", "d", "e"])
+        assert model.members == ["a", "bb", "c", "d", "e"]
+        assert (removed, inserted) == ([1], [1])
+
+    def test_set_members_without_change(self, panel_module):
+        model = panel_module.MemberListModel()
+        model.set_members(["a"])
+        assert not model.set_members(["a"])
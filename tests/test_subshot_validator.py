@@ -0,0 +1,95 @@
+import pytest
+
+import subshotBenchmark
+import subshotCore
+
+
+class FakeDagPath(object):
+    """
+    Dag path of a fake scene node, the fake OpenMaya module has no function sets.
+    """
+
+    def __init__(self, scene, name):
+        self.scene = scene
+        self.name = name
+
+    def fullPathName(self):
+        return self.scene._long(self.name) if self.name in self.scene.nodes else ""
+
+    def partialPathName(self):
+        return self.name
+
+
+@pytest.fixture
+def validated(scene, shotgun, assembly_tools, monkeypatch):
+    """
+    Watch the sub shot sets of a small parent shot scene and run the validator until it is done.
+    :returns: the tool, the sub shot sets and the validator
+    :rtype: tuple
+    """
+    implementation = scene._implementation
+    monkeypatch.setattr(subshotCore.OpenMaya, "MDagPath",
+                        type("MDagPath", (), {"getAPathTo": staticmethod(lambda x: FakeDagPath(implementation, x))}),
+                        raising=False)
+    monkeypatch.setattr(subshotCore.OpenMaya, "MFnDependencyNode",
+                        lambda x: type("MFnDependencyNode", (), {"name": lambda self: x})(), raising=False)
+    subshotBenchmark.build_parent_shot_scene(scene, shotgun, assembly_tools, 50, assembly_count=3)
+    core = subshotCore.MglSubShotSet()
+    subshot_sets = core.get_subshot_sets_with_slave_shots(core.get_sub_shots(subshotBenchmark.SHOT_CODE),
+                                                          subshotBenchmark.SHOT_CODE)
+    validator = core.validator
+    validator.chunk_size = 7
+    validator.watch(subshot_sets, subshotBenchmark.SHOT_CODE)
+    run_until_valid(validator)
+    return core, subshot_sets, validator
+
+
+def run_until_valid(validator):
+    for _ in range(1000):
+        if validator.validate(0.0002):
+            return
+    raise AssertionError("The validator never ended.")
+
+
+def assert_same_as_full_check(core, subshot_sets, validator):
+    # The fake messages never call the scene index callbacks.
+    core.scene_index.invalidate()
+    run_until_valid(validator)
+    assert validator.get_report() == core.check_subshot_content(subshot_sets, shot_code=subshotBenchmark.SHOT_CODE)
+
+
+def test_initial_report_is_the_full_check(validated):
+    core, subshot_sets, validator = validated
+    assert_same_as_full_check(core, subshot_sets, validator)
+    assert not validator.get_state()
+
+
+def test_set_edits_update_the_report(scene, validated):
+    core, subshot_sets, validator = validated
+    implementation = scene._implementation
+    first_set, last_set = sorted(subshot_sets.values())[0], sorted(subshot_sets.values())[-1]
+    implementation.add_node("newGrp")
+    validator._on_dag_added("newGrp")
+    assert not validator.is_valid()
+    assert_same_as_full_check(core, subshot_sets, validator)
+    assert "newGrp" in validator.get_report()["data"]["missing"]
+    scene.sets(["newGrp"], addElement=first_set)
+    validator._on_set_members_modified(None, first_set)
+    assert_same_as_full_check(core, subshot_sets, validator)
+    assert "newGrp" not in validator.get_report()["data"]["missing"]
+    scene.sets(["newGrp"], addElement=last_set)
+    validator._on_set_members_modified(None, last_set)
+    assert_same_as_full_check(core, subshot_sets, validator)
+    assert "newGrp" in validator.get_report()["data"]["duplicated"]
+    removed = implementation.nodes[last_set].members[0]
+    scene.sets([removed], remove=last_set)
+    validator._on_set_members_modified(None, last_set)
+    assert_same_as_full_check(core, subshot_sets, validator)
+
+
+def test_only_the_dirty_set_is_checked_again(scene, validated):
+    core, subshot_sets, validator = validated
+    edited_set = sorted(subshot_sets.values())[0]
+    validator._on_set_members_modified(None, edited_set)
+    assert validator.dirty_subshots == {validator._subshot_by_set[edited_set]}
+    assert_same_as_full_check(core, subshot_sets, validator)